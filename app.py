@@ -1,28 +1,115 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash
-from sqlalchemy import create_engine
+import json
+import threading
+import time
+import click
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, Response
+from flask import session as sesion_web
+from flask.cli import AppGroup
 from sqlalchemy.orm import sessionmaker, scoped_session
-from models import Base, Torneo, Equipo, Partido # Importamos los modelos de la DB
+from models import Torneo # Importamos los modelos de la DB
 import tournament_logic as logic # Importamos nuestra lógica de negocio
+import migraciones
+import basedatos
+import importacion
+import exportacion
+import formatos
+import estadisticas
+import cola_resultados
+import simulacion
+from cache_dashboard import CacheDashboard, etag_dashboard
+from eventos import BUS
 
 # --- CONFIGURACIÓN DE LA APLICACIÓN Y BASE DE DATOS ---
+#
+# Importar este módulo no toca el disco ni la base de datos: el motor se crea en
+# su primer uso y el esquema se comprueba en la primera petición. Así el arranque
+# de cada worker (o de cada script que solo necesita las funciones) es corto.
 
 # Directorio base para la base de datos (gestor.db)
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'instance', 'gestor.db')
-# Creamos la carpeta 'instance' si no existe
-os.makedirs(os.path.join(BASE_DIR, 'instance'), exist_ok=True)
 
-# 1. Creación del motor de la base de datos SQLite
-ENGINE = create_engine(f"sqlite:///{DB_PATH}")
+# 1. Motor de la base de datos, creado en el primer uso. Por defecto SQLite en modo
+# WAL; con GESTOR_DB_URL (y GESTOR_DB_POOL_*) cualquier otra base de datos compartida
+# por varios workers, con su pool de conexiones (ver basedatos.py)
+_motor = None
+_fabrica_sesiones = None
+_lock_motor = threading.Lock()
 
-# 2. Inicialización de la base de datos
-# Crea las tablas si no existen, usando la definición de Base en models.py
-Base.metadata.create_all(ENGINE)
+def obtener_motor():
+    """Motor de la aplicación; la primera llamada lo crea (y la carpeta 'instance' si se usa SQLite local)."""
+    global _motor, _fabrica_sesiones
+    if _motor is None:
+        with _lock_motor:
+            if _motor is None:
+                url_por_defecto = f"sqlite:///{DB_PATH}"
+                opciones = basedatos.opciones_desde_entorno(url_por_defecto)
+                if opciones['url'] == url_por_defecto:
+                    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+                motor = basedatos.crear_motor(**opciones)
+                _fabrica_sesiones = sessionmaker(bind=motor)
+                _motor = motor
+    return _motor
+
+def nueva_sesion():
+    """Sesión nueva sobre el motor de la aplicación (fábrica de Session y de la cola de ingesta)."""
+    obtener_motor()
+    return _fabrica_sesiones()
+
+# 2. El esquema NO se crea al importar: se crea y actualiza con 'flask --app app migrar'
+# (una sola vez por despliegue, antes de arrancar los workers). Cada worker comprueba
+# en su primera petición que no haya migraciones pendientes (ver create_app)
 
 # 3. Configuración de la sesión de SQLAlchemy
 # scoped_session es esencial para una aplicación web (maneja hilos de ejecución)
-Session = scoped_session(sessionmaker(bind=ENGINE))
+Session = scoped_session(nueva_sesion)
+
+# 4. Caché del dashboard renderizado (por torneo y versión), limitada en memoria
+DASHBOARD_CACHE = CacheDashboard(
+    max_bytes=int(os.environ.get('GESTOR_CACHE_DASHBOARD_BYTES', 32 * 1024 * 1024))
+)
+
+# 5. Cola de ingesta asíncrona de resultados (un único escritor que aplica por lotes).
+# La usa siempre la API /api/torneos/<id>/resultados; con GESTOR_INGESTA_ASINCRONA=1
+# también el formulario del dashboard
+COLA_RESULTADOS = cola_resultados.ColaResultados(
+    nueva_sesion,
+    tamano_lote=int(os.environ.get('GESTOR_INGESTA_TAMANO_LOTE', cola_resultados.TAMANO_LOTE)),
+)
+INGESTA_ASINCRONA = os.environ.get('GESTOR_INGESTA_ASINCRONA') == '1'
+
+# 6. Rutas y comandos de línea de comandos: se declaran en este módulo y create_app
+# los registra en cada aplicación que crea
+_RUTAS = []  # (regla, vista, opciones de add_url_rule)
+CLI = AppGroup('gestor')
+
+def ruta(regla, **opciones):
+    """Como app.route, pero para la aplicación que cree create_app()."""
+    def registrar(vista):
+        _RUTAS.append((regla, vista, opciones))
+        return vista
+    return registrar
+
+_esquema_al_dia = False
+
+def _comprobar_esquema():
+    """
+    Antes de cada petición hasta la primera que lo confirma: si la base de datos
+    tiene migraciones pendientes, responde 503 en lugar de fallar con un error de SQL.
+    """
+    global _esquema_al_dia
+    if _esquema_al_dia or request.endpoint in ('static', 'metrics'):
+        return None
+    version = migraciones.version_esquema(obtener_motor())
+    if version < migraciones.VERSION_ACTUAL:
+        mensaje = (f"Error: La base de datos está en la versión {version} del esquema y la aplicación necesita "
+                   f"la {migraciones.VERSION_ACTUAL}. Ejecuta 'flask --app app migrar'.")
+        if request.path.startswith('/api/'):
+            return jsonify({'error': mensaje}), 503
+        return Response(mensaje, 503, mimetype='text/plain')
+    _esquema_al_dia = True
+    return None
 
 def create_app():
     """Función factoría para crear y configurar la aplicación Flask."""
@@ -30,31 +117,82 @@ def create_app():
     # Una clave secreta es necesaria para manejar sesiones y mensajes flash
     app.config['SECRET_KEY'] = 'una_clave_secreta_muy_segura' 
 
+    for regla, vista, opciones in _RUTAS:
+        app.add_url_rule(regla, view_func=vista, **opciones)
+    for comando in CLI.commands.values():
+        app.cli.add_command(comando)
+    app.before_request(_comprobar_esquema)
+
+    # Caché de plantillas compiladas en disco (GESTOR_CACHE_PLANTILLAS=<carpeta>): los
+    # workers nuevos cargan el bytecode en lugar de compilar cada plantilla en su primera petición
+    carpeta_plantillas = os.environ.get('GESTOR_CACHE_PLANTILLAS')
+    if carpeta_plantillas:
+        from jinja2 import FileSystemBytecodeCache
+        os.makedirs(carpeta_plantillas, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(carpeta_plantillas)
+
     # Middleware para manejar la sesión después de cada solicitud
     @app.teardown_appcontext
     def remove_session(exception=None):
         """Cierra la sesión de SQLAlchemy al final de la solicitud."""
         Session.remove()
 
-    return app
+    # Instrumentación opcional (GESTOR_INSTRUMENTACION=1): tiempos por petición,
+    # consultas SQL y plantillas en /metrics, y log de peticiones lentas y de consultas N+1.
+    # Se instala sobre la clase Engine porque el motor aún no existe
+    if os.environ.get('GESTOR_INSTRUMENTACION') == '1':
+        import instrumentacion
+        from sqlalchemy.engine import Engine
+        instrumentacion.instalar(
+            app, Engine,
+            fuentes={
+                'cache_dashboard': DASHBOARD_CACHE.estadisticas,
+                'concurrencia': lambda: dict(logic.estadisticas_concurrencia),
+                'sse': lambda: {'suscriptores': BUS.suscriptores()},
+                'ingesta': COLA_RESULTADOS.estadisticas,
+            },
+            umbral_lento_ms=int(os.environ.get('GESTOR_UMBRAL_LENTO_MS', 500)),
+        )
 
-app = create_app()
+    return app
 
 # --- RUTAS DE LA APLICACIÓN ---
 
-@app.route('/')
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 500
+
+def _parametros_listado():
+    """Lee 'despues', 'limite' y 'estado' de la query string (ValueError si no son válidos)."""
+    despues_de = request.args.get('despues', type=int)
+    limite = request.args.get('limite', TAMANO_PAGINA, type=int)
+    estado = request.args.get('estado') or None
+    if limite < 1 or limite > TAMANO_PAGINA_MAXIMO:
+        raise ValueError(f"El límite debe estar entre 1 y {TAMANO_PAGINA_MAXIMO}.")
+    if estado is not None and estado not in logic.ESTADOS_TORNEO:
+        raise ValueError(f"Estado no válido. Usa: {', '.join(logic.ESTADOS_TORNEO)}.")
+    return despues_de, limite, estado
+
+@ruta('/')
 def index():
-    """Ruta principal: Muestra la lista de torneos."""
+    """Ruta principal: Muestra la lista de torneos, paginada por id."""
+    try:
+        despues_de, limite, estado = _parametros_listado()
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('index'))
+
     session = Session()
-    torneos = session.query(Torneo).all()
-    return render_template('index.html', torneos=torneos)
+    torneos, cursor_siguiente = logic.listar_torneos(session, despues_de, limite, estado)
+    return render_template('index.html', torneos=torneos, cursor_siguiente=cursor_siguiente,
+                           es_primera_pagina=despues_de is None, estado=estado, limite=limite)
 
-@app.route('/crear', methods=['GET', 'POST'])
+@ruta('/crear', methods=['GET', 'POST'])
 def crear_torneo():
     """Muestra el formulario y procesa la creación de un nuevo torneo."""
     if request.method == 'POST':
         nombre = request.form.get('nombre')
         num_equipos = request.form.get('num_equipos')
+        formato = request.form.get('formato') or formatos.ELIMINACION_DIRECTA
         
         # Validaciones básicas del formulario
         if not nombre or not num_equipos:
@@ -69,7 +207,7 @@ def crear_torneo():
             
         session = Session()
         # Llamada a la lógica de negocio (tournament_logic.py)
-        nuevo_torneo, mensaje = logic.crear_nuevo_torneo(session, nombre, num_equipos)
+        nuevo_torneo, mensaje = logic.crear_nuevo_torneo(session, nombre, num_equipos, formato)
         
         if nuevo_torneo:
             flash(f'Torneo "{nombre}" creado con éxito. {mensaje}', 'success')
@@ -78,40 +216,65 @@ def crear_torneo():
             flash(f'Error al crear el torneo: {mensaje}', 'error')
             return redirect(url_for('crear_torneo'))
             
-    return render_template('crear_torneo.html')
+    return render_template('crear_torneo.html', formatos=formatos.NOMBRES_FORMATOS)
 
-@app.route('/torneo/<int:torneo_id>')
+@ruta('/torneo/<int:torneo_id>')
 def dashboard(torneo_id):
-    """Muestra el panel de control, equipos, y el bracket de un torneo."""
+    """
+    Muestra el panel de control, equipos, y el bracket de un torneo.
+    El HTML se guarda en caché por (torneo, versión) y se sirve con ETag: si el
+    torneo no ha cambiado, el navegador recibe un 304 sin volver a renderizar.
+    """
     session = Session()
-    torneo = session.get(Torneo, torneo_id)
+    version = session.query(Torneo.version).filter(Torneo.id == torneo_id).scalar()
     
-    if not torneo:
+    if version is None:
         flash('Torneo no encontrado.', 'error')
         return redirect(url_for('index'))
-        
-    # Obtener el estado del bracket y los partidos pendientes
-    partidos_pendientes = logic.obtener_partidos_pendientes(session, torneo_id)
-    
-    # Aquí es donde, en el futuro, se llamaría a una función que formatee 
-    # todos los partidos del torneo para mostrarlos como un bracket visual.
-    bracket_data = session.query(Partido).filter(Partido.torneo_id == torneo_id).all()
-    
-    return render_template('dashboard.html', 
-                           torneo=torneo, 
-                           equipos=torneo.equipos,
-                           partidos_pendientes=partidos_pendientes,
-                           bracket_data=bracket_data)
 
-# Si ejecutas el archivo directamente, inicia el servidor
-if __name__ == '__main__':
-    # Usamos host='0.0.0.0' para que sea accesible desde otros dispositivos en tu red
-    # (útil si estás usando un entorno como WSL o una VM)
-    app.run(debug=True, host='0.0.0.0')
+    # Con mensajes flash pendientes la página es única para este usuario: no se cachea
+    cacheable = '_flashes' not in sesion_web
+    etag = etag_dashboard(torneo_id, version)
+    if cacheable:
+        if request.if_none_match.contains_weak(etag):
+            return _respuesta_dashboard('', etag, status=304)
+        html = DASHBOARD_CACHE.obtener(torneo_id, version)
+        if html is not None:
+            return _respuesta_dashboard(html, etag)
+
+    # Torneo, equipos y partidos en dos consultas; rondas, pendientes y clasificación se derivan de ellas
+    datos = logic.obtener_datos_dashboard(session, torneo_id)
+    if datos is None:
+        flash('Torneo no encontrado.', 'error')
+        return redirect(url_for('index'))
+
+    html = render_template('dashboard.html', 
+                           torneo=datos['torneo'], 
+                           equipos=datos['equipos'],
+                           partidos_pendientes=datos['pendientes'],
+                           rondas=datos['rondas'],
+                           clasificacion=datos['clasificacion'])
+
+    if not cacheable:
+        return html
+    DASHBOARD_CACHE.guardar(torneo_id, version, html)
+    return _respuesta_dashboard(html, etag)
+
+def _respuesta_dashboard(html, etag, status=200):
+    """Respuesta del dashboard con ETag; el navegador debe revalidarla en cada visita."""
+    respuesta = make_response(html, status)
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+@ruta('/cache/estadisticas')
+def estadisticas_cache():
+    """Contadores de aciertos, fallos y memoria de la caché del dashboard."""
+    return jsonify(DASHBOARD_CACHE.estadisticas())
 
 # --- RUTAS DE ACCIÓN DEL TORNEO ---
 
-@app.route('/torneo/<int:torneo_id>/agregar_equipo', methods=['POST'])
+@ruta('/torneo/<int:torneo_id>/agregar_equipo', methods=['POST'])
 def agregar_equipo(torneo_id):
     """Procesa la adición de un nuevo equipo al torneo."""
     session = Session()
@@ -130,7 +293,7 @@ def agregar_equipo(torneo_id):
         
     return redirect(url_for('dashboard', torneo_id=torneo_id))
 
-@app.route('/torneo/<int:torneo_id>/generar_bracket', methods=['POST'])
+@ruta('/torneo/<int:torneo_id>/generar_bracket', methods=['POST'])
 def generar_bracket(torneo_id):
     """Genera la Ronda 1 del bracket si el torneo tiene el número correcto de equipos."""
     session = Session()
@@ -145,7 +308,7 @@ def generar_bracket(torneo_id):
     return redirect(url_for('dashboard', torneo_id=torneo_id))
 
 
-@app.route('/torneo/<int:torneo_id>/ingresar_resultado', methods=['POST'])
+@ruta('/torneo/<int:torneo_id>/ingresar_resultado', methods=['POST'])
 def ingresar_resultado_web(torneo_id):
     """Procesa el ingreso de resultados para un partido específico."""
     session = Session()
@@ -157,6 +320,16 @@ def ingresar_resultado_web(torneo_id):
     except (TypeError, ValueError):
         flash('Los marcadores deben ser números enteros.', 'error')
         return redirect(url_for('dashboard', torneo_id=torneo_id))
+
+    if INGESTA_ASINCRONA:
+        # Se confirma la recepción al momento; el panel se actualiza por SSE al aplicarse
+        error = cola_resultados.validar_marcadores(marcador_a, marcador_b)
+        if error:
+            flash(error, 'error')
+        else:
+            COLA_RESULTADOS.enviar(torneo_id, match_id, marcador_a, marcador_b)
+            flash(f'Resultado de {match_id} recibido ({marcador_a}-{marcador_b}). Se aplicará en unos instantes.', 'success')
+        return redirect(url_for('dashboard', torneo_id=torneo_id))
         
     exito, mensaje = logic.ingresar_resultado(session, torneo_id, match_id, marcador_a, marcador_b)
     
@@ -167,7 +340,24 @@ def ingresar_resultado_web(torneo_id):
         
     return redirect(url_for('dashboard', torneo_id=torneo_id))
 
-@app.route('/torneo/<int:torneo_id>/avanzar_ronda', methods=['POST'])
+@ruta('/torneo/<int:torneo_id>/corregir_resultado', methods=['POST'])
+def corregir_resultado_web(torneo_id):
+    """Corrige el resultado de un partido ya jugado (siempre de forma síncrona)."""
+    session = Session()
+    match_id = request.form.get('match_id')
+
+    try:
+        marcador_a = int(request.form.get('marcador_a'))
+        marcador_b = int(request.form.get('marcador_b'))
+    except (TypeError, ValueError):
+        flash('Los marcadores deben ser números enteros.', 'error')
+        return redirect(url_for('dashboard', torneo_id=torneo_id))
+
+    exito, mensaje = logic.corregir_resultado(session, torneo_id, match_id, marcador_a, marcador_b)
+    flash(mensaje, 'success' if exito else 'error')
+    return redirect(url_for('dashboard', torneo_id=torneo_id))
+
+@ruta('/torneo/<int:torneo_id>/avanzar_ronda', methods=['POST'])
 def avanzar_ronda_web(torneo_id):
     """Intenta avanzar a la siguiente ronda o declara al campeón."""
     session = Session()
@@ -185,6 +375,325 @@ def avanzar_ronda_web(torneo_id):
 
     return redirect(url_for('dashboard', torneo_id=torneo_id))
 
-# Añade esta línea al final de tu archivo app.py si aún no la tienes
+# --- STREAM DE EVENTOS EN VIVO (Server-Sent Events) ---
+
+@ruta('/torneo/<int:torneo_id>/eventos')
+def eventos_torneo(torneo_id):
+    """
+    Stream SSE con los cambios del torneo: partido_decidido, partido_generado,
+    ronda_generada, bracket_generado, equipo_agregado y campeon.
+    Admite la cabecera Last-Event-ID para recuperar eventos tras una reconexión.
+    """
+    session = Session()
+    existe = session.query(Torneo.id).filter(Torneo.id == torneo_id).scalar()
+    Session.remove()  # El stream no necesita la sesión: se libera la conexión
+    if existe is None:
+        return jsonify({'error': 'Error: Torneo no encontrado.'}), 404
+
+    desde = request.headers.get('Last-Event-ID', type=int)
+
+    def stream():
+        yield 'retry: 3000\n\n'
+        for evento in BUS.escuchar(torneo_id, desde=desde):
+            if evento is None:
+                yield ': keep-alive\n\n'
+                continue
+            secuencia, tipo, datos = evento
+            yield f"id: {secuencia}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Evita que un proxy nginx acumule el stream
+    })
+
+# --- API JSON DE LECTURA ---
+
+@ruta('/api/torneos')
+def api_torneos():
+    """
+    Listado de torneos en JSON, paginado por id.
+    Parámetros: despues (cursor), limite (1-500) y estado ('en_curso' o 'finalizado').
+    """
+    try:
+        despues_de, limite, estado = _parametros_listado()
+    except ValueError as e:
+        return jsonify({'error': f"Error: {e}"}), 400
+
+    session = Session()
+    torneos, cursor_siguiente = logic.listar_torneos(session, despues_de, limite, estado)
+    return jsonify({
+        'torneos': [dict(fila._mapping) for fila in torneos],
+        'siguiente': cursor_siguiente,
+    })
+
+@ruta('/api/torneos/<int:torneo_id>/bracket')
+def api_bracket(torneo_id):
+    """Estado compacto del bracket de un torneo, con ETag según su versión."""
+    session = Session()
+    datos = logic.obtener_bracket_compacto(session, torneo_id)
+    if datos is None:
+        return jsonify({'error': 'Error: Torneo no encontrado.'}), 404
+
+    respuesta = jsonify(datos)
+    respuesta.set_etag(etag_dashboard(torneo_id, datos['version']), weak=True)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta.make_conditional(request)
+
+@ruta('/api/torneos/<int:torneo_id>/probabilidades')
+def api_probabilidades(torneo_id):
+    """
+    Probabilidades de cada equipo de alcanzar cada ronda y de ser campeón, por
+    simulación de Monte Carlo del resto del bracket (solo eliminación directa).
+    Parámetro: simulaciones (1000-1000000, 100000 por defecto). Requiere NumPy.
+    """
+    simulaciones = request.args.get('simulaciones', simulacion.SIMULACIONES, type=int)
+    if not 1000 <= simulaciones <= simulacion.MAX_SIMULACIONES:
+        return jsonify({'error': f"Error: Las simulaciones deben estar entre 1000 y {simulacion.MAX_SIMULACIONES}."}), 400
+    if not simulacion.numpy_disponible():
+        return jsonify({'error': 'Error: La simulación necesita NumPy (pip install numpy).'}), 501
+
+    session = Session()
+    try:
+        datos = simulacion.obtener_probabilidades(session, torneo_id, simulaciones)
+    except ValueError as e:
+        return jsonify({'error': f"Error: {e}"}), 400
+    if datos is None:
+        return jsonify({'error': 'Error: Torneo no encontrado.'}), 404
+
+    respuesta = jsonify(datos)
+    respuesta.set_etag(f"{etag_dashboard(torneo_id, datos['version'])}-s{simulaciones}", weak=True)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta.make_conditional(request)
+
+@ruta('/api/torneos/<int:torneo_id>/resultados', methods=['POST'])
+def api_enviar_resultados(torneo_id):
+    """
+    Envía uno o varios resultados a la cola de ingesta y responde 202 al momento.
+    Cuerpo JSON: {"match_id", "marcador_a", "marcador_b"[, "clave"]} o una lista de
+    ellos. La cabecera Idempotency-Key hace de "clave" en un envío individual.
+    Cada envío retornado incluye su id para consultar su estado.
+    """
+    cuerpo = request.get_json(silent=True)
+    individual = isinstance(cuerpo, dict)
+    envios = [cuerpo] if individual else cuerpo
+    if not isinstance(envios, list) or not envios:
+        return jsonify({'error': 'Error: Se esperaba un resultado o una lista de resultados en JSON.'}), 400
+
+    resultados, errores = [], []
+    for posicion, envio in enumerate(envios):
+        try:
+            match_id = str(envio['match_id'])
+            marcador_a, marcador_b = int(envio['marcador_a']), int(envio['marcador_b'])
+        except (TypeError, KeyError, ValueError):
+            errores.append({'posicion': posicion, 'error': 'Error: Faltan match_id o marcadores enteros.'})
+            continue
+        error = cola_resultados.validar_marcadores(marcador_a, marcador_b)
+        if error:
+            errores.append({'posicion': posicion, 'error': error})
+            continue
+        clave = envio.get('clave') or (request.headers.get('Idempotency-Key') if individual else None)
+        resultados.append((match_id, marcador_a, marcador_b, clave))
+    if errores:
+        return jsonify({'errores': errores}), 400
+
+    respuesta = []
+    for match_id, marcador_a, marcador_b, clave in resultados:
+        envio, nuevo = COLA_RESULTADOS.enviar(torneo_id, match_id, marcador_a, marcador_b, clave)
+        respuesta.append(dict(envio.como_dict(), duplicado=not nuevo,
+                              estado_url=url_for('api_estado_envio', envio_id=envio.id)))
+    return jsonify({'envios': respuesta}), 202
+
+@ruta('/api/resultados/<envio_id>')
+def api_estado_envio(envio_id):
+    """Estado de un envío de la cola de ingesta: en_cola, aplicado o rechazado (con su mensaje)."""
+    envio = COLA_RESULTADOS.obtener(envio_id)
+    if envio is None:
+        return jsonify({'error': 'Error: Envío no encontrado.'}), 404
+    return jsonify(envio.como_dict())
+
+@ruta('/api/estadisticas/top')
+def api_estadisticas_top():
+    """
+    Ranking global de equipos. Parámetros: criterio ('victorias', 'diferencia',
+    'goles' o 'campeonatos') y limite (1-500).
+    """
+    criterio = request.args.get('criterio', 'victorias')
+    limite = request.args.get('limite', 10, type=int)
+    if criterio not in estadisticas.CRITERIOS:
+        return jsonify({'error': f"Error: Criterio desconocido. Usa uno de: {', '.join(estadisticas.CRITERIOS)}."}), 400
+    if not 1 <= limite <= TAMANO_PAGINA_MAXIMO:
+        return jsonify({'error': f"Error: El límite debe estar entre 1 y {TAMANO_PAGINA_MAXIMO}."}), 400
+
+    session = Session()
+    return jsonify({'criterio': criterio, 'equipos': estadisticas.obtener_top(session, criterio, limite)})
+
+@ruta('/api/exportar/<tabla>')
+def api_exportar(tabla):
+    """
+    Exporta en streaming una tabla (torneos, equipos, inscripciones, partidos o eventos).
+    Parámetros: formato ('csv', 'jsonl' o 'parquet'; este requiere pyarrow) y
+    desde (marca de agua de una exportación anterior: solo las filas cambiadas
+    después). La cabecera X-Marca-Agua trae la marca para la siguiente exportación.
+    La marca es una hora con exportacion.HOLGURA_S segundos de holgura: una fila
+    cuya transacción confirme más tarde solo la recupera una exportación completa.
+    """
+    formato = request.args.get('formato', 'csv')
+    desde = request.args.get('desde', type=float)
+    if 'desde' in request.args and desde is None:
+        return jsonify({'error': 'Error: La marca de agua debe ser un número.'}), 400
+    try:
+        exportar = exportacion.Exportacion(obtener_motor(), tabla, formato, desde)
+    except ValueError as e:
+        return jsonify({'error': f"Error: {e}"}), 400
+    if formato == 'parquet' and not exportacion.parquet_disponible():
+        return jsonify({'error': 'Error: La exportación a Parquet necesita pyarrow (pip install pyarrow).'}), 501
+
+    return Response(iter(exportar), content_type=exportar.tipo_contenido, headers={
+        'Content-Disposition': f'attachment; filename="{exportar.nombre_archivo}"',
+        'X-Marca-Agua': repr(exportar.marca),
+    })
+
+@CLI.command('migrar')
+def migrar_cli():
+    """Crea el esquema de la base de datos o aplica las migraciones pendientes."""
+    aplicadas = migraciones.migrar(obtener_motor())
+    if aplicadas:
+        click.echo(f"Migraciones aplicadas: {', '.join(map(str, aplicadas))}.")
+    else:
+        click.echo(f"Esquema al día (versión {migraciones.VERSION_ACTUAL}).")
+
+@CLI.command('reconstruir-estadisticas')
+def reconstruir_estadisticas_cli():
+    """Recalcula las estadísticas globales de los equipos desde el historial de partidos."""
+    session = Session()
+    equipos = estadisticas.reconstruir(session)
+    session.commit()
+    Session.remove()
+    click.echo(f"Estadísticas reconstruidas para {equipos} equipos.")
+
+@CLI.command('reconstruir-partidos')
+@click.argument('torneo_ids', nargs=-1, type=int)
+def reconstruir_partidos_cli(torneo_ids):
+    """Reconstruye los partidos de los torneos indicados (o de todos) desde su registro de eventos."""
+    session = Session()
+    if not torneo_ids:
+        torneo_ids = [torneo_id for torneo_id, in session.query(Torneo.id).order_by(Torneo.id)]
+    for torneo_id in torneo_ids:
+        exito, mensaje = logic.reconstruir_partidos(session, torneo_id)
+        click.echo(mensaje, err=not exito)
+    equipos = estadisticas.reconstruir(session)
+    session.commit()
+    Session.remove()
+    click.echo(f"Estadísticas reconstruidas para {equipos} equipos.")
+
+# --- IMPORTACIÓN MASIVA ---
+
+@ruta('/importar', methods=['POST'])
+def importar():
+    """
+    Importa muchos torneos con sus equipos desde CSV o JSON, ya sea como archivo
+    ('archivo' en un formulario multipart) o en el cuerpo de la petición.
+    Con ?generar_bracket=1 también genera la Ronda 1 de cada torneo.
+    """
+    generar_bracket = request.args.get('generar_bracket', '').lower() in ('1', 'true', 'si', 'sí')
+    archivo = request.files.get('archivo')
+
+    try:
+        if archivo:
+            texto = archivo.read().decode('utf-8-sig')
+            formato = importacion.formato_por_extension(archivo.filename)
+        else:
+            texto = request.get_data(as_text=True)
+            formato = 'json' if request.is_json else ('csv' if request.mimetype == 'text/csv' else None)
+        torneos = importacion.leer_torneos(texto, formato)
+    except ValueError as e:
+        return jsonify({'error': f"Error: No se pudo leer el archivo de importación. {e}"}), 400
+
+    resumen = importacion.importar_torneos(Session(), torneos, generar_bracket)
+    codigo = 400 if resumen['errores'] and not resumen['torneos_creados'] else 200
+    return jsonify(resumen), codigo
+
+@CLI.command('importar')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--generar-bracket', is_flag=True, help='Genera también la Ronda 1 de cada torneo.')
+def importar_cli(archivo, generar_bracket):
+    """Importa torneos y equipos desde un archivo CSV o JSON."""
+    try:
+        with open(archivo, encoding='utf-8-sig') as f:
+            torneos = importacion.leer_torneos(f.read(), importacion.formato_por_extension(archivo))
+    except ValueError as e:
+        raise click.ClickException(f"No se pudo leer el archivo de importación. {e}")
+
+    resumen = importacion.importar_torneos(Session(), torneos, generar_bracket)
+    Session.remove()
+
+    click.echo(f"Torneos creados: {len(resumen['torneos_creados'])}, equipos: {resumen['equipos']}, "
+               f"partidos: {resumen['partidos']}")
+    click.echo(f"{resumen['filas']} filas en {resumen['segundos']} s ({resumen['filas_por_segundo']} filas/s)")
+    for error in resumen['errores']:
+        click.echo(f"  Torneo #{error['torneo']} ({error['nombre']}): {error['error']}", err=True)
+
+@CLI.command('exportar')
+@click.argument('tabla', type=click.Choice(list(exportacion.TABLAS)))
+@click.option('--formato', type=click.Choice(exportacion.FORMATOS), default='csv', show_default=True)
+@click.option('--salida', type=click.Path(dir_okay=False), help='Archivo de salida (por defecto, la salida estándar).')
+@click.option('--desde', type=float, help='Marca de agua: exporta solo las filas cambiadas después.')
+@click.option('--marca', 'archivo_marca', type=click.Path(dir_okay=False),
+              help='Archivo con las marcas de agua por tabla: se lee como --desde y se actualiza al terminar.')
+@click.option('--lote', type=int, default=exportacion.TAMANO_LOTE, show_default=True, help='Filas por lote.')
+def exportar_cli(tabla, formato, salida, desde, archivo_marca, lote):
+    """
+    Exporta una tabla en streaming a CSV, JSON Lines o Parquet (completa o incremental).
+
+    La marca de agua es una hora (time.time()) con unos segundos de holgura
+    (exportacion.HOLGURA_S): una fila cuya transacción confirme más tarde que eso
+    no entra en ninguna exportación incremental posterior. Haz de vez en cuando
+    una exportación completa para recuperarlas.
+    """
+    if formato == 'parquet' and not exportacion.parquet_disponible():
+        click.echo("Error: La exportación a Parquet necesita pyarrow (pip install pyarrow).", err=True)
+        raise SystemExit(1)
+    if desde is None and archivo_marca:
+        desde = exportacion.leer_marca(archivo_marca, tabla)
+
+    exportar = exportacion.Exportacion(obtener_motor(), tabla, formato, desde, lote)
+    inicio = time.perf_counter()
+    destino = open(salida, 'wb') if salida else click.get_binary_stream('stdout')
+    try:
+        for trozo in exportar:
+            destino.write(trozo)
+    finally:
+        if salida:
+            destino.close()
+    segundos = time.perf_counter() - inicio
+    if archivo_marca:
+        exportacion.guardar_marca(archivo_marca, exportar)
+
+    click.echo(f"{exportar.filas} filas de '{tabla}' exportadas en {segundos:.2f} s "
+               f"({exportar.filas / segundos if segundos else 0:.0f} filas/s). Marca de agua: {exportar.marca!r}",
+               err=True)
+
+@CLI.command('precompilar-plantillas')
+def precompilar_plantillas_cli():
+    """Compila todas las plantillas en la caché de GESTOR_CACHE_PLANTILLAS (una vez por despliegue)."""
+    from flask import current_app
+    entorno = current_app.jinja_env
+    if entorno.bytecode_cache is None:
+        click.echo("Error: Define GESTOR_CACHE_PLANTILLAS con la carpeta de la caché de plantillas.", err=True)
+        raise SystemExit(1)
+    plantillas = entorno.list_templates()
+    for nombre in plantillas:
+        entorno.get_template(nombre)
+    click.echo(f"Plantillas compiladas: {len(plantillas)}.")
+
+# Aplicación para 'flask --app app' y los servidores WSGI (gunicorn app:app). Crearla
+# no abre la base de datos: el motor se crea con la primera petición
+app = create_app()
+
+# Si ejecutas el archivo directamente, inicia el servidor
 if __name__ == '__main__':
+    # En desarrollo, el servidor local aplica las migraciones pendientes al arrancar
+    migraciones.migrar(obtener_motor())
+    # Usamos host='0.0.0.0' para que sea accesible desde otros dispositivos en tu red
+    # (útil si estás usando un entorno como WSL o una VM)
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+from sqlalchemy import create_engine, event
+
+# ==============================================================================
+# CREACIÓN Y CONFIGURACIÓN DEL MOTOR DE BASE DE DATOS
+# ==============================================================================
+
+# Tiempo máximo que una escritura espera a que se libere el bloqueo de SQLite
+BUSY_TIMEOUT_MS = 10000
+
+# Variables de entorno -> (opción de crear_motor, conversión)
+VARIABLES_POOL = {
+    'GESTOR_DB_POOL_SIZE': ('pool_size', int),
+    'GESTOR_DB_MAX_OVERFLOW': ('max_overflow', int),
+    'GESTOR_DB_POOL_PRE_PING': ('pool_pre_ping', lambda valor: valor.lower() in ('1', 'true', 'si', 'sí')),
+    'GESTOR_DB_POOL_RECYCLE': ('pool_recycle', int),
+    'GESTOR_DB_POOL_TIMEOUT': ('pool_timeout', int),
+}
+
+
+def configurar_sqlite(conexion_dbapi, _registro):
+    """
+    PRAGMAs aplicados a cada conexión SQLite nueva:
+    - WAL: los lectores no bloquean al escritor (ni al revés).
+    - synchronous=NORMAL: seguro con WAL y con muchos menos fsync por commit.
+    - busy_timeout: un escritor concurrente espera en lugar de fallar con 'database is locked'.
+    """
+    cursor = conexion_dbapi.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA cache_size=-16000")  # ~16 MB de caché de páginas
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def opciones_desde_entorno(url_por_defecto, entorno=None):
+    """
+    Configuración del motor a partir de las variables de entorno: GESTOR_DB_URL
+    (por defecto 'url_por_defecto') y las opciones del pool de VARIABLES_POOL que
+    estén definidas. Retorna los argumentos de crear_motor.
+    """
+    entorno = os.environ if entorno is None else entorno
+    opciones = {'url': entorno.get('GESTOR_DB_URL') or url_por_defecto}
+    for variable, (opcion, convertir) in VARIABLES_POOL.items():
+        if entorno.get(variable):
+            opciones[opcion] = convertir(entorno[variable])
+    return opciones
+
+
+def crear_motor(url, **opciones_pool):
+    """
+    Crea el motor de SQLAlchemy para 'url'. 'opciones_pool' (pool_size,
+    max_overflow, pool_pre_ping, pool_recycle, pool_timeout) se pasan tal cual a
+    create_engine. SQLite recibe además sus PRAGMAs; en los demás servidores la
+    conexión se comprueba antes de usarla (pre-ping) salvo que se indique lo contrario.
+    """
+    if url.startswith('sqlite'):
+        engine = create_engine(url, connect_args={'timeout': BUSY_TIMEOUT_MS / 1000}, **opciones_pool)
+        event.listen(engine, 'connect', configurar_sqlite)
+        return engine
+    opciones_pool.setdefault('pool_pre_ping', True)
+    return create_engine(url, **opciones_pool)
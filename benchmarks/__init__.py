@@ -0,0 +1,2 @@
+# Benchmarks del gestor de torneos. Se ejecutan desde la raíz del repositorio:
+#   python -m benchmarks.<nombre_del_script>
@@ -0,0 +1,148 @@
+"""
+Benchmark del arranque en frío de la aplicación, con presupuesto de tiempo.
+
+Uso:
+    python -m benchmarks.bench_arranque [--repeticiones 5]
+        [--presupuesto-import-ms 1000] [--presupuesto-primera-ms 100]
+        [--salida benchmarks/resultados/arranque.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Cada repetición arranca un proceso de Python nuevo (como un worker recién
+lanzado) contra un SQLite temporal ya migrado con un torneo, y mide:
+    import             importar app (módulos, create_app y registro de rutas)
+    primera_indice     primera petición a / (crea el motor, comprueba el esquema
+                       y compila las plantillas)
+    primera_dashboard  primera petición al dashboard del torneo
+    segunda_indice     segunda petición a /, ya en caliente (referencia)
+    proceso            duración total del proceso, intérprete incluido
+en dos escenarios: 'frio' (sin caché de plantillas) y 'plantillas' (con
+GESTOR_CACHE_PLANTILLAS ya precompilada). Se informa de la mediana y el máximo.
+
+El proceso termina con código 1 si la mediana de 'import' supera
+--presupuesto-import-ms o la de alguna primera petición supera
+--presupuesto-primera-ms (y, con --comparar, si hay regresiones).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import importacion
+from benchmarks.comun import (crear_motor_temporal, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código del proceso hijo: retorna sus medidas en JSON por la salida estándar
+_HIJO = r"""
+import json, sys, time
+inicio = time.perf_counter()
+import app
+medidas = {'import': (time.perf_counter() - inicio) * 1000}
+cliente = app.app.test_client()
+for nombre, url in (('primera_indice', '/'), ('primera_dashboard', sys.argv[1]), ('segunda_indice', '/')):
+    inicio = time.perf_counter()
+    respuesta = cliente.get(url)
+    medidas[nombre] = (time.perf_counter() - inicio) * 1000
+    assert respuesta.status_code == 200, (url, respuesta.status_code)
+print(json.dumps(medidas))
+"""
+
+PRIMERAS_PETICIONES = ('primera_indice', 'primera_dashboard')
+
+
+def _preparar_base_datos():
+    """SQLite temporal migrado con un torneo de 16 equipos y su bracket. Retorna (url, ruta del dashboard)."""
+    engine, Session = crear_motor_temporal()
+    session = Session()
+    torneo_id = importacion.importar_torneos(session, [{
+        'nombre': 'Arranque', 'equipos': [f'A_E{e}' for e in range(16)],
+    }], generar_bracket=True)['torneos_creados'][0]['id']
+    session.close()
+    engine.dispose()
+    return engine.url.render_as_string(hide_password=False), f'/torneo/{torneo_id}'
+
+
+def _arrancar(entorno, ruta_dashboard):
+    """Lanza un proceso hijo y retorna sus medidas (ms), con la duración total del proceso."""
+    inicio = time.perf_counter()
+    salida = subprocess.run([sys.executable, '-c', _HIJO, ruta_dashboard], cwd=RAIZ, env=entorno,
+                            capture_output=True, text=True)
+    proceso = (time.perf_counter() - inicio) * 1000
+    if salida.returncode != 0:
+        raise RuntimeError(f"El proceso de arranque falló:\n{salida.stderr}")
+    return dict(json.loads(salida.stdout.strip().splitlines()[-1]), proceso=proceso)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--presupuesto-import-ms', type=float, default=1000)
+    parser.add_argument('--presupuesto-primera-ms', type=float, default=100)
+    parser.add_argument('--salida', default='benchmarks/resultados/arranque.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    url, ruta_dashboard = _preparar_base_datos()
+    presupuestos = dict.fromkeys(PRIMERAS_PETICIONES, args.presupuesto_primera_ms)
+    presupuestos['import'] = args.presupuesto_import_ms
+
+    resultados = {
+        'benchmark': 'arranque', 'metadatos': metadatos(),
+        'parametros': {'repeticiones': args.repeticiones, 'presupuestos_ms': presupuestos},
+        'resultados': [],
+    }
+    filas, excedidos = [], []
+    entorno_base = dict(os.environ, GESTOR_DB_URL=url, PYTHONPATH=RAIZ)
+    entorno_base.pop('GESTOR_CACHE_PLANTILLAS', None)
+    escenarios = {
+        'frio': entorno_base,
+        'plantillas': dict(entorno_base, GESTOR_CACHE_PLANTILLAS=tempfile.mkdtemp(prefix='gestor_plantillas_')),
+    }
+    for escenario, entorno in escenarios.items():
+        if escenario == 'plantillas':
+            _arrancar(entorno, ruta_dashboard)  # llena la caché de plantillas
+        medidas = [_arrancar(entorno, ruta_dashboard) for _ in range(args.repeticiones)]
+        for medida in ('import', 'primera_indice', 'primera_dashboard', 'segunda_indice', 'proceso'):
+            valores = [m[medida] for m in medidas]
+            presupuesto = presupuestos.get(medida)
+            resultado = {
+                'escenario': escenario, 'medida': medida,
+                'mediana_ms': round(statistics.median(valores), 2), 'max_ms': round(max(valores), 2),
+                'presupuesto_ms': presupuesto,
+            }
+            if presupuesto is not None and resultado['mediana_ms'] > presupuesto:
+                excedidos.append(resultado)
+            resultados['resultados'].append(resultado)
+            filas.append([escenario, medida, resultado['mediana_ms'], resultado['max_ms'],
+                          presupuesto if presupuesto is not None else '-',
+                          '-' if presupuesto is None else ('EXCEDIDO' if resultado['mediana_ms'] > presupuesto else 'ok')])
+
+    imprimir_tabla(['escenario', 'medida', 'mediana_ms', 'max_ms', 'presupuesto_ms', 'estado'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+
+    codigo = 0
+    if excedidos:
+        print(f"\n{len(excedidos)} medidas por encima de su presupuesto:")
+        for resultado in excedidos:
+            print(f"  {resultado['escenario']} / {resultado['medida']}: "
+                  f"{resultado['mediana_ms']} ms > {resultado['presupuesto_ms']} ms")
+        codigo = 1
+    if args.comparar:
+        codigo = max(codigo, informar_comparacion(resultados, args.comparar, ('escenario', 'medida'), 'mediana_ms',
+                                                  args.tolerancia))
+    sys.exit(codigo)
+
+
+if __name__ == '__main__':
+    main()
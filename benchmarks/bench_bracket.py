@@ -0,0 +1,66 @@
+"""
+Micro-benchmarks del motor de bracket en memoria (bracket.ArbolBracket).
+
+Uso:
+    python -m benchmarks.bench_bracket [--max-equipos 65536]
+
+Para cada tamaño de 2 a --max-equipos mide la construcción del árbol, el coste
+de avanzar a cada ganador hasta la final y la conversión match_id -> nodo.
+"""
+import argparse
+import time
+
+import bracket
+from benchmarks.comun import imprimir_tabla
+
+
+def _jugar_bracket(arbol):
+    """Registra como ganador al equipo A de cada partido, ronda a ronda. Retorna nº de avances."""
+    avances = 0
+    for ronda in range(1, arbol.num_rondas + 1):
+        for nodo in arbol.nodos_de_ronda(ronda):
+            arbol.registrar_ganador(nodo, arbol.equipos_de(nodo)[0])
+            avances += 1
+    return avances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-equipos', type=int, default=65536)
+    args = parser.parse_args()
+
+    filas = []
+    tamano = 2
+    while tamano <= args.max_equipos:
+        nombres = [f'Equipo {i}' for i in range(tamano)]
+        bracket._IDS_POR_TAMANO.pop(tamano, None)
+
+        inicio = time.perf_counter()
+        arbol = bracket.ArbolBracket(tamano)
+        arbol.colocar_equipos(nombres)
+        construccion = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        avances = _jugar_bracket(arbol)
+        avance = time.perf_counter() - inicio
+
+        ids = [arbol.match_id(nodo) for nodo in range(1, tamano)]
+        inicio = time.perf_counter()
+        for match_id in ids:
+            arbol.nodo(match_id)
+        busqueda = time.perf_counter() - inicio
+
+        assert arbol.ganador(1) == nombres[0]
+        filas.append([
+            tamano,
+            f'{construccion * 1000:.3f}',
+            f'{avance / avances * 1e9:.0f}',
+            f'{busqueda / len(ids) * 1e9:.0f}',
+        ])
+        tamano *= 2
+
+    imprimir_tabla(['equipos', 'construccion_ms', 'ns_por_avance', 'ns_por_busqueda'], filas)
+
+
+if __name__ == '__main__':
+    main()
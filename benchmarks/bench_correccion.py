@@ -0,0 +1,126 @@
+"""
+Benchmark de la corrección de resultados en brackets de eliminación directa.
+
+Uso:
+    python -m benchmarks.bench_correccion [--equipos 256,1024,4096] [--repeticiones 30]
+        [--salida benchmarks/resultados/correccion.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Para cada tamaño juega un torneo completo (en un SQLite temporal) y después,
+--repeticiones veces, corrige un partido de la Ronda 1 al azar invirtiendo su
+marcador. Como el torneo está terminado, es el peor caso: cambia el ganador y
+hay que corregir todo su camino hasta la final (una ronda por nivel). Tras cada
+corrección se vuelven a jugar los partidos reabiertos hasta tener campeón.
+Se informa de:
+    correccion  corregir_resultado (ms) y partidos reescritos o eliminados
+    ingreso     ingresar_resultado de los partidos que se vuelven a jugar (ms)
+Si la corrección recorre solo el camino afectado, su coste crece con el número
+de rondas (log2 de los equipos) y no con el tamaño del bracket.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+import tournament_logic as logic
+import importacion
+import registro_eventos
+from models import EventoTorneo, Partido, Torneo
+from benchmarks.comun import (crear_motor_temporal, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion, percentil)
+
+
+def _jugar(session, torneo_id, rng, tiempos):
+    """Ingresa resultados al azar hasta tener campeón, anotando la duración de cada uno en 'tiempos'."""
+    while session.get(Torneo, torneo_id).campeon is None:
+        for partido in logic.obtener_partidos_pendientes(session, torneo_id):
+            marcador_a, marcador_b = rng.sample(range(6), 2)
+            inicio = time.perf_counter()
+            exito, mensaje = logic.ingresar_resultado(session, torneo_id, partido.match_id, marcador_a, marcador_b)
+            tiempos.append(time.perf_counter() - inicio)
+            assert exito, mensaje
+        session.expire_all()
+
+
+def _partidos_tocados(session, torneo_id):
+    """Partidos reescritos o eliminados por la última corrección, según el registro de eventos."""
+    datos, = session.query(EventoTorneo.datos).filter(
+        EventoTorneo.torneo_id == torneo_id, EventoTorneo.tipo == registro_eventos.RESULTADO_INGRESADO
+    ).order_by(EventoTorneo.id.desc()).first()
+    datos = json.loads(datos)
+    return len(datos.get('actualizados', ())) + len(datos.get('eliminados', ()))
+
+
+def _medir(num_equipos, repeticiones):
+    _, Session = crear_motor_temporal()
+    session = Session()
+    torneo_id = importacion.importar_torneos(session, [{
+        'nombre': f'Correccion {num_equipos}', 'equipos': [f'C{num_equipos}_E{e}' for e in range(num_equipos)],
+    }], generar_bracket=True)['torneos_creados'][0]['id']
+    rng = random.Random(num_equipos)
+    _jugar(session, torneo_id, rng, [])
+    ronda_1 = [match_id for match_id, in session.query(Partido.match_id).filter(
+        Partido.torneo_id == torneo_id, Partido.ronda_num == 1)]
+
+    correcciones, tocados, ingresos = [], [], []
+    for _ in range(repeticiones):
+        match_id = rng.choice(ronda_1)
+        partido = session.query(Partido).filter(
+            Partido.torneo_id == torneo_id, Partido.match_id == match_id).one()
+        marcador_a, marcador_b = partido.marcador_b, partido.marcador_a
+        inicio = time.perf_counter()
+        exito, mensaje = logic.corregir_resultado(session, torneo_id, match_id, marcador_a, marcador_b)
+        correcciones.append(time.perf_counter() - inicio)
+        assert exito, mensaje
+        tocados.append(_partidos_tocados(session, torneo_id))
+        session.expire_all()
+        _jugar(session, torneo_id, rng, ingresos)
+    session.close()
+    return correcciones, tocados, ingresos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', default='256,1024,4096', help='Tamaños de bracket separados por comas.')
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--salida', default='benchmarks/resultados/correccion.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    resultados = {
+        'benchmark': 'correccion', 'metadatos': metadatos(),
+        'parametros': {'repeticiones': args.repeticiones}, 'resultados': [],
+    }
+    filas = []
+    for num_equipos in [int(e) for e in args.equipos.split(',')]:
+        correcciones, tocados, ingresos = _medir(num_equipos, args.repeticiones)
+        for operacion, segundos in (('correccion', correcciones), ('ingreso', ingresos)):
+            milisegundos = [s * 1000 for s in segundos]
+            resultado = {
+                'equipos': num_equipos, 'rondas': (num_equipos - 1).bit_length(), 'operacion': operacion,
+                'operaciones': len(milisegundos),
+                'mediana_ms': round(statistics.median(milisegundos), 3),
+                'p95_ms': round(percentil(milisegundos, 0.95), 3),
+                'partidos_tocados': round(statistics.mean(tocados), 2) if operacion == 'correccion' else None,
+            }
+            resultados['resultados'].append(resultado)
+            filas.append([resultado[c] if resultado[c] is not None else '-' for c in (
+                'equipos', 'rondas', 'operacion', 'operaciones', 'mediana_ms', 'p95_ms', 'partidos_tocados')])
+
+    imprimir_tabla(['equipos', 'rondas', 'operacion', 'operaciones', 'mediana_ms', 'p95_ms', 'partidos_tocados'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, ('equipos', 'operacion'), 'mediana_ms',
+                                      args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
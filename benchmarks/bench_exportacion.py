@@ -0,0 +1,150 @@
+"""
+Benchmark de la exportación en streaming de partidos (filas por segundo y memoria).
+
+Uso:
+    python -m benchmarks.bench_exportacion [--filas 100000,1000000] [--formatos csv,jsonl,parquet]
+        [--cambiadas 0.01] [--lote 10000] [--salida benchmarks/resultados/exportacion.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Para cada tamaño llena un SQLite temporal con --filas partidos (torneos de 1000
+partidos) y, para cada formato, mide:
+    completa     exportación de toda la tabla
+    incremental  exportación de los partidos cambiados desde una marca de agua: el
+                 resultado de una fracción --cambiadas de ellos
+Se informa de las filas por segundo (escribiendo en os.devnull) y del pico de
+memoria reservada por Python durante la exportación (tracemalloc, en una
+pasada aparte porque lo ralentiza): si la exportación es en streaming, el pico
+no crece con el número de filas. Parquet solo se mide si pyarrow está instalado.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import insert, update
+
+import exportacion
+from models import Equipo, Partido, Torneo
+from benchmarks.comun import (crear_motor_temporal, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion)
+
+PARTIDOS_POR_TORNEO = 1000
+FILAS_POR_INSERCION = 50000
+NUM_EQUIPOS = 1000
+
+
+def _llenar(engine, num_filas):
+    """
+    Inserta num_filas partidos sin resultado repartidos en torneos de
+    PARTIDOS_POR_TORNEO, entre NUM_EQUIPOS equipos del registro.
+    """
+    num_torneos = -(-num_filas // PARTIDOS_POR_TORNEO)
+    with engine.begin() as conexion:
+        conexion.execute(insert(Torneo), [
+            {'id': t, 'nombre': f'Exportacion {t}', 'num_equipos': PARTIDOS_POR_TORNEO + 1}
+            for t in range(1, num_torneos + 1)])
+        conexion.execute(insert(Equipo), [
+            {'id': e, 'nombre': f'Equipo {e}', 'nombre_normalizado': f'equipo {e}'}
+            for e in range(1, NUM_EQUIPOS + 1)])
+        for inicio in range(0, num_filas, FILAS_POR_INSERCION):
+            conexion.execute(insert(Partido), [{
+                'torneo_id': i // PARTIDOS_POR_TORNEO + 1, 'match_id': f'R1_P{i % PARTIDOS_POR_TORNEO + 1}',
+                'ronda_nombre': 'Ronda 1', 'ronda_num': 1,
+                'equipo_a_id': i % NUM_EQUIPOS + 1, 'equipo_b_id': (i + 1) % NUM_EQUIPOS + 1,
+            } for i in range(inicio, min(inicio + FILAS_POR_INSERCION, num_filas))])
+
+
+def _cambiar(engine, num_filas, fraccion, rng):
+    """Registra un resultado en una fracción de los partidos (actualiza su 'actualizado_en')."""
+    ids = rng.sample(range(1, num_filas + 1), max(1, int(num_filas * fraccion)))
+    with engine.begin() as conexion:
+        conexion.execute(update(Partido).where(Partido.id.in_(ids)).values(
+            marcador_a=2, marcador_b=1, ganador_id=Partido.equipo_a_id))
+    return len(ids)
+
+
+def _exportar(engine, formato, desde, lote, medir_memoria=False):
+    """Exporta los partidos a os.devnull. Retorna (exportacion, segundos, pico de memoria en bytes)."""
+    if medir_memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    exportar = exportacion.Exportacion(engine, 'partidos', formato, desde, lote)
+    with open(os.devnull, 'wb') as destino:
+        for trozo in exportar:
+            destino.write(trozo)
+    segundos = time.perf_counter() - inicio
+    pico = None
+    if medir_memoria:
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return exportar, segundos, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', default='100000,1000000', help='Número de partidos separados por comas.')
+    parser.add_argument('--formatos', default=','.join(exportacion.FORMATOS))
+    parser.add_argument('--cambiadas', type=float, default=0.01, help='Fracción de partidos que cambian.')
+    parser.add_argument('--lote', type=int, default=exportacion.TAMANO_LOTE)
+    parser.add_argument('--salida', default='benchmarks/resultados/exportacion.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    formatos = [f for f in args.formatos.split(',') if f != 'parquet' or exportacion.parquet_disponible()]
+    if len(formatos) < len(args.formatos.split(',')):
+        print("pyarrow no está instalado: se omite Parquet.\n")
+
+    resultados = {
+        'benchmark': 'exportacion', 'metadatos': metadatos(),
+        'parametros': {'cambiadas': args.cambiadas, 'lote': args.lote}, 'resultados': [],
+    }
+    filas = []
+    for num_filas in [int(f) for f in args.filas.split(',')]:
+        engine, _ = crear_motor_temporal()
+        _llenar(engine, num_filas)
+        rng = random.Random(num_filas)
+
+        for formato in formatos:
+            completa, segundos, _ = _exportar(engine, formato, None, args.lote)
+            _, _, pico = _exportar(engine, formato, None, args.lote, medir_memoria=True)
+            medidas = [('completa', completa, segundos, pico)]
+
+            # Marca tomada justo antes de los cambios (la de la exportación completa, con su
+            # holgura, incluiría también las filas recién insertadas y los cambios de otros formatos)
+            desde = time.time()
+            time.sleep(0.01)
+            cambiadas = _cambiar(engine, num_filas, args.cambiadas, rng)
+            incremental, segundos, _ = _exportar(engine, formato, desde, args.lote)
+            _, _, pico = _exportar(engine, formato, desde, args.lote, medir_memoria=True)
+            assert incremental.filas == cambiadas, (incremental.filas, cambiadas)
+            medidas.append(('incremental', incremental, segundos, pico))
+
+            for modo, exportada, segundos, pico in medidas:
+                resultado = {
+                    'filas_tabla': num_filas, 'formato': formato, 'modo': modo, 'filas': exportada.filas,
+                    'segundos': round(segundos, 4),
+                    'filas_por_s': round(exportada.filas / segundos) if segundos else None,
+                    'pico_memoria_kib': round(pico / 1024),
+                }
+                resultados['resultados'].append(resultado)
+                filas.append([resultado[c] for c in ('filas_tabla', 'formato', 'modo', 'filas', 'segundos',
+                                                     'filas_por_s', 'pico_memoria_kib')])
+        engine.dispose()
+
+    imprimir_tabla(['filas_tabla', 'formato', 'modo', 'filas', 'segundos', 'filas_por_s', 'pico_memoria_kib'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, ('filas_tabla', 'formato', 'modo'), 'segundos',
+                                      args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
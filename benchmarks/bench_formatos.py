@@ -0,0 +1,133 @@
+"""
+Benchmark de los formatos por puntos: calendario de todos contra todos y
+emparejamiento del sistema suizo.
+
+Uso:
+    python -m benchmarks.bench_formatos [--equipos 512,1024,2048] [--db]
+
+En memoria, para cada tamaño mide:
+  - la generación del calendario completo por el método del círculo;
+  - el emparejamiento de cada ronda suiza con la clasificación incremental,
+    frente a recalcular la clasificación desde todos los partidos jugados.
+Con --db mide además el ciclo real contra un SQLite temporal: la inserción del
+calendario completo y cada 'avanzar ronda' del sistema suizo.
+"""
+import argparse
+import random
+import time
+
+import formatos
+import importacion
+import tournament_logic as logic
+from benchmarks.comun import crear_motor_temporal, imprimir_tabla
+
+
+def _calendario(nombres):
+    inicio = time.perf_counter()
+    rondas = formatos.calendario_todos_contra_todos(nombres)
+    segundos = time.perf_counter() - inicio
+    partidos = sum(len(pares) for pares in rondas)
+    assert partidos == len(nombres) * (len(nombres) - 1) // 2
+    return partidos, segundos
+
+
+def _suizo_en_memoria(nombres):
+    """
+    Juega todas las rondas suizas con resultados aleatorios. Retorna los ms medios
+    por ronda del emparejamiento incremental y del que recalcula la clasificación.
+    """
+    num_rondas = formatos.SistemaSuizo().num_rondas(len(nombres))
+    clasificacion = formatos.Clasificacion(nombres)
+    jugados = []  # (equipo_a, equipo_b, marcador_a, marcador_b, ganador)
+    incremental = recalculo = 0.0
+
+    pares, descanso = formatos.emparejar_primera_ronda(nombres)
+    for ronda in range(1, num_rondas + 1):
+        if ronda > 1:
+            inicio = time.perf_counter()
+            pares, descanso = formatos.emparejar_suizo(clasificacion)
+            incremental += time.perf_counter() - inicio
+
+            # Alternativa: reconstruir la tabla desde todos los partidos antes de emparejar
+            inicio = time.perf_counter()
+            desde_cero = formatos.Clasificacion(nombres)
+            for equipo_a, equipo_b, marcador_a, marcador_b, ganador in jugados:
+                desde_cero.registrar_emparejamiento(equipo_a, equipo_b)
+                desde_cero.registrar_resultado(equipo_a, equipo_b, marcador_a, marcador_b, ganador)
+            desde_cero.descansos = set(clasificacion.descansos)
+            formatos.emparejar_suizo(desde_cero)
+            recalculo += time.perf_counter() - inicio
+
+        for equipo_a, equipo_b in pares:
+            marcador_a, marcador_b = random.sample(range(6), 2)
+            ganador = equipo_a if marcador_a > marcador_b else equipo_b
+            clasificacion.registrar_emparejamiento(equipo_a, equipo_b)
+            clasificacion.registrar_resultado(equipo_a, equipo_b, marcador_a, marcador_b, ganador)
+            jugados.append((equipo_a, equipo_b, marcador_a, marcador_b, ganador))
+        if descanso is not None:
+            clasificacion.registrar_descanso(descanso)
+
+    rondas_emparejadas = max(1, num_rondas - 1)
+    return (num_rondas, incremental / rondas_emparejadas * 1000, recalculo / rondas_emparejadas * 1000)
+
+
+def _en_db(num_equipos):
+    """Inserta un calendario completo y juega un torneo suizo contra un SQLite temporal."""
+    _, Session = crear_motor_temporal()
+    session = Session()
+
+    inicio = time.perf_counter()
+    resumen = importacion.importar_torneos(session, [{
+        'nombre': 'Liga', 'formato': formatos.TODOS_CONTRA_TODOS,
+        'equipos': [f'L{i}' for i in range(num_equipos)],
+    }], generar_bracket=True)
+    calendario = time.perf_counter() - inicio
+
+    resumen_suizo = importacion.importar_torneos(session, [{
+        'nombre': 'Suizo', 'formato': formatos.SISTEMA_SUIZO,
+        'equipos': [f'S{i}' for i in range(num_equipos)],
+    }], generar_bracket=True)
+    torneo_id = resumen_suizo['torneos_creados'][0]['id']
+    avances = []
+    while True:
+        for partido in logic.obtener_partidos_pendientes(session, torneo_id):
+            marcador_a, marcador_b = random.sample(range(6), 2)
+            logic.ingresar_resultado(session, torneo_id, partido.match_id, marcador_a, marcador_b)
+        inicio = time.perf_counter()
+        exito, mensaje = logic.avanzar_ronda(session, torneo_id)
+        avances.append(time.perf_counter() - inicio)
+        assert exito, mensaje
+        if 'FINALIZADO' in mensaje:
+            break
+    session.close()
+    return resumen['partidos'], calendario, sum(avances) / len(avances)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', default='512,1024,2048', help='Tamaños separados por comas.')
+    parser.add_argument('--db', action='store_true', help='Mide también el ciclo contra la base de datos.')
+    args = parser.parse_args()
+    tamanos = [int(t) for t in args.equipos.split(',')]
+
+    filas = []
+    for num_equipos in tamanos:
+        nombres = [f'Equipo {i}' for i in range(num_equipos)]
+        partidos, segundos = _calendario(nombres)
+        num_rondas, incremental_ms, recalculo_ms = _suizo_en_memoria(nombres)
+        filas.append([num_equipos, partidos, f'{segundos * 1000:.1f}', num_rondas,
+                      f'{incremental_ms:.2f}', f'{recalculo_ms:.2f}'])
+    imprimir_tabla(['equipos', 'partidos_liga', 'calendario_ms', 'rondas_suizo',
+                    'emparejar_incremental_ms', 'emparejar_recalculo_ms'], filas)
+
+    if args.db:
+        filas = []
+        for num_equipos in tamanos:
+            partidos, calendario, avance = _en_db(num_equipos)
+            filas.append([num_equipos, partidos, f'{calendario:.2f}', f'{avance * 1000:.1f}'])
+        print()
+        imprimir_tabla(['equipos', 'partidos_liga', 'insertar_calendario_s', 'avanzar_ronda_suizo_ms'], filas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de la importación masiva frente al alta equipo a equipo.
+
+Uso:
+    python -m benchmarks.bench_importacion [--torneos 20] [--equipos 256]
+
+Caminos medidos:
+    individual        agregar_equipo_a_torneo equipo a equipo
+    masivo            importar_torneos con equipos nuevos (se registran con una
+                      inserción masiva)
+    masivo_inscritos  los mismos torneos otra vez: sus equipos ya están en el
+                      registro y solo se buscan (consultas IN) y se inscriben
+"""
+import argparse
+import time
+
+import importacion
+import tournament_logic as logic
+from benchmarks.comun import crear_motor_temporal, imprimir_tabla
+
+
+def _datos(num_torneos, num_equipos, prefijo):
+    return [
+        {'nombre': f'{prefijo} {t}', 'num_equipos': num_equipos,
+         'equipos': [f'{prefijo}{t}_E{e}' for e in range(num_equipos)]}
+        for t in range(num_torneos)
+    ]
+
+
+def _alta_individual(session, torneos, generar_bracket):
+    """El camino actual de la web: un commit por torneo y por equipo."""
+    filas = 0
+    for datos in torneos:
+        torneo, _ = logic.crear_nuevo_torneo(session, datos['nombre'], datos['num_equipos'])
+        for equipo in datos['equipos']:
+            logic.agregar_equipo_a_torneo(session, torneo.id, equipo)
+        filas += 1 + len(datos['equipos'])
+        if generar_bracket:
+            logic.generar_bracket_inicial(session, torneo.id)
+            filas += datos['num_equipos'] // 2
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--torneos', type=int, default=20)
+    parser.add_argument('--equipos', type=int, default=256)
+    parser.add_argument('--generar-bracket', action='store_true')
+    args = parser.parse_args()
+
+    filas = []
+    _, Session = crear_motor_temporal()
+    session = Session()
+    inicio = time.perf_counter()
+    total = _alta_individual(session, _datos(args.torneos, args.equipos, 'Individual'), args.generar_bracket)
+    segundos = time.perf_counter() - inicio
+    filas.append(['individual', total, f'{segundos:.3f}', f'{total / segundos:.0f}'])
+    session.close()
+
+    _, Session = crear_motor_temporal()
+    session = Session()
+    for camino in ('masivo', 'masivo_inscritos'):
+        resumen = importacion.importar_torneos(session, _datos(args.torneos, args.equipos, 'Masivo'),
+                                               args.generar_bracket)
+        filas.append([camino, resumen['filas'], f"{resumen['segundos']:.3f}", f"{resumen['filas_por_segundo']:.0f}"])
+    session.close()
+
+    imprimir_tabla(['camino', 'filas', 'segundos', 'filas_por_segundo'], filas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de las consultas calientes sobre 'partidos' a medida que crece la tabla.
+
+Uso:
+    python -m benchmarks.bench_indices [--torneos 100 1000 10000] [--sin-indices]
+
+Con los índices compuestos el tiempo de cada búsqueda debe mantenerse plano;
+con --sin-indices se eliminan para comparar contra un recorrido completo de la tabla.
+"""
+import argparse
+import random
+from sqlalchemy import insert, text
+
+import tournament_logic as logic
+from models import Torneo, Equipo, Partido
+from benchmarks.comun import crear_motor_temporal, cronometrar, imprimir_tabla
+
+EQUIPOS_POR_TORNEO = 16
+
+
+def _poblar(engine, desde, hasta):
+    """Inserta los torneos [desde, hasta) con un bracket de 16 equipos a medio jugar."""
+    torneos, equipos, partidos = [], [], []
+    for torneo_id in range(desde + 1, hasta + 1):
+        torneos.append({'id': torneo_id, 'nombre': f'Torneo {torneo_id}',
+                        'num_equipos': EQUIPOS_POR_TORNEO})
+        # Equipo k del torneo: id (torneo_id - 1) * EQUIPOS_POR_TORNEO + k + 1
+        primer_id = (torneo_id - 1) * EQUIPOS_POR_TORNEO + 1
+        equipos.extend({'id': primer_id + k, 'nombre': f'T{torneo_id}_E{k}',
+                        'nombre_normalizado': f't{torneo_id}_e{k}'} for k in range(EQUIPOS_POR_TORNEO))
+        num_partidos, ronda = EQUIPOS_POR_TORNEO // 2, 1
+        while num_partidos >= 1:
+            for i in range(num_partidos):
+                decidido = ronda == 1
+                partidos.append({
+                    'torneo_id': torneo_id,
+                    'match_id': f'R{ronda}_P{i + 1}',
+                    'ronda_nombre': f'Ronda {ronda}',
+                    'ronda_num': ronda,
+                    'equipo_a_id': primer_id + 2 * i,
+                    'equipo_b_id': primer_id + 2 * i + 1,
+                    'marcador_a': 1 if decidido else None,
+                    'marcador_b': 0 if decidido else None,
+                    'ganador_id': primer_id + 2 * i if decidido else None,
+                })
+            num_partidos //= 2
+            ronda += 1
+
+    with engine.begin() as conn:
+        conn.execute(insert(Torneo), torneos)
+        conn.execute(insert(Equipo), equipos)
+        conn.execute(insert(Partido), partidos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--torneos', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--sin-indices', action='store_true')
+    args = parser.parse_args()
+
+    engine, Session = crear_motor_temporal()
+    if args.sin_indices:
+        with engine.begin() as conn:
+            for indice in Partido.__table__.indexes:
+                conn.execute(text(f'DROP INDEX IF EXISTS {indice.name}'))
+
+    filas, poblados = [], 0
+    for total in sorted(args.torneos):
+        _poblar(engine, poblados, total)
+        poblados = total
+        session = Session()
+
+        def buscar_partido():
+            torneo_id = random.randint(1, total)
+            session.query(Partido).filter(
+                Partido.torneo_id == torneo_id, Partido.match_id == 'R2_P3'
+            ).first()
+
+        def pendientes():
+            logic.obtener_partidos_pendientes(session, random.randint(1, total))
+
+        def ultima_ronda():
+            session.query(Partido.ronda_num).filter(
+                Partido.torneo_id == random.randint(1, total)
+            ).order_by(Partido.ronda_num.desc()).first()
+
+        fila = [total, session.query(Partido).count()]
+        for consulta in (buscar_partido, pendientes, ultima_ronda):
+            fila.append(f"{cronometrar(consulta, args.repeticiones)['mediana_ms']:.3f}")
+        filas.append(fila)
+        session.close()
+
+    print(f"Índices: {'NO' if args.sin_indices else 'sí'} (mediana en ms)")
+    imprimir_tabla(['torneos', 'partidos', 'buscar_partido', 'pendientes', 'ultima_ronda'], filas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark de la ingesta de resultados: ruta síncrona frente a la cola asíncrona.
+
+Uso:
+    python -m benchmarks.bench_ingesta [--torneos 16] [--equipos 64] [--clientes 16]
+        [--tamano-lote 200] [--salida benchmarks/resultados/ingesta.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Con --torneos torneos de eliminación directa ya generados (en un SQLite temporal
+nuevo para cada modo), --clientes hilos envían a la vez todos los resultados de
+la Ronda 1, como las mesas de una sede reportando marcadores:
+    sincrono  cada envío llama a tournament_logic.ingresar_resultado (su propia
+              transacción), como hace hoy el formulario del dashboard
+    cola      cada envío va a ColaResultados; el escritor los aplica por lotes
+Se informa del rendimiento (resultados aplicados por segundo hasta que no queda
+ninguno pendiente), de la latencia que ve el cliente (hasta la respuesta o el
+acuse de recibo) y, en la cola, de la latencia hasta que el resultado se aplica.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import importacion
+import tournament_logic as logic
+from cola_resultados import ColaResultados, APLICADO
+from models import Partido
+from benchmarks.comun import (crear_motor_temporal, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion, percentil)
+
+
+def _preparar(num_torneos, num_equipos):
+    """Crea los torneos en un SQLite temporal. Retorna (Session, [(torneo_id, match_id, a, b)])."""
+    _, Session = crear_motor_temporal()
+    session = Session()
+    importacion.importar_torneos(session, [
+        {'nombre': f'Sede {t}', 'equipos': [f'S{t}_E{e}' for e in range(num_equipos)]}
+        for t in range(num_torneos)
+    ], generar_bracket=True)
+    rng = random.Random(1)
+    envios = [(torneo_id, match_id, *rng.sample(range(6), 2))
+              for torneo_id, match_id in session.query(Partido.torneo_id, Partido.match_id)]
+    session.close()
+    rng.shuffle(envios)
+    return Session, envios
+
+
+def _enviar_en_paralelo(envios, clientes, enviar):
+    """Reparte los envíos entre 'clientes' hilos. Retorna la latencia (s) de cada envío."""
+    latencias = []
+    lock = threading.Lock()
+
+    def cliente(propios):
+        medidas = []
+        for envio in propios:
+            inicio = time.perf_counter()
+            enviar(*envio)
+            medidas.append(time.perf_counter() - inicio)
+        with lock:
+            latencias.extend(medidas)
+
+    with ThreadPoolExecutor(max_workers=clientes) as ejecutor:
+        list(ejecutor.map(cliente, [envios[i::clientes] for i in range(clientes)]))
+    return latencias
+
+
+def _sincrono(num_torneos, num_equipos, clientes):
+    Session, envios = _preparar(num_torneos, num_equipos)
+    sesiones = threading.local()
+    aplicados = []
+
+    def enviar(torneo_id, match_id, marcador_a, marcador_b):
+        if not hasattr(sesiones, 'session'):
+            sesiones.session = Session()
+        exito, _ = logic.ingresar_resultado(sesiones.session, torneo_id, match_id, marcador_a, marcador_b)
+        aplicados.append(exito)
+
+    inicio = time.perf_counter()
+    latencias = _enviar_en_paralelo(envios, clientes, enviar)
+    segundos = time.perf_counter() - inicio
+    return {'aplicados': sum(aplicados), 'segundos': segundos, 'latencias': latencias, 'hasta_aplicar': latencias}
+
+
+def _cola(num_torneos, num_equipos, clientes, tamano_lote):
+    Session, envios = _preparar(num_torneos, num_equipos)
+    cola = ColaResultados(Session, tamano_lote=tamano_lote, avanzar_automatico=False)
+    registrados = []
+
+    def enviar(*envio):
+        registrados.append(cola.enviar(*envio)[0])
+
+    inicio = time.perf_counter()
+    latencias = _enviar_en_paralelo(envios, clientes, enviar)
+    cola.esperar_vacia()
+    segundos = time.perf_counter() - inicio
+    return {
+        'aplicados': sum(1 for e in registrados if e.estado == APLICADO),
+        'segundos': segundos,
+        'latencias': latencias,
+        'hasta_aplicar': [e.aplicado - e.recibido for e in registrados],
+        'lotes': cola.estadisticas()['lotes'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--torneos', type=int, default=16)
+    parser.add_argument('--equipos', type=int, default=64)
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--tamano-lote', type=int, default=200)
+    parser.add_argument('--salida', default='benchmarks/resultados/ingesta.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    resultados = {
+        'benchmark': 'ingesta', 'metadatos': metadatos(),
+        'parametros': {'torneos': args.torneos, 'equipos': args.equipos, 'clientes': args.clientes,
+                       'tamano_lote': args.tamano_lote},
+        'resultados': [],
+    }
+    filas = []
+    for modo, medida in (('sincrono', _sincrono(args.torneos, args.equipos, args.clientes)),
+                         ('cola', _cola(args.torneos, args.equipos, args.clientes, args.tamano_lote))):
+        latencias = [s * 1000 for s in medida['latencias']]
+        hasta_aplicar = [s * 1000 for s in medida['hasta_aplicar']]
+        resultado = {
+            'modo': modo, 'resultados': medida['aplicados'], 'segundos': round(medida['segundos'], 4),
+            'resultados_por_s': round(medida['aplicados'] / medida['segundos'], 1),
+            'ms_por_resultado': round(medida['segundos'] / medida['aplicados'] * 1000, 4),
+            'respuesta_p50_ms': round(percentil(latencias, 0.50), 3),
+            'respuesta_p95_ms': round(percentil(latencias, 0.95), 3),
+            'aplicado_p50_ms': round(percentil(hasta_aplicar, 0.50), 3),
+            'aplicado_p95_ms': round(percentil(hasta_aplicar, 0.95), 3),
+            'lotes': medida.get('lotes'),
+        }
+        resultados['resultados'].append(resultado)
+        filas.append([resultado[c] if resultado[c] is not None else '-' for c in (
+            'modo', 'resultados', 'segundos', 'resultados_por_s', 'respuesta_p50_ms', 'respuesta_p95_ms',
+            'aplicado_p50_ms', 'aplicado_p95_ms', 'lotes')])
+
+    imprimir_tabla(['modo', 'resultados', 'segundos', 'resultados_por_s', 'respuesta_p50_ms', 'respuesta_p95_ms',
+                    'aplicado_p50_ms', 'aplicado_p95_ms', 'lotes'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, ('modo',), 'ms_por_resultado', args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
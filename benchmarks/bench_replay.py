@@ -0,0 +1,119 @@
+"""
+Benchmark de la reconstrucción de torneos desde el registro de eventos.
+
+Uso:
+    python -m benchmarks.bench_replay [--equipos 16,32,64] [--intervalo 100]
+        [--repeticiones 20] [--salida benchmarks/resultados/replay.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Para cada tamaño juega un torneo de Todos contra Todos completo (un evento por
+resultado, con --intervalo versiones entre instantáneas) en un SQLite temporal
+y mide:
+    completo     reconstruir_estado reproduciendo todo el registro
+    instantanea  reconstruir_estado desde la última instantánea y los eventos posteriores
+    tablas       estado_desde_db (leer las tablas, como referencia)
+    partidos     reconstruir_partidos (reescribe la tabla; se deshace tras cada medida)
+"""
+import argparse
+import random
+import sys
+
+import formatos
+import importacion
+import registro_eventos
+import tournament_logic as logic
+from models import EventoTorneo, InstantaneaTorneo, Torneo
+from benchmarks.comun import (crear_motor_temporal, cronometrar, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion)
+
+
+def _jugar(session, num_equipos):
+    """Importa y juega un torneo de Todos contra Todos hasta el campeón. Retorna su id."""
+    resumen = importacion.importar_torneos(session, [{
+        'nombre': f'Replay {num_equipos}', 'formato': formatos.TODOS_CONTRA_TODOS,
+        'equipos': [f'R{num_equipos}_E{e}' for e in range(num_equipos)],
+    }], generar_bracket=True)
+    torneo_id = resumen['torneos_creados'][0]['id']
+    rng = random.Random(num_equipos)
+    while session.get(Torneo, torneo_id).campeon is None:
+        for partido in logic.obtener_partidos_pendientes(session, torneo_id):
+            marcador_a, marcador_b = rng.sample(range(6), 2)
+            exito, mensaje = logic.ingresar_resultado(session, torneo_id, partido.match_id, marcador_a, marcador_b)
+            assert exito, mensaje
+        logic.avanzar_ronda(session, torneo_id)
+        session.expire_all()
+    return torneo_id
+
+
+def _medir(session, torneo_id, repeticiones):
+    torneo = session.get(Torneo, torneo_id)
+    referencia = registro_eventos.estado_desde_db(session, torneo).como_dict()
+    for usar_instantanea in (False, True):
+        estado = registro_eventos.reconstruir_estado(session, torneo_id, usar_instantanea)
+        assert estado.como_dict() == referencia, "La reproducción no coincide con las tablas."
+
+    def reescribir_partidos():
+        registro_eventos.reconstruir_partidos(session, torneo)
+        session.rollback()
+
+    return {
+        'completo': cronometrar(lambda: registro_eventos.reconstruir_estado(session, torneo_id, False), repeticiones),
+        'instantanea': cronometrar(lambda: registro_eventos.reconstruir_estado(session, torneo_id), repeticiones),
+        'tablas': cronometrar(lambda: registro_eventos.estado_desde_db(session, torneo), repeticiones),
+        'partidos': cronometrar(reescribir_partidos, repeticiones),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', default='16,32,64', help='Tamaños de torneo separados por comas.')
+    parser.add_argument('--intervalo', type=int, default=registro_eventos.INTERVALO_INSTANTANEAS,
+                        help='Versiones entre instantáneas.')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--salida', default='benchmarks/resultados/replay.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+    registro_eventos.INTERVALO_INSTANTANEAS = args.intervalo
+
+    resultados = {
+        'benchmark': 'replay', 'metadatos': metadatos(),
+        'parametros': {'intervalo': args.intervalo, 'repeticiones': args.repeticiones},
+        'resultados': [],
+    }
+    filas = []
+    for num_equipos in [int(e) for e in args.equipos.split(',')]:
+        _, Session = crear_motor_temporal()
+        session = Session()
+        torneo_id = _jugar(session, num_equipos)
+        eventos = session.query(EventoTorneo).filter(EventoTorneo.torneo_id == torneo_id).count()
+        ultima = session.query(InstantaneaTorneo.evento_id).filter(
+            InstantaneaTorneo.torneo_id == torneo_id).order_by(InstantaneaTorneo.evento_id.desc()).first()
+        cola = session.query(EventoTorneo).filter(
+            EventoTorneo.torneo_id == torneo_id, EventoTorneo.id > (ultima[0] if ultima else 0)).count()
+
+        for modo, medida in _medir(session, torneo_id, args.repeticiones).items():
+            resultado = {
+                'equipos': num_equipos, 'modo': modo, 'eventos': eventos,
+                'reproducidos': {'completo': eventos, 'instantanea': cola}.get(modo),
+                'mediana_ms': round(medida['mediana_ms'], 3), 'p95_ms': round(medida['p95_ms'], 3),
+            }
+            resultados['resultados'].append(resultado)
+            filas.append([num_equipos, modo, eventos,
+                          resultado['reproducidos'] if resultado['reproducidos'] is not None else '-',
+                          resultado['mediana_ms'], resultado['p95_ms']])
+        session.close()
+
+    imprimir_tabla(['equipos', 'modo', 'eventos', 'reproducidos', 'mediana_ms', 'p95_ms'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, ('equipos', 'modo'), 'mediana_ms', args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark del simulador de Monte Carlo de brackets (simulaciones por segundo). Requiere NumPy.
+
+Uso:
+    python -m benchmarks.bench_simulacion [--equipos 64,1024,4096] [--simulaciones 100000]
+        [--repeticiones 3] [--salida benchmarks/resultados/simulacion.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Para cada tamaño importa un torneo de eliminación directa (en un SQLite temporal)
+y mide, con el bracket recién generado y con la Ronda 1 ya jugada:
+    simular    simulacion.simular_bracket (solo NumPy)
+    peticion   simulacion.obtener_probabilidades sin caché (árbol, Elo, simulación
+               y respuesta), lo que cuesta la primera petición de cada versión
+Se informa de la mediana de --repeticiones y de las simulaciones por segundo.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import importacion
+import simulacion
+import tournament_logic as logic
+import bracket
+from models import Torneo
+from benchmarks.comun import (crear_motor_temporal, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion)
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', default='64,1024,4096', help='Tamaños de bracket separados por comas.')
+    parser.add_argument('--simulaciones', type=int, default=simulacion.SIMULACIONES)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', default='benchmarks/resultados/simulacion.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    resultados = {
+        'benchmark': 'simulacion', 'metadatos': dict(metadatos(), numpy=np.__version__),
+        'parametros': {'simulaciones': args.simulaciones, 'repeticiones': args.repeticiones},
+        'resultados': [],
+    }
+    filas = []
+    for num_equipos in [int(e) for e in args.equipos.split(',')]:
+        _, Session = crear_motor_temporal()
+        session = Session()
+        torneo_id = importacion.importar_torneos(session, [{
+            'nombre': f'Simulacion {num_equipos}', 'equipos': [f'S{num_equipos}_E{e}' for e in range(num_equipos)],
+        }], generar_bracket=True)['torneos_creados'][0]['id']
+        rng = random.Random(num_equipos)
+
+        for estado in ('inicio', 'ronda_1'):
+            if estado == 'ronda_1':
+                for partido in logic.obtener_partidos_pendientes(session, torneo_id):
+                    if partido.ronda_num == 1:
+                        logic.ingresar_resultado(session, torneo_id, partido.match_id, *rng.sample(range(6), 2))
+                session.expire_all()
+            torneo = session.get(Torneo, torneo_id)
+            arbol = bracket.construir_arbol(session, torneo)
+            fuerza = np.ones(len(arbol.equipos))
+
+            medidas = {
+                'simular': _medir(lambda: simulacion.simular_bracket(
+                    arbol.ocupante, arbol.tamano, fuerza, args.simulaciones), args.repeticiones),
+                # Una semilla fija evita la caché: cada repetición calcula de nuevo
+                'peticion': _medir(lambda: simulacion.obtener_probabilidades(
+                    session, torneo_id, args.simulaciones, semilla=1), args.repeticiones),
+            }
+            for operacion, segundos in medidas.items():
+                resultado = {
+                    'equipos': num_equipos, 'estado': estado, 'operacion': operacion,
+                    'simulaciones': args.simulaciones, 'segundos': round(segundos, 4),
+                    'simulaciones_por_s': round(args.simulaciones / segundos),
+                }
+                resultados['resultados'].append(resultado)
+                filas.append([resultado[c] for c in ('equipos', 'estado', 'operacion', 'simulaciones', 'segundos',
+                                                     'simulaciones_por_s')])
+        session.close()
+
+    imprimir_tabla(['equipos', 'estado', 'operacion', 'simulaciones', 'segundos', 'simulaciones_por_s'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, ('equipos', 'estado', 'operacion'), 'segundos',
+                                      args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Generador de carga HTTP contra un servidor en marcha de la aplicación.
+
+Uso:
+    flask --app app run --with-threads          # en otra terminal
+    python -m benchmarks.carga_http [--url http://127.0.0.1:5000] [--clientes 16]
+        [--duracion 30] [--torneos 20] [--equipos 16]
+        [--salida benchmarks/resultados/carga_http.json]
+        [--guardar-baseline RUTA] [--comparar RUTA] [--tolerancia 0.2]
+
+Primero importa --torneos torneos de --equipos equipos (POST /importar, con el
+bracket generado). Después --clientes clientes concurrentes, cada uno con su
+propia conexión keep-alive, repiten durante --duracion segundos una mezcla de:
+    dashboard    GET /torneo/<id> (revalidando con If-None-Match, como un navegador)
+    api_bracket  GET /api/torneos/<id>/bracket
+    index        GET /
+    resultado    POST /torneo/<id>/ingresar_resultado de un partido pendiente
+Informa de peticiones por segundo, errores y latencias (p50/p95/p99) por
+operación, las guarda en JSON y, con --comparar, compara el p95 con una baseline.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.comun import (imprimir_tabla, metadatos, guardar_json, informar_comparacion, percentil)
+
+# Peso de cada operación en la mezcla
+MEZCLA = (('dashboard', 50), ('api_bracket', 20), ('index', 10), ('resultado', 20))
+
+
+class Cliente:
+    """Un cliente HTTP con su conexión persistente y su caché de ETags."""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.host, self.puerto = partes.hostname, partes.port or 80
+        self.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=60)
+        self.etags = {}
+
+    def pedir(self, metodo, ruta, cuerpo=None, cabeceras=None):
+        """Retorna (estado, cuerpo, cabeceras); reconecta una vez si el servidor cerró la conexión."""
+        for intento in range(2):
+            try:
+                self.conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras or {})
+                respuesta = self.conexion.getresponse()
+                return respuesta.status, respuesta.read(), respuesta.headers
+            except (http.client.HTTPException, ConnectionError):
+                self.conexion.close()
+                self.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=60)
+                if intento:
+                    raise
+
+
+def _preparar(url, num_torneos, num_equipos):
+    """Importa los torneos de la prueba con su bracket generado. Retorna sus ids."""
+    prefijo = f'Carga{int(time.time())}'
+    torneos = [{'nombre': f'{prefijo} {t}', 'equipos': [f'{prefijo}_{t}_{e}' for e in range(num_equipos)]}
+               for t in range(num_torneos)]
+    estado, cuerpo, _ = Cliente(url).pedir('POST', '/importar?generar_bracket=1', json.dumps(torneos),
+                                           {'Content-Type': 'application/json'})
+    resumen = json.loads(cuerpo)
+    if estado != 200 or not resumen.get('torneos_creados'):
+        raise SystemExit(f"No se pudieron importar los torneos de la prueba ({estado}): {resumen}")
+    return [t['id'] for t in resumen['torneos_creados']]
+
+
+def _cliente(url, torneos_ids, limite, semilla, medidas, lock):
+    """Bucle de un cliente hasta 'limite'; añade (operación, segundos, estado) a 'medidas'."""
+    rng = random.Random(semilla)
+    cliente = Cliente(url)
+    operaciones, pesos = zip(*MEZCLA)
+    propias = []
+
+    def medir(operacion, metodo, ruta, cuerpo=None, cabeceras=None):
+        inicio = time.perf_counter()
+        try:
+            estado, datos, respuesta = cliente.pedir(metodo, ruta, cuerpo, cabeceras)
+        except (OSError, http.client.HTTPException):
+            estado, datos, respuesta = 0, b'', {}
+        propias.append((operacion, time.perf_counter() - inicio, estado))
+        return estado, datos, respuesta
+
+    while time.perf_counter() < limite:
+        operacion = rng.choices(operaciones, pesos)[0]
+        torneo_id = rng.choice(torneos_ids)
+        if operacion == 'dashboard':
+            ruta = f'/torneo/{torneo_id}'
+            cabeceras = {'If-None-Match': cliente.etags[ruta]} if ruta in cliente.etags else {}
+            estado, _, respuesta = medir('dashboard', 'GET', ruta, cabeceras=cabeceras)
+            if estado == 200 and respuesta.get('ETag'):
+                cliente.etags[ruta] = respuesta['ETag']
+        elif operacion == 'api_bracket':
+            medir('api_bracket', 'GET', f'/api/torneos/{torneo_id}/bracket')
+        elif operacion == 'index':
+            medir('index', 'GET', '/')
+        else:
+            estado, datos, _ = medir('api_bracket', 'GET', f'/api/torneos/{torneo_id}/bracket')
+            if estado != 200:
+                continue
+            pendientes = [p['id'] for ronda in json.loads(datos)['rondas']
+                          for p in ronda['partidos'] if p['ganador'] is None]
+            if not pendientes:
+                continue
+            marcador_a, marcador_b = rng.sample(range(6), 2)
+            formulario = urlencode({'match_id': rng.choice(pendientes),
+                                    'marcador_a': marcador_a, 'marcador_b': marcador_b})
+            medir('resultado', 'POST', f'/torneo/{torneo_id}/ingresar_resultado', formulario,
+                  {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    with lock:
+        medidas.extend(propias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--duracion', type=float, default=30.0, help='Segundos de carga.')
+    parser.add_argument('--torneos', type=int, default=20)
+    parser.add_argument('--equipos', type=int, default=16)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', default='benchmarks/resultados/carga_http.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    torneos_ids = _preparar(args.url, args.torneos, args.equipos)
+    medidas, lock = [], threading.Lock()
+    limite = time.perf_counter() + args.duracion
+    hilos = [threading.Thread(target=_cliente, args=(args.url, torneos_ids, limite, args.semilla + i, medidas, lock))
+             for i in range(args.clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    resultados = {
+        'benchmark': 'carga_http', 'metadatos': metadatos(),
+        'parametros': {'clientes': args.clientes, 'duracion': args.duracion,
+                       'torneos': args.torneos, 'equipos': args.equipos},
+        'resultados': [],
+    }
+    filas = []
+    for operacion in sorted({m[0] for m in medidas}) + ['total']:
+        propias = [m for m in medidas if operacion in ('total', m[0])]
+        latencias = [s * 1000 for _, s, _ in propias]
+        errores = sum(1 for _, _, estado in propias if not 200 <= estado < 400)
+        resultado = {
+            'operacion': operacion, 'peticiones': len(propias), 'errores': errores,
+            'por_segundo': round(len(propias) / segundos, 1),
+            'p50_ms': round(percentil(latencias, 0.50), 3),
+            'p95_ms': round(percentil(latencias, 0.95), 3),
+            'p99_ms': round(percentil(latencias, 0.99), 3),
+            'max_ms': round(max(latencias), 3),
+        }
+        resultados['resultados'].append(resultado)
+        filas.append([resultado[c] for c in ('operacion', 'peticiones', 'errores', 'por_segundo',
+                                             'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')])
+
+    imprimir_tabla(['operacion', 'peticiones', 'errores', 'por_segundo', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, ('operacion',), 'p95_ms', args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
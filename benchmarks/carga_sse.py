@@ -0,0 +1,135 @@
+"""
+Prueba de carga del stream de eventos (SSE) con muchos espectadores de un torneo.
+
+Uso:
+    # En proceso: 1000 suscriptores del bus y 50 eventos publicados
+    python -m benchmarks.carga_sse [--espectadores 1000] [--eventos 50]
+
+    # Contra un servidor en marcha: abre las conexiones HTTP y espera a que
+    # lleguen --eventos eventos (p. ej. ingresando resultados desde la web)
+    python -m benchmarks.carga_sse --url http://localhost:5000/torneo/1/eventos
+
+Informa del número de conexiones activas y de la latencia de fan-out: el tiempo
+desde que se publica un evento hasta que lo recibe cada espectador.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from eventos import BusEventos
+from benchmarks.comun import imprimir_tabla
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def _en_proceso(args):
+    bus = BusEventos()
+    latencias = []          # (evento, segundos) de cada recepción
+    lock = threading.Lock()
+    listos = threading.Barrier(args.espectadores + 1)
+
+    def espectador():
+        recibidos = 0
+        iterador = bus.escuchar(1, espera=1.0)
+        listos.wait()
+        for evento in iterador:
+            if evento is None:
+                continue
+            _, _, datos = evento
+            retraso = time.perf_counter() - datos['t0']
+            with lock:
+                latencias.append((datos['n'], retraso))
+            recibidos += 1
+            if recibidos == args.eventos:
+                return
+
+    hilos = [threading.Thread(target=espectador, daemon=True) for _ in range(args.espectadores)]
+    for hilo in hilos:
+        hilo.start()
+    listos.wait()
+    # Espera a que todos los generadores estén suscritos (esperando en la Condition)
+    limite = time.perf_counter() + 30
+    while bus.suscriptores(1) < args.espectadores and time.perf_counter() < limite:
+        time.sleep(0.01)
+    conectados = bus.suscriptores(1)
+
+    inicio = time.perf_counter()
+    for n in range(args.eventos):
+        bus.publicar(1, 'partido_decidido', {'n': n, 't0': time.perf_counter()})
+        time.sleep(args.intervalo)
+    for hilo in hilos:
+        hilo.join(timeout=30)
+    duracion = time.perf_counter() - inicio
+    return conectados, latencias, duracion
+
+
+def _por_http(args):
+    partes = urlsplit(args.url)
+    latencias = []
+    lock = threading.Lock()
+    conectados = []
+
+    def espectador():
+        conexion = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=120)
+        conexion.request('GET', partes.path, headers={'Accept': 'text/event-stream'})
+        respuesta = conexion.getresponse()
+        with lock:
+            conectados.append(1)
+        recibidos = 0
+        for linea in respuesta:
+            if not linea.startswith(b'data:'):
+                continue
+            datos = json.loads(linea[5:])
+            with lock:
+                latencias.append((recibidos, time.time() - datos['ts']))
+            recibidos += 1
+            if recibidos == args.eventos:
+                break
+        conexion.close()
+
+    hilos = [threading.Thread(target=espectador, daemon=True) for _ in range(args.espectadores)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    while len(conectados) < args.espectadores and time.perf_counter() - inicio < 60:
+        time.sleep(0.1)
+    print(f"{len(conectados)} conexiones abiertas; esperando {args.eventos} eventos...")
+    for hilo in hilos:
+        hilo.join()
+    return len(conectados), latencias, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--espectadores', type=int, default=1000)
+    parser.add_argument('--eventos', type=int, default=50)
+    parser.add_argument('--intervalo', type=float, default=0.02, help='Segundos entre eventos (modo en proceso).')
+    parser.add_argument('--url', help='URL del stream de un servidor en marcha.')
+    args = parser.parse_args()
+
+    threading.stack_size(256 * 1024)  # Hilos ligeros: uno por espectador
+    conectados, latencias, duracion = _por_http(args) if args.url else _en_proceso(args)
+
+    # Latencia de fan-out de cada evento = la del último espectador en recibirlo
+    por_evento = {}
+    for evento, retraso in latencias:
+        por_evento[evento] = max(por_evento.get(evento, 0), retraso)
+    todas = [retraso for _, retraso in latencias]
+
+    imprimir_tabla(
+        ['conexiones', 'entregas', 'p50_ms', 'p99_ms', 'fanout_p50_ms', 'fanout_max_ms', 'segundos'],
+        [[conectados, len(latencias),
+          f'{_percentil(todas, 0.50) * 1000:.2f}', f'{_percentil(todas, 0.99) * 1000:.2f}',
+          f'{_percentil(list(por_evento.values()), 0.50) * 1000:.2f}',
+          f'{max(por_evento.values()) * 1000:.2f}', f'{duracion:.2f}']]
+    )
+
+
+if __name__ == '__main__':
+    main()
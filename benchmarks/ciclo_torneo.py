@@ -0,0 +1,182 @@
+"""
+Benchmark del ciclo de vida completo de un torneo en tournament_logic.
+
+Uso:
+    python -m benchmarks.ciclo_torneo [--equipos 8,64,512] [--torneos-db 1,1000]
+        [--formato "Eliminación Directa Simple"] [--repeticiones 3]
+        [--salida benchmarks/resultados/ciclo.json]
+        [--guardar-baseline benchmarks/resultados/baseline_ciclo.json]
+        [--comparar benchmarks/resultados/baseline_ciclo.json] [--tolerancia 0.2]
+
+    # Rejilla completa (tarda bastante):
+    python -m benchmarks.ciclo_torneo --equipos 8,64,512,4096,65536 --torneos-db 1,1000,100000
+
+Para cada tamaño de base de datos (torneos ya existentes) y de torneo mide, con
+un SQLite temporal nuevo, cada fase del ciclo:
+    crear       crear_nuevo_torneo
+    equipos     agregar_equipo_a_torneo por cada equipo (por encima de
+                --max-alta-individual se insertan en bloque)
+    generar     generar_bracket_inicial
+    resultados  ingresar_resultado de cada partido
+    avanzar     avanzar_ronda tras cada ronda, hasta el campeón
+
+Cada combinación se repite --repeticiones veces y se informa la mediana de cada
+fase. Los resultados se guardan en JSON. Con --comparar se comparan los ms por
+operación con los de una baseline guardada antes (en la misma máquina) y el
+proceso termina con código 1 si alguna fase empeora más que --tolerancia.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from sqlalchemy import insert
+
+import formatos
+import registro_equipos
+import tournament_logic as logic
+from models import Torneo, Equipo, Inscripcion, Partido
+from benchmarks.comun import (crear_motor_temporal, imprimir_tabla, metadatos, guardar_json,
+                              informar_comparacion)
+
+CAMPOS_CLAVE = ('formato', 'torneos_db', 'equipos', 'fase')
+LOTE_RELLENO = 10000
+
+
+def _poblar(session, num_torneos):
+    """
+    Inserta 'num_torneos' torneos de relleno (mitad finalizados) con 2 equipos y
+    su partido cada uno, para medir con tablas e índices de ese tamaño.
+    """
+    for inicio in range(1, num_torneos + 1, LOTE_RELLENO):
+        ids = range(inicio, min(inicio + LOTE_RELLENO, num_torneos + 1))
+        session.execute(insert(Torneo), [
+            {'id': t, 'nombre': f'Relleno {t}', 'num_equipos': 2, 'formato': formatos.ELIMINACION_DIRECTA,
+             'campeon': f'R{t}_A' if t % 2 else None, 'version': 0}
+            for t in ids
+        ])
+        # Equipos A y B del torneo t: ids 2t - 1 y 2t
+        session.execute(insert(Equipo), [
+            {'id': 2 * t - 1 + j, 'nombre': f'R{t}_{lado}', 'nombre_normalizado': f'r{t}_{lado.lower()}'}
+            for t in ids for j, lado in enumerate('AB')
+        ])
+        session.execute(insert(Inscripcion), [
+            {'torneo_id': t, 'equipo_id': 2 * t - 1 + j} for t in ids for j in range(2)
+        ])
+        session.execute(insert(Partido), [
+            {'torneo_id': t, 'match_id': 'R1_P1', 'ronda_nombre': 'Ronda 1', 'ronda_num': 1,
+             'equipo_a_id': 2 * t - 1, 'equipo_b_id': 2 * t,
+             'marcador_a': 1 if t % 2 else None, 'marcador_b': 0 if t % 2 else None,
+             'ganador_id': 2 * t - 1 if t % 2 else None}
+            for t in ids
+        ])
+        session.commit()
+
+
+class Cronometro:
+    """Acumula segundos y operaciones por fase."""
+
+    def __init__(self):
+        self.fases = {}
+
+    def medir(self, fase, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        segundos, operaciones = self.fases.get(fase, (0.0, 0))
+        self.fases[fase] = (segundos + time.perf_counter() - inicio, operaciones + 1)
+        return resultado
+
+    def sumar(self, fase, segundos, operaciones):
+        anteriores = self.fases.get(fase, (0.0, 0))
+        self.fases[fase] = (anteriores[0] + segundos, anteriores[1] + operaciones)
+
+
+def _ciclo(formato, num_torneos_db, num_equipos, max_alta_individual):
+    """Ejecuta el ciclo completo de un torneo y retorna el Cronometro con sus fases."""
+    _, Session = crear_motor_temporal()
+    session = Session()
+    _poblar(session, num_torneos_db - 1)
+    cronometro = Cronometro()
+    equipos = [f'Equipo {i}' for i in range(num_equipos)]
+
+    torneo, mensaje = cronometro.medir('crear', logic.crear_nuevo_torneo, session, 'Benchmark', num_equipos, formato)
+    assert torneo, mensaje
+    torneo_id = torneo.id
+
+    if num_equipos <= max_alta_individual:
+        for equipo in equipos:
+            exito, mensaje = cronometro.medir('equipos', logic.agregar_equipo_a_torneo, session, torneo_id, equipo)
+            assert exito, mensaje
+    else:
+        inicio = time.perf_counter()
+        registro_equipos.inscribir(session, torneo_id, equipos)
+        session.commit()
+        cronometro.sumar('equipos (masivo)', time.perf_counter() - inicio, num_equipos)
+
+    exito, mensaje = cronometro.medir('generar', logic.generar_bracket_inicial, session, torneo_id)
+    assert exito, mensaje
+
+    rng = random.Random(num_equipos)
+    while session.get(Torneo, torneo_id).campeon is None:
+        pendientes = [p.match_id for p in logic.obtener_partidos_pendientes(session, torneo_id)]
+        for match_id in pendientes:
+            marcador_a, marcador_b = rng.sample(range(6), 2)
+            exito, mensaje = cronometro.medir('resultados', logic.ingresar_resultado,
+                                              session, torneo_id, match_id, marcador_a, marcador_b)
+            assert exito, mensaje
+        cronometro.medir('avanzar', logic.avanzar_ronda, session, torneo_id)
+        session.expire_all()
+
+    session.close()
+    return cronometro
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', default='8,64,512', help='Tamaños de torneo separados por comas.')
+    parser.add_argument('--torneos-db', default='1,1000', help='Torneos en la base de datos, separados por comas.')
+    parser.add_argument('--formato', default=formatos.ELIMINACION_DIRECTA, choices=formatos.NOMBRES_FORMATOS)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--max-alta-individual', type=int, default=1024,
+                        help='Por encima de este tamaño los equipos se insertan en bloque.')
+    parser.add_argument('--salida', default='benchmarks/resultados/ciclo.json')
+    parser.add_argument('--guardar-baseline', help='Guarda además los resultados como baseline en esta ruta.')
+    parser.add_argument('--comparar', help='Baseline con la que comparar los resultados.')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    resultados = {'benchmark': 'ciclo_torneo', 'metadatos': metadatos(), 'resultados': []}
+    filas = []
+    for num_torneos_db in [int(t) for t in args.torneos_db.split(',')]:
+        for num_equipos in [int(e) for e in args.equipos.split(',')]:
+            medidas = {}  # fase -> [(segundos, operaciones)] de cada repetición
+            for _ in range(args.repeticiones):
+                cronometro = _ciclo(args.formato, num_torneos_db, num_equipos, args.max_alta_individual)
+                for fase, medida in cronometro.fases.items():
+                    medidas.setdefault(fase, []).append(medida)
+
+            for fase, repeticiones in medidas.items():
+                segundos = statistics.median(s for s, _ in repeticiones)
+                operaciones = repeticiones[0][1]
+                resultado = {
+                    'formato': args.formato, 'torneos_db': num_torneos_db, 'equipos': num_equipos, 'fase': fase,
+                    'operaciones': operaciones, 'repeticiones': len(repeticiones), 'segundos': round(segundos, 6),
+                    'ms_por_operacion': round(segundos / operaciones * 1000, 4),
+                    'operaciones_por_segundo': round(operaciones / segundos, 1) if segundos > 0 else None,
+                }
+                resultados['resultados'].append(resultado)
+                filas.append([num_torneos_db, num_equipos, fase, operaciones, f'{segundos:.3f}',
+                              f"{resultado['ms_por_operacion']:.3f}"])
+
+    imprimir_tabla(['torneos_db', 'equipos', 'fase', 'operaciones', 'segundos', 'ms_por_operacion'], filas)
+    guardar_json(args.salida, resultados)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_baseline:
+        guardar_json(args.guardar_baseline, resultados)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.comparar:
+        sys.exit(informar_comparacion(resultados, args.comparar, CAMPOS_CLAVE, 'ms_por_operacion', args.tolerancia))
+
+
+if __name__ == '__main__':
+    main()
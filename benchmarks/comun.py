@@ -0,0 +1,132 @@
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from sqlalchemy.orm import sessionmaker
+
+import basedatos
+import migraciones
+
+# ==============================================================================
+# UTILIDADES COMPARTIDAS POR LOS BENCHMARKS
+# ==============================================================================
+
+def crear_motor_temporal(url=None):
+    """
+    Crea un motor sobre una base de datos SQLite temporal (o sobre 'url' si se indica)
+    con el esquema ya migrado. Retorna (engine, Session).
+    """
+    if url is None:
+        directorio = tempfile.mkdtemp(prefix='gestor_bench_')
+        url = f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+    engine = basedatos.crear_motor(url)
+    migraciones.migrar(engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def cronometrar(funcion, repeticiones=100):
+    """
+    Ejecuta 'funcion' varias veces y retorna la mediana y el p95 en milisegundos.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'mediana_ms': statistics.median(tiempos),
+        'p95_ms': tiempos[int(len(tiempos) * 0.95) - 1] if len(tiempos) > 1 else tiempos[0],
+    }
+
+
+def percentil(valores, p):
+    """Percentil 'p' (0-1) de una lista de valores (el más cercano por debajo)."""
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def imprimir_tabla(cabeceras, filas):
+    """Imprime una tabla de texto simple con columnas alineadas."""
+    anchos = [max(len(str(c)), *(len(str(f[i])) for f in filas)) if filas else len(str(c))
+              for i, c in enumerate(cabeceras)]
+    print('  '.join(str(c).rjust(a) for c, a in zip(cabeceras, anchos)))
+    for fila in filas:
+        print('  '.join(str(v).rjust(a) for v, a in zip(fila, anchos)))
+
+
+# ==============================================================================
+# RESULTADOS EN JSON Y COMPARACIÓN CON UNA BASELINE
+# ==============================================================================
+
+def metadatos():
+    """Datos del entorno en que se midió (para saber si dos resultados son comparables)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+def guardar_json(ruta, datos):
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+
+
+def cargar_json(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparar_con_baseline(resultados, baseline, campos_clave, metrica, tolerancia=0.2):
+    """
+    Compara la 'metrica' (menor es mejor) de cada resultado con el de la baseline
+    que tiene los mismos 'campos_clave'. Retorna (filas, regresiones): una fila
+    [clave..., baseline, actual, variación] por resultado comparable y la lista
+    de las que empeoran más que 'tolerancia' (0.2 = 20 %).
+    """
+    def clave(resultado):
+        return tuple(resultado[campo] for campo in campos_clave)
+
+    anteriores = {clave(r): r[metrica] for r in baseline['resultados']}
+    filas, regresiones = [], []
+    for resultado in resultados['resultados']:
+        anterior = anteriores.get(clave(resultado))
+        if not anterior:
+            continue
+        variacion = resultado[metrica] / anterior - 1
+        fila = list(clave(resultado)) + [f'{anterior:.4f}', f'{resultado[metrica]:.4f}', f'{variacion:+.1%}']
+        filas.append(fila)
+        if variacion > tolerancia:
+            regresiones.append(fila)
+    return filas, regresiones
+
+
+def informar_comparacion(resultados, ruta_baseline, campos_clave, metrica, tolerancia):
+    """Imprime la comparación con la baseline. Retorna el código de salida (1 si hay regresiones)."""
+    filas, regresiones = comparar_con_baseline(resultados, cargar_json(ruta_baseline),
+                                               campos_clave, metrica, tolerancia)
+    print()
+    imprimir_tabla(list(campos_clave) + [f'{metrica} (baseline)', f'{metrica} (actual)', 'variacion'], filas)
+    if regresiones:
+        print(f"\n{len(regresiones)} regresiones por encima del {tolerancia:.0%}:")
+        for fila in regresiones:
+            print('  ' + ' / '.join(str(v) for v in fila))
+        return 1
+    print(f"\nSin regresiones por encima del {tolerancia:.0%}.")
+    return 0
@@ -0,0 +1,279 @@
+import threading
+from array import array
+from collections import OrderedDict
+from models import Partido
+import registro_equipos
+
+# ==============================================================================
+# MOTOR DE BRACKET EN MEMORIA (árbol binario en array)
+# ==============================================================================
+#
+# El bracket de eliminación directa se guarda como un heap binario completo:
+#   - el nodo 1 es la final; los hijos del nodo k son 2k y 2k+1; su padre es k // 2
+#   - los nodos [1, tamano) son partidos, los nodos [tamano, 2*tamano) son las
+#     posiciones iniciales de los equipos
+#   - la ronda r ocupa los nodos [tamano >> r, tamano >> (r - 1)), así que el
+#     partido 'R{r}_P{i}' es el nodo (tamano >> r) + i - 1
+#
+# 'ocupante[k]' guarda el índice del equipo que ocupa el nodo k (el ganador en
+# el caso de un partido) o -1 si aún no se conoce. Avanzar a un ganador es una
+# sola escritura en el array y la comprobación de su hermano (k ^ 1).
+#
+# Con un número de equipos que no es potencia de 2, el árbol usa la siguiente
+# potencia y las posiciones sobrantes quedan vacías: son los byes, que la
+# siembra estándar asigna a las mejores semillas. Un partido de la Ronda 1 con
+# un solo equipo se resuelve al generar el bracket y nunca se guarda en la DB.
+
+VACIO = -1
+
+# Los IDs lógicos solo dependen del tamaño del bracket: se calculan una vez
+# por tamaño y se comparten entre todos los torneos.
+_IDS_POR_TAMANO = {}
+
+
+def _ids_para_tamano(tamano):
+    """Retorna (lista nodo -> match_id, dict match_id -> nodo) para un tamaño."""
+    if tamano not in _IDS_POR_TAMANO:
+        ids = [None] * tamano
+        num_rondas = tamano.bit_length() - 1
+        for ronda in range(1, num_rondas + 1):
+            inicio = tamano >> ronda
+            for i in range(inicio):
+                ids[inicio + i] = f'R{ronda}_P{i + 1}'
+        _IDS_POR_TAMANO[tamano] = (ids, {match_id: nodo for nodo, match_id in enumerate(ids) if match_id})
+    return _IDS_POR_TAMANO[tamano]
+
+
+# La colocación estándar de semillas solo depende del tamaño: se calcula una vez
+_SIEMBRA_POR_TAMANO = {}
+
+
+def tamano_para(num_equipos):
+    """Tamaño del bracket (menor potencia de 2 >= num_equipos)."""
+    return 1 << (num_equipos - 1).bit_length()
+
+
+def orden_de_siembra(tamano):
+    """
+    Semilla (1..tamano) de cada posición inicial según la siembra estándar: la
+    semilla s se enfrenta a la tamano + 1 - s y las dos mejores solo pueden
+    cruzarse en la final. Se construye duplicando la lista de la ronda siguiente,
+    así que el coste total es O(tamano).
+    """
+    if tamano not in _SIEMBRA_POR_TAMANO:
+        orden = [1]
+        while len(orden) < tamano:
+            suma = 2 * len(orden) + 1
+            orden = [s for semilla in orden for s in (semilla, suma - semilla)]
+        _SIEMBRA_POR_TAMANO[tamano] = orden
+    return _SIEMBRA_POR_TAMANO[tamano]
+
+
+class ArbolBracket:
+    """
+    Estado completo de un bracket de eliminación directa de 'tamano' posiciones
+    (potencia de 2). Todas las operaciones sobre un partido son O(1).
+    """
+    __slots__ = ('tamano', 'num_rondas', 'equipos', 'indices', 'ids_equipos', 'ocupante', 'persistido',
+                 'version', '_ids', '_nodos')
+
+    def __init__(self, tamano):
+        if tamano < 2 or tamano & (tamano - 1):
+            raise ValueError("El tamaño del bracket debe ser una potencia de 2.")
+        self.tamano = tamano
+        self.num_rondas = tamano.bit_length() - 1
+        self.equipos = []   # índice -> nombre del equipo
+        self.indices = {}   # nombre del equipo -> índice
+        self.ids_equipos = {}  # nombre del equipo -> su id en el registro (para insertar partidos)
+        self.ocupante = array('i', [VACIO]) * (2 * tamano)
+        self.persistido = bytearray(tamano)  # 1 si el partido del nodo existe en la DB (o es un bye)
+        self.version = None  # Torneo.version que refleja el árbol
+        self._ids, self._nodos = _ids_para_tamano(tamano)
+
+    # --- Conversión entre nodos e IDs lógicos ---
+
+    def nodo(self, match_id):
+        """Nodo del árbol para un ID lógico (ej. 'R2_P3'); KeyError si no existe."""
+        return self._nodos[match_id]
+
+    def match_id(self, nodo):
+        return self._ids[nodo]
+
+    def ronda(self, nodo):
+        return self.num_rondas - nodo.bit_length() + 1
+
+    def siguiente_match_id(self, nodo):
+        """ID del partido al que avanza el ganador del nodo (None para la final)."""
+        return self._ids[nodo >> 1] if nodo > 1 else None
+
+    def nodos_de_ronda(self, ronda):
+        inicio = self.tamano >> ronda
+        return range(inicio, 2 * inicio)
+
+    # --- Estado ---
+
+    def _indice(self, nombre):
+        indice = self.indices.get(nombre)
+        if indice is None:
+            indice = len(self.equipos)
+            self.equipos.append(nombre)
+            self.indices[nombre] = indice
+        return indice
+
+    def colocar_equipos(self, nombres):
+        """Coloca los equipos en las posiciones iniciales, en el orden recibido."""
+        for posicion, nombre in enumerate(nombres):
+            self.ocupante[self.tamano + posicion] = self._indice(nombre)
+
+    def sembrar_equipos(self, nombres):
+        """
+        Coloca los equipos, recibidos en orden de semilla, con la siembra estándar.
+        Si hay menos equipos que posiciones, las mejores semillas no tienen rival en
+        la Ronda 1: pasan directamente a la Ronda 2 y su partido queda marcado como
+        persistido para que nunca se cree.
+        """
+        for posicion, semilla in enumerate(orden_de_siembra(self.tamano)):
+            if semilla <= len(nombres):
+                self.ocupante[self.tamano + posicion] = self._indice(nombres[semilla - 1])
+        for nodo in self.nodos_de_ronda(1):
+            a, b = self.ocupante[2 * nodo], self.ocupante[2 * nodo + 1]
+            if (a == VACIO) != (b == VACIO):
+                self.ocupante[nodo] = a if a != VACIO else b
+                self.persistido[nodo] = 1
+
+    def nodos_listos(self):
+        """Nodos con sus dos equipos que aún no existen en la DB, ronda a ronda."""
+        for ronda in range(1, self.num_rondas + 1):
+            for nodo in self.nodos_de_ronda(ronda):
+                if not self.persistido[nodo] and self.listo(nodo):
+                    yield nodo
+
+    def equipos_de(self, nodo):
+        """Retorna (equipo_a, equipo_b) del partido del nodo; None si aún no se conoce."""
+        a, b = self.ocupante[2 * nodo], self.ocupante[2 * nodo + 1]
+        return (self.equipos[a] if a != VACIO else None,
+                self.equipos[b] if b != VACIO else None)
+
+    def ganador(self, nodo):
+        indice = self.ocupante[nodo]
+        return self.equipos[indice] if indice != VACIO else None
+
+    def listo(self, nodo):
+        """True si el partido del nodo ya tiene sus dos equipos."""
+        return self.ocupante[2 * nodo] != VACIO and self.ocupante[2 * nodo + 1] != VACIO
+
+    def registrar_ganador(self, nodo, nombre):
+        """
+        Registra al ganador del partido del nodo. Retorna el nodo padre si con este
+        resultado el partido siguiente queda listo para jugarse (y aún no existe en
+        la DB); en otro caso retorna None.
+        """
+        self.ocupante[nodo] = self._indice(nombre)
+        padre = nodo >> 1
+        if padre and not self.persistido[padre] and self.listo(padre):
+            return padre
+        return None
+
+    def cargar_partido(self, match_id, equipo_a, equipo_b, ganador):
+        """Vuelca en el árbol un partido ya guardado en la DB."""
+        nodo = self._nodos[match_id]
+        self.ocupante[2 * nodo] = self._indice(equipo_a)
+        self.ocupante[2 * nodo + 1] = self._indice(equipo_b)
+        if ganador is not None:
+            self.ocupante[nodo] = self._indice(ganador)
+        self.persistido[nodo] = 1
+
+    def datos_partido(self, torneo_id, nodo):
+        """
+        Retorna las columnas del Partido de un nodo listo (para Partido(**datos) o
+        para una inserción masiva) y lo marca como persistido.
+        """
+        equipo_a, equipo_b = self.equipos_de(nodo)
+        ronda = self.ronda(nodo)
+        self.persistido[nodo] = 1
+        return {
+            'torneo_id': torneo_id,
+            'match_id': self._ids[nodo],
+            'ronda_nombre': f'Ronda {ronda}',
+            'ronda_num': ronda,
+            'equipo_a': equipo_a,
+            'equipo_b': equipo_b,
+            'siguiente_partido_id': self.siguiente_match_id(nodo),
+        }
+
+
+# ==============================================================================
+# CACHÉ DE ÁRBOLES POR TORNEO
+# ==============================================================================
+#
+# El árbol se carga una vez por torneo y proceso; las funciones de
+# tournament_logic lo mantienen al día a medida que guardan cambios. Cada árbol
+# recuerda la Torneo.version que refleja: si otro proceso modificó el torneo, la
+# versión en la DB será distinta y el árbol se recarga. La caché está acotada:
+# los árboles usados hace más tiempo se desalojan, y tournament_logic descarta el
+# de un torneo en cuanto tiene campeón.
+
+# Árboles guardados a la vez (los usados hace más tiempo se desalojan)
+MAX_ARBOLES = 256
+
+_ARBOLES = OrderedDict()  # torneo_id -> ArbolBracket
+_lock_arboles = threading.Lock()
+
+
+def construir_arbol(session, torneo):
+    """
+    Reconstruye el árbol de un torneo desde la DB, sin tocar la caché: la siembra
+    (orden de inscripción de los equipos) repone los byes, que no tienen fila, y
+    después se vuelcan los partidos de la tabla 'partidos'.
+    """
+    arbol = ArbolBracket(tamano_para(torneo.num_equipos))
+    arbol.version = torneo.version
+    equipos = registro_equipos.equipos_inscritos(session, torneo.id)
+    arbol.sembrar_equipos([nombre for _, nombre in equipos])
+    arbol.ids_equipos = {nombre: equipo_id for equipo_id, nombre in equipos}
+    filas = registro_equipos.consultar_partidos(
+        session, 'match_id', 'equipo_a', 'equipo_b', 'ganador'
+    ).filter(Partido.torneo_id == torneo.id)
+    for fila in filas:
+        arbol.cargar_partido(*fila)
+    return arbol
+
+
+def cargar_arbol(session, torneo):
+    """Reconstruye el árbol de un torneo (ver construir_arbol) y lo guarda en caché."""
+    arbol = construir_arbol(session, torneo)
+    registrar_arbol(torneo.id, arbol)
+    return arbol
+
+
+def obtener_arbol(session, torneo):
+    """Retorna el árbol en caché del torneo, recargándolo si no está o está desactualizado."""
+    with _lock_arboles:
+        arbol = _ARBOLES.get(torneo.id)
+        if arbol is not None:
+            _ARBOLES.move_to_end(torneo.id)
+    if arbol is None or arbol.version != torneo.version:
+        arbol = cargar_arbol(session, torneo)
+    return arbol
+
+
+def registrar_arbol(torneo_id, arbol):
+    """Guarda el árbol de un torneo en caché, desalojando el usado hace más tiempo si no cabe."""
+    with _lock_arboles:
+        _ARBOLES[torneo_id] = arbol
+        _ARBOLES.move_to_end(torneo_id)
+        while len(_ARBOLES) > MAX_ARBOLES:
+            _ARBOLES.popitem(last=False)
+
+
+def confirmar_version(torneo_id, version):
+    """Anota en el árbol en caché la versión del torneo tras un commit que lo actualizó."""
+    arbol = _ARBOLES.get(torneo_id)
+    if arbol is not None:
+        arbol.version = version
+
+
+def descartar_arbol(torneo_id):
+    """Elimina el árbol de la caché (ej. tras un rollback o al terminar el torneo)."""
+    with _lock_arboles:
+        _ARBOLES.pop(torneo_id, None)
@@ -0,0 +1,94 @@
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# ==============================================================================
+# CACHÉ DEL DASHBOARD RENDERIZADO
+# ==============================================================================
+#
+# Guarda el HTML del dashboard de cada torneo junto con la versión del torneo
+# con la que se generó (Torneo.version). Cualquier cambio en el torneo
+# incrementa la versión, así que una entrada con otra versión es inválida.
+# Se desalojan las entradas usadas hace más tiempo (LRU) al superar 'max_bytes'.
+
+# El ETag depende solo del torneo, su versión y el contenido de las plantillas: es el
+# mismo en todos los workers y tras un reinicio, y cambia si se despliegan plantillas nuevas
+DIRECTORIO_PLANTILLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
+@functools.cache
+def hash_plantillas():
+    """Hash corto del contenido de las plantillas (se calcula una vez por proceso)."""
+    resumen = hashlib.sha1()
+    for raiz, carpetas, archivos in os.walk(DIRECTORIO_PLANTILLAS):
+        carpetas.sort()
+        for archivo in sorted(archivos):
+            ruta = os.path.join(raiz, archivo)
+            resumen.update(os.path.relpath(ruta, DIRECTORIO_PLANTILLAS).encode('utf-8'))
+            with open(ruta, 'rb') as f:
+                resumen.update(f.read())
+    return resumen.hexdigest()[:10]
+
+
+def etag_dashboard(torneo_id, version):
+    """ETag (sin comillas) del dashboard de un torneo en una versión concreta."""
+    return f"torneo-{torneo_id}-v{version}-{hash_plantillas()}"
+
+
+class CacheDashboard:
+    """Caché LRU de dashboards renderizados, limitada por memoria y segura entre hilos."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # torneo_id -> (version, html en bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, torneo_id, version):
+        """Retorna el HTML en caché para (torneo, versión) o None."""
+        with self._lock:
+            entrada = self._entradas.get(torneo_id)
+            if entrada is None or entrada[0] != version:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(torneo_id)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, torneo_id, version, html):
+        """Guarda el HTML de un torneo, reemplazando cualquier versión anterior."""
+        datos = html.encode('utf-8') if isinstance(html, str) else html
+        if len(datos) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(torneo_id, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[1])
+            self._entradas[torneo_id] = (version, datos)
+            self._bytes += len(datos)
+            while self._bytes > self.max_bytes:
+                _, (_, desalojado) = self._entradas.popitem(last=False)
+                self._bytes -= len(desalojado)
+                self.desalojos += 1
+
+    def invalidar(self, torneo_id):
+        with self._lock:
+            entrada = self._entradas.pop(torneo_id, None)
+            if entrada is not None:
+                self._bytes -= len(entrada[1])
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+            }
@@ -0,0 +1,226 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from models import Partido, Torneo
+import tournament_logic as logic
+
+# ==============================================================================
+# INGESTA ASÍNCRONA DE RESULTADOS (cola en proceso con un único escritor)
+# ==============================================================================
+#
+# Cada envío se valida, se guarda en un registro consultable y se encola; quien
+# lo envía recibe la respuesta de inmediato. Un único hilo escritor vacía la
+# cola por lotes: agrupa los envíos de cada torneo (en su orden de llegada) y
+# los aplica con tournament_logic.ingresar_resultados_lote, una transacción por
+# torneo y lote, en lugar de una transacción por petición compitiendo por el
+# bloqueo de escritura. Si un lote deja una ronda completa sin campeón, el
+# escritor llama a avanzar_ronda.
+#
+# La clave de idempotencia solo agrupa envíos repetidos. Un envío para un partido
+# que ya tiene resultado (p. ej. el marcador distinto de otra mesa) se rechaza: los
+# resultados ya jugados solo se cambian con tournament_logic.corregir_resultado.
+#
+# Como el bus de eventos, la cola vive en el proceso: con varios workers, cada
+# uno tiene la suya y solo conoce el estado de los envíos que recibió.
+
+log = logging.getLogger(__name__)
+
+# Estados de un envío
+EN_COLA = 'en_cola'
+APLICADO = 'aplicado'
+RECHAZADO = 'rechazado'
+
+# Envíos máximos por lote del escritor
+TAMANO_LOTE = 200
+# Envíos que se recuerdan para las consultas de estado (los más antiguos se olvidan)
+MAX_ENVIOS_REGISTRADOS = 50000
+
+
+class Envio:
+    """Un resultado enviado a la cola y su estado."""
+    __slots__ = ('id', 'clave', 'torneo_id', 'match_id', 'marcador_a', 'marcador_b',
+                 'estado', 'mensaje', 'recibido', 'aplicado')
+
+    def __init__(self, clave, torneo_id, match_id, marcador_a, marcador_b):
+        self.id = uuid.uuid4().hex
+        self.clave = clave
+        self.torneo_id = torneo_id
+        self.match_id = match_id
+        self.marcador_a = marcador_a
+        self.marcador_b = marcador_b
+        self.estado = EN_COLA
+        self.mensaje = None
+        self.recibido = time.time()
+        self.aplicado = None  # momento en que se aplicó o rechazó
+
+    def como_dict(self):
+        return {
+            'id': self.id, 'torneo_id': self.torneo_id, 'match_id': self.match_id,
+            'marcador': [self.marcador_a, self.marcador_b], 'estado': self.estado,
+            'mensaje': self.mensaje, 'recibido': self.recibido, 'aplicado': self.aplicado,
+        }
+
+
+def validar_marcadores(marcador_a, marcador_b):
+    """Validación que no necesita la base de datos. Retorna None o el mensaje de error."""
+    if marcador_a < 0 or marcador_b < 0:
+        return "Error: Los marcadores no pueden ser números negativos."
+    if marcador_a == marcador_b:
+        return "Error: No se permiten empates. Reingresa los marcadores."
+    return None
+
+
+class ColaResultados:
+    """
+    Cola de resultados con un hilo escritor. 'fabrica_sesiones' crea una sesión
+    nueva (un sessionmaker); el escritor abre una por lote y la cierra al terminar.
+    El hilo se arranca con el primer envío.
+    """
+
+    def __init__(self, fabrica_sesiones, tamano_lote=TAMANO_LOTE, avanzar_automatico=True,
+                 max_registrados=MAX_ENVIOS_REGISTRADOS):
+        self._fabrica = fabrica_sesiones
+        self.tamano_lote = tamano_lote
+        self.avanzar_automatico = avanzar_automatico
+        self.max_registrados = max_registrados
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._envios = OrderedDict()  # id -> Envio, en orden de llegada
+        self._por_clave = {}          # clave de idempotencia -> Envio
+        self._hilo = None
+        self.contadores = {'recibidos': 0, 'duplicados': 0, 'aplicados': 0, 'rechazados': 0,
+                           'lotes': 0, 'avances': 0}
+
+    # --- Envío y consulta ---
+
+    def enviar(self, torneo_id, match_id, marcador_a, marcador_b, clave=None):
+        """
+        Registra y encola un resultado. Retorna (envio, nuevo).
+
+        Idempotencia: con 'clave' (p. ej. la cabecera Idempotency-Key), repetir el
+        envío retorna siempre el mismo Envio mientras se recuerde. Sin clave, un
+        envío idéntico a otro que aún está en la cola (un doble clic) se descarta.
+        """
+        if clave is None:
+            clave = f'{torneo_id}:{match_id}:{marcador_a}:{marcador_b}'
+            explicita = False
+        else:
+            explicita = True
+
+        with self._lock:
+            existente = self._por_clave.get(clave)
+            if existente is not None and (explicita or existente.estado == EN_COLA):
+                self.contadores['duplicados'] += 1
+                return existente, False
+
+            envio = Envio(clave, torneo_id, match_id, marcador_a, marcador_b)
+            self._envios[envio.id] = envio
+            self._por_clave[clave] = envio
+            self.contadores['recibidos'] += 1
+            while len(self._envios) > self.max_registrados:
+                _, antiguo = self._envios.popitem(last=False)
+                if self._por_clave.get(antiguo.clave) is antiguo:
+                    del self._por_clave[antiguo.clave]
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escritor, name='escritor-resultados', daemon=True)
+                self._hilo.start()
+
+        self._cola.put(envio)
+        return envio, True
+
+    def obtener(self, envio_id):
+        """El Envio con ese id, o None si no existe (o ya se olvidó)."""
+        with self._lock:
+            return self._envios.get(envio_id)
+
+    def esperar_vacia(self, timeout=None):
+        """Espera a que se hayan procesado todos los envíos encolados. Retorna False si vence 'timeout'."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cola.all_tasks_done:
+            while self._cola.unfinished_tasks:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._cola.all_tasks_done.wait(restante)
+        return True
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self.contadores, en_cola=self._cola.qsize(), registrados=len(self._envios))
+
+    # --- Escritor ---
+
+    def _escritor(self):
+        while True:
+            lote = [self._cola.get()]
+            try:
+                while len(lote) < self.tamano_lote:
+                    lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self._procesar(lote)
+            except Exception as e:  # el escritor no debe morir: el lote se rechaza y sigue con el siguiente
+                log.exception("No se pudo procesar un lote de %d resultados", len(lote))
+                pendientes = [envio for envio in lote if envio.estado == EN_COLA]
+                mensaje = f"Error: No se pudo aplicar el resultado ({e})."
+                self._terminar(pendientes, [(False, mensaje)] * len(pendientes))
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+    def _procesar(self, lote):
+        """Aplica un lote: una transacción por torneo, respetando el orden de llegada."""
+        por_torneo = OrderedDict()
+        for envio in lote:
+            por_torneo.setdefault(envio.torneo_id, []).append(envio)
+
+        session = self._fabrica()
+        try:
+            for torneo_id, envios in por_torneo.items():
+                try:
+                    exito, respuestas = logic.ingresar_resultados_lote(
+                        session, torneo_id, [(e.match_id, e.marcador_a, e.marcador_b) for e in envios])
+                except Exception as e:  # el escritor no debe morir por un error inesperado
+                    session.rollback()
+                    log.exception("No se pudieron aplicar los resultados del torneo %s", torneo_id)
+                    exito, respuestas = False, f"Error: No se pudo aplicar el resultado ({e})."
+                if not exito:
+                    respuestas = [(False, respuestas)] * len(envios)
+                self._terminar(envios, respuestas)
+                if exito and self.avanzar_automatico and any(aplicado for aplicado, _ in respuestas):
+                    try:
+                        self._avanzar_si_completa(session, torneo_id)
+                    except Exception:  # los resultados ya están guardados; la ronda se puede avanzar a mano
+                        session.rollback()
+                        log.exception("No se pudo avanzar la ronda del torneo %s", torneo_id)
+                session.expire_all()
+        finally:
+            session.close()
+        with self._lock:
+            self.contadores['lotes'] += 1
+
+    def _terminar(self, envios, respuestas):
+        ahora = time.time()
+        with self._lock:
+            for envio, (exito, mensaje) in zip(envios, respuestas):
+                envio.estado = APLICADO if exito else RECHAZADO
+                envio.mensaje = mensaje
+                envio.aplicado = ahora
+                self.contadores['aplicados' if exito else 'rechazados'] += 1
+
+    def _avanzar_si_completa(self, session, torneo_id):
+        """Si el torneo no tiene campeón ni partidos pendientes, genera la siguiente ronda."""
+        session.expire_all()
+        campeon = session.query(Torneo.campeon).filter(Torneo.id == torneo_id).scalar()
+        pendiente = session.query(Partido.id).filter(
+            Partido.torneo_id == torneo_id, Partido.ganador_id.is_(None)).first()
+        if campeon is None and pendiente is None:
+            exito, _ = logic.avanzar_ronda(session, torneo_id)
+            if exito:
+                with self._lock:
+                    self.contadores['avances'] += 1
@@ -0,0 +1,151 @@
+from sqlalchemy import bindparam, case, delete, func, insert, literal, select, union_all, update
+from models import Equipo, EstadisticaEquipo, Partido, Torneo
+import registro_equipos
+
+# ==============================================================================
+# ESTADÍSTICAS GLOBALES DE EQUIPOS (tabla materializada 'estadisticas_equipos')
+# ==============================================================================
+#
+# En lugar de agregar todo el historial de partidos en cada consulta, cada
+# resultado suma (o, si se corrige, resta) sus valores a las filas de los dos
+# equipos. Los rankings se leen directamente de los índices de la tabla.
+#
+# Los equipos se identifican por su id en el registro global (los de
+# Partido.equipo_a_id, equipo_b_id y ganador_id); el nombre solo se une al leer.
+
+# Criterio de ordenación de los rankings -> columna (todas indexadas en models.py)
+CRITERIOS = {
+    'victorias': EstadisticaEquipo.ganados,
+    'diferencia': EstadisticaEquipo.diferencia,
+    'goles': EstadisticaEquipo.goles_favor,
+    'campeonatos': EstadisticaEquipo.campeonatos,
+}
+
+COLUMNAS = ('jugados', 'ganados', 'perdidos', 'goles_favor', 'goles_contra', 'diferencia', 'campeonatos')
+
+
+def _sumar(session, equipo_id, **incrementos):
+    """
+    Suma los incrementos a la fila del equipo con un UPDATE atómico (col = col + n),
+    creándola si aún no existe. Si dos escrituras la crean a la vez, la segunda
+    falla con IntegrityError y tournament_logic la reintenta.
+    """
+    resultado = session.execute(
+        update(EstadisticaEquipo)
+        .where(EstadisticaEquipo.equipo_id == equipo_id)
+        .values({getattr(EstadisticaEquipo, c): getattr(EstadisticaEquipo, c) + n
+                 for c, n in incrementos.items()}),
+        execution_options={'synchronize_session': False}
+    )
+    if resultado.rowcount == 0:
+        session.execute(insert(EstadisticaEquipo).values(equipo_id=equipo_id, **incrementos))
+
+
+def registrar_resultado(session, equipo_a_id, equipo_b_id, marcador_a, marcador_b, ganador_id, signo=1):
+    """Suma un resultado a las estadísticas de sus dos equipos (con signo=-1, lo resta)."""
+    for equipo_id, favor, contra in ((equipo_a_id, marcador_a, marcador_b), (equipo_b_id, marcador_b, marcador_a)):
+        gano = 1 if equipo_id == ganador_id else 0
+        _sumar(session, equipo_id,
+               jugados=signo,
+               ganados=signo * gano,
+               perdidos=signo * (1 - gano),
+               goles_favor=signo * favor,
+               goles_contra=signo * contra,
+               diferencia=signo * (favor - contra))
+
+
+# Resta por lotes (un executemany): los totales de cada equipo van en parámetros
+_RESTA_POR_EQUIPO = (
+    update(EstadisticaEquipo.__table__)
+    .where(EstadisticaEquipo.__table__.c.equipo_id == bindparam('b_equipo_id'))
+    .values({c: EstadisticaEquipo.__table__.c[c] - bindparam(f'b_{c}') for c in COLUMNAS if c != 'campeonatos'})
+)
+
+
+def restar_resultados(session, resultados):
+    """
+    Resta varios resultados [(equipo_a_id, equipo_b_id, marcador_a, marcador_b, ganador_id)],
+    p. ej. los que anula una corrección, con un único UPDATE por lotes (una fila de
+    parámetros por equipo). Sus equipos ya tienen fila: esos resultados se sumaron antes.
+    """
+    totales = {}
+    for equipo_a_id, equipo_b_id, marcador_a, marcador_b, ganador_id in resultados:
+        for equipo_id, favor, contra in ((equipo_a_id, marcador_a, marcador_b), (equipo_b_id, marcador_b, marcador_a)):
+            gano = 1 if equipo_id == ganador_id else 0
+            fila = totales.setdefault(equipo_id, dict.fromkeys(COLUMNAS[:-1], 0))
+            fila['jugados'] += 1
+            fila['ganados'] += gano
+            fila['perdidos'] += 1 - gano
+            fila['goles_favor'] += favor
+            fila['goles_contra'] += contra
+            fila['diferencia'] += favor - contra
+    if totales:
+        session.execute(_RESTA_POR_EQUIPO, [
+            dict({f'b_{c}': n for c, n in fila.items()}, b_equipo_id=equipo_id) for equipo_id, fila in totales.items()
+        ])
+
+
+def registrar_campeon(session, campeon, campeon_anterior=None):
+    """
+    Cuenta un título para el nuevo campeón (y se lo descuenta al anterior, si cambió).
+    Reciben los nombres de Torneo.campeon: solo si cambia se buscan sus ids.
+    """
+    if campeon == campeon_anterior:
+        return
+    ids = registro_equipos.ids_por_nombre(session, [n for n in (campeon, campeon_anterior) if n is not None])
+    if campeon_anterior is not None:
+        _sumar(session, ids[campeon_anterior], campeonatos=-1)
+    if campeon is not None:
+        _sumar(session, ids[campeon], campeonatos=1)
+
+
+def reconstruir(conexion):
+    """
+    Recalcula toda la tabla desde 'partidos' y 'torneos' con dos sentencias
+    INSERT ... SELECT (sin pasar los datos por Python). Acepta una Session o una
+    Connection y no hace commit. Retorna el número de equipos con estadísticas.
+    Los partidos se agrupan por el id de cada equipo; los títulos se cuentan
+    uniendo el nombre del equipo con Torneo.campeon.
+    """
+    decididos = Partido.ganador_id.isnot(None)
+    lados = union_all(
+        select(Partido.equipo_a_id.label('equipo_id'), Partido.marcador_a.label('favor'),
+               Partido.marcador_b.label('contra'),
+               case((Partido.ganador_id == Partido.equipo_a_id, 1), else_=0).label('gano')).where(decididos),
+        select(Partido.equipo_b_id, Partido.marcador_b, Partido.marcador_a,
+               case((Partido.ganador_id == Partido.equipo_b_id, 1), else_=0)).where(decididos),
+    ).subquery()
+    por_equipo = select(
+        lados.c.equipo_id,
+        func.count(),
+        func.sum(lados.c.gano),
+        func.count() - func.sum(lados.c.gano),
+        func.sum(lados.c.favor),
+        func.sum(lados.c.contra),
+        func.sum(lados.c.favor) - func.sum(lados.c.contra),
+        literal(0),
+    ).group_by(lados.c.equipo_id)
+
+    conexion.execute(delete(EstadisticaEquipo))
+    conexion.execute(insert(EstadisticaEquipo).from_select(('equipo_id',) + COLUMNAS, por_equipo))
+
+    titulos = (select(func.count()).select_from(Torneo).join(Equipo, Equipo.nombre == Torneo.campeon)
+               .where(Equipo.id == EstadisticaEquipo.equipo_id)
+               .correlate(EstadisticaEquipo).scalar_subquery())
+    conexion.execute(update(EstadisticaEquipo).values(campeonatos=titulos))
+    return conexion.execute(select(func.count()).select_from(EstadisticaEquipo)).scalar()
+
+
+def obtener_top(session, criterio='victorias', limite=10):
+    """
+    Los 'limite' mejores equipos según el criterio ('victorias', 'diferencia',
+    'goles' o 'campeonatos'); los empates se ordenan por id (orden de registro).
+    La consulta recorre solo las primeras entradas del índice del criterio y une
+    el nombre de esos equipos por su clave primaria.
+    """
+    columna = CRITERIOS[criterio]
+    filas = session.query(
+        EstadisticaEquipo.equipo_id, Equipo.nombre.label('equipo'), *(getattr(EstadisticaEquipo, c) for c in COLUMNAS)
+    ).join(Equipo, Equipo.id == EstadisticaEquipo.equipo_id).order_by(
+        columna.desc(), EstadisticaEquipo.equipo_id).limit(limite)
+    return [dict(fila._mapping) for fila in filas]
@@ -0,0 +1,103 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+# ==============================================================================
+# PUB/SUB EN PROCESO PARA EL STREAM DE EVENTOS DE CADA TORNEO (SSE)
+# ==============================================================================
+#
+# Cada torneo tiene un canal con un historial corto de eventos numerados y una
+# única Condition. Publicar es O(1) más un notify_all; un suscriptor inactivo no
+# tiene cola propia, solo recuerda el número del último evento que recibió, así
+# que mantener muchos suscriptores ociosos apenas cuesta memoria.
+#
+# El bus vive en el proceso: con varios workers, cada uno solo ve los eventos
+# de las escrituras que él mismo confirma.
+
+HISTORIAL_POR_TORNEO = 256
+
+
+class CanalTorneo:
+    __slots__ = ('condicion', 'eventos', 'secuencia', 'suscriptores')
+
+    def __init__(self):
+        self.condicion = threading.Condition()
+        self.eventos = deque(maxlen=HISTORIAL_POR_TORNEO)  # (secuencia, tipo, datos)
+        self.secuencia = 0
+        self.suscriptores = 0
+
+    def pendientes(self, ultimo):
+        """
+        Eventos con secuencia > 'ultimo' (llamar con la condición tomada).
+        Si el suscriptor se quedó atrás más que el historial, retorna los que quedan.
+        """
+        nuevos = min(self.secuencia - ultimo, len(self.eventos))
+        if nuevos <= 0:
+            return []
+        return list(itertools.islice(reversed(self.eventos), nuevos))[::-1]
+
+
+class BusEventos:
+    """Publicación y suscripción de eventos por torneo, segura entre hilos."""
+
+    def __init__(self):
+        self._canales = {}
+        self._lock = threading.Lock()
+
+    def _canal(self, torneo_id):
+        canal = self._canales.get(torneo_id)
+        if canal is None:
+            with self._lock:
+                canal = self._canales.setdefault(torneo_id, CanalTorneo())
+        return canal
+
+    def publicar(self, torneo_id, tipo, datos):
+        """Publica un evento para todos los suscriptores del torneo. Retorna su secuencia."""
+        canal = self._canal(torneo_id)
+        datos = dict(datos, ts=time.time())
+        with canal.condicion:
+            canal.secuencia += 1
+            canal.eventos.append((canal.secuencia, tipo, datos))
+            canal.condicion.notify_all()
+            return canal.secuencia
+
+    def escuchar(self, torneo_id, desde=None, espera=15.0):
+        """
+        Generador infinito de eventos (secuencia, tipo, datos) de un torneo.
+        'desde' es la última secuencia recibida (cabecera Last-Event-ID); sin ella
+        solo se reciben los eventos nuevos. Cada 'espera' segundos sin eventos
+        produce None, para que el stream pueda enviar un keep-alive.
+        """
+        canal = self._canal(torneo_id)
+        with canal.condicion:
+            canal.suscriptores += 1
+            # Sin 'desde' (o con uno de antes de reiniciar el proceso) se empieza desde ahora
+            ultimo = canal.secuencia if desde is None or desde > canal.secuencia else desde
+        try:
+            while True:
+                with canal.condicion:
+                    eventos = canal.pendientes(ultimo)
+                    if not eventos:
+                        canal.condicion.wait(espera)
+                        eventos = canal.pendientes(ultimo)
+                if not eventos:
+                    yield None
+                    continue
+                for evento in eventos:
+                    ultimo = evento[0]
+                    yield evento
+        finally:
+            with canal.condicion:
+                canal.suscriptores -= 1
+
+    def suscriptores(self, torneo_id=None):
+        """Número de suscriptores activos (de un torneo o en total)."""
+        if torneo_id is not None:
+            canal = self._canales.get(torneo_id)
+            return canal.suscriptores if canal else 0
+        return sum(canal.suscriptores for canal in list(self._canales.values()))
+
+
+# Bus compartido por la aplicación y tournament_logic
+BUS = BusEventos()
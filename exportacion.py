@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import tempfile
+import time
+from sqlalchemy import Float, Integer, select
+
+from models import Torneo, Equipo, Inscripcion, Partido, EventoTorneo
+
+# ==============================================================================
+# EXPORTACIÓN EN STREAMING (CSV / JSON LINES / PARQUET)
+# ==============================================================================
+#
+# Las filas se leen por lotes de TAMANO_LOTE con yield_per (cursor del lado del
+# servidor en PostgreSQL; en SQLite el cursor ya se recorre por partes) y cada
+# lote se escribe y se suelta antes de leer el siguiente: la memoria no depende
+# del tamaño de la tabla.
+#
+# Exportaciones incrementales: cada tabla tiene una columna con el momento de su
+# último cambio (time.time()) y su índice. Una exportación retorna su marca de
+# agua; la siguiente, con desde=marca, solo incluye las filas cambiadas después.
+# La marca se toma HOLGURA_S segundos antes de empezar para no perder filas de
+# transacciones que aún no habían hecho commit: una fila puede exportarse dos
+# veces (se identifica por su 'id'), pero no se pierde ninguna cuya transacción
+# confirme menos de HOLGURA_S segundos después de marcarla.
+#
+# Límite: la marca es la hora del reloj, no una secuencia. Una fila cuya transacción
+# tarda más de HOLGURA_S en confirmar (o escrita por un servidor con el reloj
+# atrasado) puede quedar por debajo de una marca ya entregada, y ninguna exportación
+# incremental posterior la incluirá; una exportación completa la recupera.
+#
+# Parquet necesita pyarrow, una dependencia opcional: solo se importa al usarlo.
+
+FORMATOS = ('csv', 'jsonl', 'parquet')
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+TAMANO_LOTE = 10000
+HOLGURA_S = 5.0
+# Trozos en que se lee de vuelta el archivo Parquet temporal
+TAMANO_TROZO_PARQUET = 1 << 20
+
+# tabla -> (modelo, columnas exportadas, columna de la marca de agua)
+TABLAS = {
+    'torneos': (Torneo, ('id', 'nombre', 'num_equipos', 'formato', 'campeon', 'version', 'actualizado_en'),
+                'actualizado_en'),
+    'equipos': (Equipo, ('id', 'nombre', 'nombre_normalizado', 'actualizado_en'), 'actualizado_en'),
+    'inscripciones': (Inscripcion, ('id', 'torneo_id', 'equipo_id', 'creado'), 'creado'),
+    # Los equipos de cada partido van por su id en 'equipos'
+    'partidos': (Partido, ('id', 'torneo_id', 'match_id', 'ronda_nombre', 'ronda_num', 'equipo_a_id',
+                           'equipo_b_id', 'marcador_a', 'marcador_b', 'ganador_id', 'siguiente_partido_id',
+                           'actualizado_en'),
+                 'actualizado_en'),
+    # El registro de eventos incluye los partidos que elimina una corrección (ver registro_eventos.py)
+    'eventos': (EventoTorneo, ('id', 'torneo_id', 'version', 'tipo', 'datos', 'creado'), 'creado'),
+}
+
+
+def parquet_disponible():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def consulta(tabla, desde=None):
+    """
+    SELECT de las columnas exportadas de 'tabla': completa en orden de id o, con
+    'desde', solo las filas cambiadas después, en el orden del índice de la marca.
+    """
+    modelo, columnas, columna_marca = TABLAS[tabla]
+    sentencia = select(*(getattr(modelo, columna) for columna in columnas))
+    if desde is None:
+        return sentencia.order_by(modelo.id)
+    marca = getattr(modelo, columna_marca)
+    return sentencia.where(marca > desde).order_by(marca, modelo.id)
+
+
+class Exportacion:
+    """
+    Exportación de una tabla. Valida los parámetros al crearse (ValueError) y
+    fija su marca de agua; al recorrerla genera el contenido en trozos de bytes
+    (uno por lote) con una conexión propia del motor, y cuenta las filas en 'filas'.
+    """
+
+    def __init__(self, engine, tabla, formato='csv', desde=None, tamano_lote=TAMANO_LOTE):
+        if tabla not in TABLAS:
+            raise ValueError(f"Tabla desconocida: '{tabla}'. Usa una de: {', '.join(TABLAS)}.")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: '{formato}'. Usa uno de: {', '.join(FORMATOS)}.")
+        if tamano_lote < 1:
+            raise ValueError("El tamaño de lote debe ser positivo.")
+        self.engine = engine
+        self.tabla = tabla
+        self.formato = formato
+        self.desde = desde
+        self.tamano_lote = tamano_lote
+        self.columnas = TABLAS[tabla][1]
+        self.marca = time.time() - HOLGURA_S
+        self.filas = 0
+
+    @property
+    def tipo_contenido(self):
+        return TIPOS_CONTENIDO[self.formato]
+
+    @property
+    def nombre_archivo(self):
+        return f"{self.tabla}.{self.formato}"
+
+    def _lotes(self):
+        with self.engine.connect() as conexion:
+            resultado = conexion.execute(consulta(self.tabla, self.desde).execution_options(
+                yield_per=self.tamano_lote))
+            for lote in resultado.partitions():
+                self.filas += len(lote)
+                yield lote
+
+    def __iter__(self):
+        if self.formato == 'csv':
+            return self._csv()
+        if self.formato == 'jsonl':
+            return self._jsonl()
+        return self._parquet()
+
+    def _csv(self):
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator='\n')
+        escritor.writerow(self.columnas)
+        for lote in self._lotes():
+            escritor.writerows(lote)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')  # solo la cabecera: tabla vacía
+
+    def _jsonl(self):
+        columnas = self.columnas
+        for lote in self._lotes():
+            yield ''.join(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + '\n'
+                          for fila in lote).encode('utf-8')
+
+    def _esquema_arrow(self):
+        import pyarrow as pa
+
+        modelo = TABLAS[self.tabla][0]
+        campos = []
+        for columna in self.columnas:
+            tipo = modelo.__table__.c[columna].type
+            campos.append((columna, pa.int64() if isinstance(tipo, Integer)
+                           else pa.float64() if isinstance(tipo, Float) else pa.string()))
+        return pa.schema(campos)
+
+    def _parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Parquet escribe su índice al final: cada lote es un row group en un archivo
+        # temporal, que se envía en trozos cuando está completo
+        esquema = self._esquema_arrow()
+        with tempfile.TemporaryFile() as archivo:
+            with pq.ParquetWriter(archivo, esquema) as escritor:
+                for lote in self._lotes():
+                    # zip(*lote): de filas a columnas
+                    escritor.write_table(pa.Table.from_arrays(
+                        [pa.array(valores, type=campo.type) for valores, campo in zip(zip(*lote), esquema)],
+                        schema=esquema))
+            archivo.seek(0)
+            while True:
+                trozo = archivo.read(TAMANO_TROZO_PARQUET)
+                if not trozo:
+                    break
+                yield trozo
+
+
+# Archivo de marcas de agua de las exportaciones periódicas: {tabla: {"marca", "filas"}}
+
+def _leer_marcas(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def leer_marca(ruta, tabla):
+    """Marca de agua de la última exportación de 'tabla' guardada en 'ruta' (None si no hay)."""
+    return _leer_marcas(ruta).get(tabla, {}).get('marca')
+
+
+def guardar_marca(ruta, exportacion):
+    """Guarda en 'ruta' la marca de agua de una exportación terminada, para la siguiente."""
+    marcas = _leer_marcas(ruta)
+    marcas[exportacion.tabla] = {'marca': exportacion.marca, 'filas': exportacion.filas}
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(marcas, f, indent=2)
@@ -0,0 +1,619 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import insert
+from models import Partido
+import bracket
+import estadisticas
+import registro_equipos
+import registro_eventos
+
+# ==============================================================================
+# FORMATOS DE TORNEO
+# ==============================================================================
+#
+# Cada formato implementa la parte de la lógica de tournament_logic que depende
+# de él:
+#   - validar_num_equipos(num_equipos) -> None o el mensaje de error
+#   - crear_partidos_iniciales(session, torneo, participantes) -> nº de partidos
+#   - registrar_resultado(session, torneo, partido, anterior) -> (mensaje, eventos)
+#   - avanzar_ronda(session, torneo) -> (exito, mensaje, eventos)
+#   - clasificacion(equipos, partidos) -> tabla de posiciones o None, a partir de
+#     los nombres de los equipos y de los partidos ya cargados
+#   - confirmar_version / descartar: mantenimiento de su caché en memoria
+#
+# Los formatos identifican a los equipos por su nombre (único en el registro
+# global); insertar_partidos los traduce a los ids que guarda la tabla.
+#
+# Ningún formato hace commit: tournament_logic incrementa la versión del torneo,
+# confirma la transacción y publica los eventos (tipo, datos) que le retornan.
+
+ELIMINACION_DIRECTA = 'Eliminación Directa Simple'
+TODOS_CONTRA_TODOS = 'Todos contra Todos'
+SISTEMA_SUIZO = 'Sistema Suizo'
+
+PUNTOS_VICTORIA = 3
+
+
+def _datos_partido(torneo_id, ronda, posicion, equipo_a, equipo_b):
+    """Columnas de un Partido que no avanza a otro (formatos por puntos)."""
+    return {
+        'torneo_id': torneo_id,
+        'match_id': f'R{ronda}_P{posicion}',
+        'ronda_nombre': f'Ronda {ronda}',
+        'ronda_num': ronda,
+        'equipo_a': equipo_a,
+        'equipo_b': equipo_b,
+        'siguiente_partido_id': None,
+    }
+
+
+def insertar_partidos(session, filas, ids_equipos=None):
+    """
+    Inserta partidos nuevos, con los nombres de sus equipos (un único executemany
+    tras buscar los ids que no estén en 'ids_equipos'), y los anota para el
+    registro de eventos.
+    """
+    if filas:
+        session.execute(insert(Partido), registro_equipos.filas_con_ids(session, filas, ids_equipos))
+        registro_eventos.anotar_partidos(session, filas)
+
+
+def _ronda_pendiente(session, torneo_id, ronda_num=None):
+    """Primer partido sin resultado (de una ronda concreta o de todo el torneo): (match_id, ronda_num) o None."""
+    consulta = session.query(Partido.match_id, Partido.ronda_num).filter(
+        Partido.torneo_id == torneo_id,
+        Partido.ganador_id.is_(None)
+    )
+    if ronda_num is not None:
+        consulta = consulta.filter(Partido.ronda_num == ronda_num)
+    return consulta.order_by(Partido.ronda_num, Partido.id).first()
+
+
+def _ultima_ronda(session, torneo_id):
+    return session.query(Partido.ronda_num).filter(
+        Partido.torneo_id == torneo_id
+    ).order_by(Partido.ronda_num.desc()).limit(1).scalar()
+
+
+# ==============================================================================
+# 1. ELIMINACIÓN DIRECTA (árbol de bracket en memoria)
+# ==============================================================================
+
+class EliminacionDirecta:
+    nombre = ELIMINACION_DIRECTA
+
+    def validar_num_equipos(self, num_equipos):
+        # Cualquier número de equipos: si no es potencia de 2, las mejores semillas tienen bye
+        if num_equipos < 2:
+            return "Error: El torneo necesita al menos 2 equipos."
+        return None
+
+    def crear_partidos_iniciales(self, session, torneo, participantes):
+        """
+        Coloca a los participantes (en orden de semilla) con la siembra estándar e
+        inserta los partidos que ya tienen sus dos equipos. Los byes se resuelven
+        aquí mismo y no generan filas: con 70 equipos se crean los 6 partidos de
+        la Ronda 1 y los 26 de la Ronda 2 entre equipos exentos.
+        """
+        # El árbol del bracket asigna el ID lógico de cada partido (R1_P1, ...) y el
+        # partido de la siguiente ronda al que avanza su ganador (siguiente_partido_id)
+        participantes = list(participantes)
+        arbol = bracket.ArbolBracket(bracket.tamano_para(torneo.num_equipos))
+        arbol.sembrar_equipos(participantes)
+        arbol.ids_equipos = registro_equipos.ids_por_nombre(session, participantes)
+
+        # Inserción masiva (un único executemany)
+        nuevos_partidos = [arbol.datos_partido(torneo.id, nodo) for nodo in arbol.nodos_listos()]
+        insertar_partidos(session, nuevos_partidos, arbol.ids_equipos)
+
+        arbol.version = torneo.version
+        bracket.registrar_arbol(torneo.id, arbol)
+        return len(nuevos_partidos)
+
+    def registrar_resultado(self, session, torneo, partido, anterior):
+        """
+        El ganador avanza en el árbol (O(1): solo se toca el camino afectado). Si el
+        partido siguiente queda completo se crea, y si era la final se declara al campeón.
+        Si es una corrección que cambia al ganador, antes se corrige su camino hacia la final.
+        """
+        # Si otro proceso cambió el torneo, la versión no coincide y el árbol se recarga
+        arbol = bracket.obtener_arbol(session, torneo)
+        nodo = arbol.nodo(partido.match_id)
+
+        mensaje, eventos = "", []
+        if anterior is not None and anterior[2] != partido.ganador:
+            mensaje, eventos = self._corregir_camino(session, torneo, arbol, nodo, partido.registro_ganador)
+
+        nodo_siguiente = arbol.registrar_ganador(nodo, partido.ganador)
+        if nodo_siguiente is not None:
+            datos = arbol.datos_partido(torneo.id, nodo_siguiente)
+            insertar_partidos(session, [datos], arbol.ids_equipos)
+            mensaje += f" Partido {datos['match_id']} generado: {datos['equipo_a']} vs {datos['equipo_b']}."
+            return mensaje, eventos + [('partido_generado', {
+                'match_id': datos['match_id'], 'ronda': datos['ronda_num'],
+                'equipo_a': datos['equipo_a'], 'equipo_b': datos['equipo_b'],
+            })]
+        if nodo == 1:
+            torneo.campeon = partido.ganador
+            return (mensaje + f" ¡TORNEO FINALIZADO! El campeón es: {partido.ganador}",
+                    eventos + [('campeon', {'campeon': partido.ganador})])
+        return mensaje, eventos
+
+    def _corregir_camino(self, session, torneo, arbol, nodo, ganador):
+        """
+        El ganador del partido del nodo cambió ('ganador' es su Equipo): recorre la cadena siguiente_partido_id
+        hacia la final y solo lee y modifica los partidos posteriores ya creados
+        (como mucho uno por ronda, O(log n)); el resto del bracket no se toca.
+        - El partido siguiente recibe al nuevo ganador en el lugar del anterior y,
+          si ya se había jugado, pierde su resultado (se jugó con otro rival).
+        - Los partidos posteriores esperaban al ganador de un resultado anulado: se
+          eliminan y se volverán a crear cuando se conozcan sus dos equipos.
+        Los resultados anulados se restan de las estadísticas y, si la corrección
+        alcanza a la final, el torneo se queda sin campeón. Retorna (mensaje, eventos).
+        """
+        # Un partido existe solo si sus dos equipos se conocían, así que los afectados
+        # son los antecesores consecutivos ya creados a partir del partido siguiente
+        camino = []
+        antecesor = nodo >> 1
+        while antecesor and arbol.persistido[antecesor]:
+            camino.append(antecesor)
+            antecesor >>= 1
+        if not camino:
+            return "", []
+
+        ids = [arbol.match_id(k) for k in camino]
+        filas = {p.match_id: p for p in session.query(Partido).filter(
+            Partido.torneo_id == torneo.id, Partido.match_id.in_(ids))}
+
+        anulados = [filas[match_id] for match_id in ids if filas[match_id].ganador_id is not None]
+        estadisticas.restar_resultados(session, [
+            (p.equipo_a_id, p.equipo_b_id, p.marcador_a, p.marcador_b, p.ganador_id) for p in anulados])
+        anulados = [p.match_id for p in anulados]
+        for k in camino:
+            arbol.ocupante[k] = bracket.VACIO
+
+        # El partido siguiente se reescribe (equipo_a viene del hijo par, equipo_b del impar)
+        siguiente = filas[ids[0]]
+        if nodo % 2 == 0:
+            siguiente.registro_a = ganador
+        else:
+            siguiente.registro_b = ganador
+        siguiente.marcador_a = siguiente.marcador_b = siguiente.registro_ganador = None
+
+        # Los posteriores se eliminan
+        for k, match_id in zip(camino[1:], ids[1:]):
+            session.delete(filas[match_id])
+            arbol.persistido[k] = 0
+
+        if camino[-1] == 1 and torneo.campeon is not None:
+            torneo.campeon = None
+        registro_eventos.anotar_correccion(
+            session, [[siguiente.match_id, siguiente.equipo_a, siguiente.equipo_b]], ids[1:])
+
+        mensaje = f" {siguiente.match_id} pasa a {siguiente.equipo_a} vs {siguiente.equipo_b}"
+        if anulados:
+            mensaje += f"; resultados anulados: {', '.join(anulados)}"
+        if len(ids) > 1:
+            mensaje += f"; partidos eliminados: {', '.join(ids[1:])}"
+        return mensaje + ".", [('resultado_corregido', {
+            'match_id': arbol.match_id(nodo), 'actualizados': ids[:1], 'eliminados': ids[1:],
+            'anulados': anulados,
+        })]
+
+    def avanzar_ronda(self, session, torneo):
+        """
+        Pasada completa: si no quedan partidos pendientes, recarga el árbol desde la
+        DB y crea todos los partidos que ya tienen sus dos equipos y aún no existen
+        (con byes, las rondas no avanzan todas a la vez). Si la final tiene
+        ganador, declara al campeón.
+        """
+        if _ultima_ronda(session, torneo.id) is None:
+            return False, "Error: No hay partidos generados. Ejecuta primero la generación del bracket.", []
+
+        pendiente = _ronda_pendiente(session, torneo.id)
+        if pendiente:
+            return False, (f"Advertencia: La ronda 'Ronda {pendiente[1]}' no está completa. "
+                           f"El partido {pendiente[0]} no tiene resultado."), []
+
+        arbol = bracket.cargar_arbol(session, torneo)
+
+        # La final tiene ganador: el torneo ha finalizado
+        if arbol.ganador(1) is not None:
+            campeon = arbol.ganador(1)
+            torneo.campeon = campeon
+            return True, f"¡TORNEO FINALIZADO! El campeón es: {campeon}", [('campeon', {'campeon': campeon})]
+
+        datos_nuevos = [arbol.datos_partido(torneo.id, nodo) for nodo in arbol.nodos_listos()]
+        if not datos_nuevos:
+            bracket.descartar_arbol(torneo.id)
+            return False, "Error lógico: Faltan equipos para la siguiente ronda. Revisar.", []
+
+        ronda_siguiente_num = datos_nuevos[-1]['ronda_num']
+        insertar_partidos(session, datos_nuevos, arbol.ids_equipos)
+        return True, f"Ronda {ronda_siguiente_num} generada con {len(datos_nuevos)} partidos.", [
+            ('ronda_generada', {
+                'ronda': ronda_siguiente_num,
+                'partidos': [{'match_id': d['match_id'], 'equipo_a': d['equipo_a'], 'equipo_b': d['equipo_b']}
+                             for d in datos_nuevos],
+            })
+        ]
+
+    def clasificacion(self, equipos, partidos):
+        return None
+
+    def confirmar_version(self, torneo_id, version):
+        bracket.confirmar_version(torneo_id, version)
+
+    def descartar(self, torneo_id):
+        bracket.descartar_arbol(torneo_id)
+
+
+# ==============================================================================
+# 2. CLASIFICACIÓN INCREMENTAL (formatos por puntos)
+# ==============================================================================
+
+class Clasificacion:
+    """
+    Tabla de posiciones de un torneo por puntos. Se construye una vez desde la DB
+    y después se actualiza con cada resultado en O(1), sin volver a recorrer los
+    partidos ya jugados.
+    """
+    __slots__ = ('semilla', 'puntos', 'jugados', 'ganados', 'goles_favor', 'goles_contra',
+                 'rivales', 'descansos', 'version')
+
+    def __init__(self, equipos):
+        self.semilla = {equipo: posicion for posicion, equipo in enumerate(equipos)}
+        self.puntos = dict.fromkeys(self.semilla, 0)
+        self.jugados = dict.fromkeys(self.semilla, 0)
+        self.ganados = dict.fromkeys(self.semilla, 0)
+        self.goles_favor = dict.fromkeys(self.semilla, 0)
+        self.goles_contra = dict.fromkeys(self.semilla, 0)
+        self.rivales = {equipo: set() for equipo in self.semilla}  # con quién ya fue emparejado
+        self.descansos = set()  # equipos que ya tuvieron una ronda libre
+        self.version = None  # Torneo.version que refleja la tabla
+
+    def registrar_emparejamiento(self, equipo_a, equipo_b):
+        self.rivales[equipo_a].add(equipo_b)
+        self.rivales[equipo_b].add(equipo_a)
+
+    def registrar_descanso(self, equipo):
+        """Una ronda libre cuenta como victoria."""
+        self.descansos.add(equipo)
+        self.puntos[equipo] += PUNTOS_VICTORIA
+
+    def registrar_resultado(self, equipo_a, equipo_b, marcador_a, marcador_b, ganador, signo=1):
+        """Suma un resultado a la tabla (con signo=-1, lo resta)."""
+        for equipo, favor, contra in ((equipo_a, marcador_a, marcador_b), (equipo_b, marcador_b, marcador_a)):
+            self.jugados[equipo] += signo
+            self.goles_favor[equipo] += signo * favor
+            self.goles_contra[equipo] += signo * contra
+        self.ganados[ganador] += signo
+        self.puntos[ganador] += signo * PUNTOS_VICTORIA
+
+    def _clave(self, equipo):
+        return (-self.puntos[equipo], self.goles_contra[equipo] - self.goles_favor[equipo],
+                -self.goles_favor[equipo], self.semilla[equipo])
+
+    def ordenados(self):
+        """Equipos de mejor a peor: puntos, diferencia de goles, goles a favor y semilla."""
+        return sorted(self.semilla, key=self._clave)
+
+    def lider(self):
+        return min(self.semilla, key=self._clave)
+
+    def tabla(self):
+        return [
+            {'posicion': posicion, 'equipo': equipo, 'puntos': self.puntos[equipo],
+             'jugados': self.jugados[equipo], 'ganados': self.ganados[equipo],
+             'perdidos': self.jugados[equipo] - self.ganados[equipo],
+             'goles_favor': self.goles_favor[equipo], 'goles_contra': self.goles_contra[equipo],
+             'diferencia': self.goles_favor[equipo] - self.goles_contra[equipo]}
+            for posicion, equipo in enumerate(self.ordenados(), start=1)
+        ]
+
+
+def cargar_clasificacion(session, torneo, con_descansos=False):
+    """
+    Construye la clasificación de un torneo desde la DB (sin guardarla en caché).
+    La semilla de cada equipo es su orden de inscripción. Con 'con_descansos', el
+    equipo que no aparece en una ronda la tuvo libre (sistema suizo impar).
+    """
+    # Sin autoflush: el resultado que se está registrando en la sesión aún no debe contar
+    with session.no_autoflush:
+        equipos = registro_equipos.nombres_inscritos(session, torneo.id)
+        filas = registro_equipos.consultar_partidos(
+            session, 'ronda_num', 'equipo_a', 'equipo_b', 'marcador_a', 'marcador_b', 'ganador'
+        ).filter(Partido.torneo_id == torneo.id).all()
+
+    clasificacion = construir_clasificacion(equipos, filas, con_descansos)
+    clasificacion.version = torneo.version
+    return clasificacion
+
+
+def construir_clasificacion(equipos, partidos, con_descansos=False):
+    """
+    Clasificación a partir de los equipos (en orden de inscripción) y de los
+    partidos ya cargados: cualquier objeto o fila con ronda_num, equipo_a,
+    equipo_b, marcador_a, marcador_b y ganador.
+    """
+    clasificacion = Clasificacion(equipos)
+    presentes = {}  # ronda -> equipos que juegan en ella
+    for partido in partidos:
+        clasificacion.registrar_emparejamiento(partido.equipo_a, partido.equipo_b)
+        if partido.ganador is not None:
+            clasificacion.registrar_resultado(partido.equipo_a, partido.equipo_b,
+                                              partido.marcador_a, partido.marcador_b, partido.ganador)
+        if con_descansos:
+            presentes.setdefault(partido.ronda_num, set()).update((partido.equipo_a, partido.equipo_b))
+    for jugaron in presentes.values():
+        for equipo in clasificacion.semilla.keys() - jugaron:
+            clasificacion.registrar_descanso(equipo)
+    return clasificacion
+
+
+# Una clasificación por torneo y proceso, validada con Torneo.version (como los
+# árboles de bracket). Solo las escrituras, bajo el lock del torneo, la usan.
+# Está acotada igual que la de árboles: se desalojan las usadas hace más tiempo y
+# se descarta la de un torneo en cuanto tiene campeón.
+MAX_CLASIFICACIONES = 256
+
+_CLASIFICACIONES = OrderedDict()  # torneo_id -> Clasificacion
+_lock_clasificaciones = threading.Lock()
+
+
+def _guardar_clasificacion(torneo_id, clasificacion):
+    with _lock_clasificaciones:
+        _CLASIFICACIONES[torneo_id] = clasificacion
+        _CLASIFICACIONES.move_to_end(torneo_id)
+        while len(_CLASIFICACIONES) > MAX_CLASIFICACIONES:
+            _CLASIFICACIONES.popitem(last=False)
+
+
+class FormatoPorPuntos:
+    """Base de los formatos en los que gana quien más puntos suma (cada uno define num_rondas)."""
+    con_descansos = False
+
+    def validar_num_equipos(self, num_equipos):
+        if num_equipos < 2:
+            return "Error: El torneo necesita al menos 2 equipos."
+        return None
+
+    def obtener_clasificacion(self, session, torneo):
+        with _lock_clasificaciones:
+            clasificacion = _CLASIFICACIONES.get(torneo.id)
+            if clasificacion is not None:
+                _CLASIFICACIONES.move_to_end(torneo.id)
+        if clasificacion is None or clasificacion.version != torneo.version:
+            clasificacion = cargar_clasificacion(session, torneo, self.con_descansos)
+            _guardar_clasificacion(torneo.id, clasificacion)
+        return clasificacion
+
+    def _nueva_clasificacion(self, torneo, participantes):
+        clasificacion = Clasificacion(participantes)
+        clasificacion.version = torneo.version
+        _guardar_clasificacion(torneo.id, clasificacion)
+        return clasificacion
+
+    def _insertar_ronda(self, session, torneo, clasificacion, ronda, pares, descanso=None):
+        """Inserta los partidos de una ronda y los anota en la clasificación."""
+        filas = [_datos_partido(torneo.id, ronda, posicion, equipo_a, equipo_b)
+                 for posicion, (equipo_a, equipo_b) in enumerate(pares, start=1)]
+        insertar_partidos(session, filas)
+        for equipo_a, equipo_b in pares:
+            clasificacion.registrar_emparejamiento(equipo_a, equipo_b)
+        if descanso is not None:
+            clasificacion.registrar_descanso(descanso)
+        return filas
+
+    def registrar_resultado(self, session, torneo, partido, anterior):
+        """
+        Aplica el resultado a la clasificación en caché (corrigiendo el anterior, si
+        lo había). Si era el último partido del torneo, declara al campeón.
+        """
+        clasificacion = self.obtener_clasificacion(session, torneo)
+        if anterior is not None:
+            clasificacion.registrar_resultado(partido.equipo_a, partido.equipo_b, *anterior, signo=-1)
+        clasificacion.registrar_resultado(partido.equipo_a, partido.equipo_b,
+                                          partido.marcador_a, partido.marcador_b, partido.ganador)
+
+        if (_ultima_ronda(session, torneo.id) < self.num_rondas(torneo.num_equipos)
+                or _ronda_pendiente(session, torneo.id)):
+            return "", []
+        campeon = clasificacion.lider()
+        torneo.campeon = campeon
+        return f" ¡TORNEO FINALIZADO! El campeón es: {campeon}", [('campeon', {'campeon': campeon})]
+
+    def _declarar_campeon(self, session, torneo):
+        campeon = self.obtener_clasificacion(session, torneo).lider()
+        torneo.campeon = campeon
+        return True, f"¡TORNEO FINALIZADO! El campeón es: {campeon}", [('campeon', {'campeon': campeon})]
+
+    def clasificacion(self, equipos, partidos):
+        # Las lecturas no tocan la caché de las escrituras
+        return construir_clasificacion(equipos, partidos, self.con_descansos).tabla()
+
+    def confirmar_version(self, torneo_id, version):
+        clasificacion = _CLASIFICACIONES.get(torneo_id)
+        if clasificacion is not None:
+            clasificacion.version = version
+
+    def descartar(self, torneo_id):
+        with _lock_clasificaciones:
+            _CLASIFICACIONES.pop(torneo_id, None)
+
+
+# ==============================================================================
+# 3. TODOS CONTRA TODOS (método del círculo)
+# ==============================================================================
+
+def calendario_todos_contra_todos(participantes):
+    """
+    Calendario completo por el método del círculo: el primer equipo queda fijo y
+    los demás rotan una posición por ronda; en cada ronda se enfrentan las
+    posiciones opuestas. Con un número impar se añade un hueco (ronda libre).
+    Retorna una lista de rondas, cada una con sus pares (equipo_a, equipo_b).
+    Coste O(n²), proporcional al número de partidos.
+    """
+    equipos = list(participantes)
+    if len(equipos) % 2:
+        equipos.append(None)
+    n = len(equipos)
+    fijo, rotan = equipos[0], equipos[1:]
+
+    rondas = []
+    for ronda in range(n - 1):
+        circulo = [fijo] + rotan
+        pares = []
+        for i in range(n // 2):
+            equipo_a, equipo_b = circulo[i], circulo[n - 1 - i]
+            if equipo_a is None or equipo_b is None:
+                continue
+            # El equipo fijo alterna de lado para no ser siempre el equipo A
+            if i == 0 and ronda % 2:
+                equipo_a, equipo_b = equipo_b, equipo_a
+            pares.append((equipo_a, equipo_b))
+        rondas.append(pares)
+        rotan = rotan[-1:] + rotan[:-1]
+    return rondas
+
+
+class TodosContraTodos(FormatoPorPuntos):
+    nombre = TODOS_CONTRA_TODOS
+
+    def num_rondas(self, num_equipos):
+        return num_equipos - 1 if num_equipos % 2 == 0 else num_equipos
+
+    def crear_partidos_iniciales(self, session, torneo, participantes):
+        """Genera e inserta de una vez todas las rondas del calendario."""
+        participantes = list(participantes)
+        clasificacion = self._nueva_clasificacion(torneo, participantes)
+        filas = [
+            _datos_partido(torneo.id, ronda, posicion, equipo_a, equipo_b)
+            for ronda, pares in enumerate(calendario_todos_contra_todos(participantes), start=1)
+            for posicion, (equipo_a, equipo_b) in enumerate(pares, start=1)
+        ]
+        insertar_partidos(session, filas)
+        for fila in filas:
+            clasificacion.registrar_emparejamiento(fila['equipo_a'], fila['equipo_b'])
+        return len(filas)
+
+    def avanzar_ronda(self, session, torneo):
+        """Todas las rondas existen desde el principio: solo queda declarar al campeón."""
+        if _ultima_ronda(session, torneo.id) is None:
+            return False, "Error: No hay partidos generados. Ejecuta primero la generación del bracket.", []
+        pendiente = _ronda_pendiente(session, torneo.id)
+        if pendiente:
+            return False, (f"Advertencia: La ronda 'Ronda {pendiente[1]}' no está completa. "
+                           f"El partido {pendiente[0]} no tiene resultado."), []
+        return self._declarar_campeon(session, torneo)
+
+
+# ==============================================================================
+# 4. SISTEMA SUIZO (emparejamiento por clasificación)
+# ==============================================================================
+
+def emparejar_primera_ronda(participantes):
+    """
+    Primera ronda por semillas: la mitad superior contra la inferior (1 contra
+    n/2 + 1, ...). Con un número impar descansa la última semilla.
+    Retorna (pares, equipo_que_descansa).
+    """
+    equipos = list(participantes)
+    descanso = equipos.pop() if len(equipos) % 2 else None
+    mitad = len(equipos) // 2
+    return list(zip(equipos[:mitad], equipos[mitad:])), descanso
+
+
+def emparejar_suizo(clasificacion):
+    """
+    Empareja la siguiente ronda a partir de la clasificación: el mejor equipo libre
+    juega contra el siguiente de la tabla al que aún no se ha enfrentado (si ya se
+    enfrentó a todos los que quedan, contra el siguiente). Con un número impar
+    descansa el peor clasificado que aún no haya descansado.
+    Retorna (pares, equipo_que_descansa).
+    """
+    orden = clasificacion.ordenados()
+    descanso = None
+    if len(orden) % 2:
+        descanso = next((e for e in reversed(orden) if e not in clasificacion.descansos), orden[-1])
+        orden.remove(descanso)
+
+    libre = [True] * len(orden)
+    pares = []
+    for i, equipo in enumerate(orden):
+        if not libre[i]:
+            continue
+        libre[i] = False
+        rivales = clasificacion.rivales[equipo]
+        candidato = None
+        for j in range(i + 1, len(orden)):
+            if not libre[j]:
+                continue
+            if candidato is None:
+                candidato = j
+            if orden[j] not in rivales:
+                candidato = j
+                break
+        libre[candidato] = False
+        pares.append((equipo, orden[candidato]))
+    return pares, descanso
+
+
+class SistemaSuizo(FormatoPorPuntos):
+    nombre = SISTEMA_SUIZO
+    con_descansos = True
+
+    def num_rondas(self, num_equipos):
+        # ceil(log2(n)) rondas bastan para separar a un único líder
+        return max(1, (num_equipos - 1).bit_length())
+
+    def crear_partidos_iniciales(self, session, torneo, participantes):
+        participantes = list(participantes)
+        clasificacion = self._nueva_clasificacion(torneo, participantes)
+        pares, descanso = emparejar_primera_ronda(participantes)
+        return len(self._insertar_ronda(session, torneo, clasificacion, 1, pares, descanso))
+
+    def avanzar_ronda(self, session, torneo):
+        """Con la ronda actual completa, empareja la siguiente según la clasificación."""
+        ronda_actual_num = _ultima_ronda(session, torneo.id)
+        if ronda_actual_num is None:
+            return False, "Error: No hay partidos generados. Ejecuta primero la generación del bracket.", []
+        pendiente = _ronda_pendiente(session, torneo.id, ronda_actual_num)
+        if pendiente:
+            return False, (f"Advertencia: La ronda 'Ronda {ronda_actual_num}' no está completa. "
+                           f"El partido {pendiente[0]} no tiene resultado."), []
+        if ronda_actual_num >= self.num_rondas(torneo.num_equipos):
+            return self._declarar_campeon(session, torneo)
+
+        ronda_siguiente_num = ronda_actual_num + 1
+        clasificacion = self.obtener_clasificacion(session, torneo)
+        pares, descanso = emparejar_suizo(clasificacion)
+        filas = self._insertar_ronda(session, torneo, clasificacion, ronda_siguiente_num, pares, descanso)
+
+        mensaje = f"Ronda {ronda_siguiente_num} generada con {len(filas)} partidos."
+        if descanso is not None:
+            mensaje += f" {descanso} descansa esta ronda."
+        return True, mensaje, [('ronda_generada', {
+            'ronda': ronda_siguiente_num,
+            'partidos': [{'match_id': d['match_id'], 'equipo_a': d['equipo_a'], 'equipo_b': d['equipo_b']}
+                         for d in filas],
+        })]
+
+
+# ==============================================================================
+# 5. REGISTRO DE FORMATOS
+# ==============================================================================
+
+FORMATOS = {formato.nombre: formato for formato in (EliminacionDirecta(), TodosContraTodos(), SistemaSuizo())}
+NOMBRES_FORMATOS = tuple(FORMATOS)
+
+
+def obtener_formato(nombre):
+    """Retorna el formato por su nombre (KeyError si no existe); sin nombre, eliminación directa."""
+    return FORMATOS[nombre or ELIMINACION_DIRECTA]
+
+
+def descartar_caches(torneo_id):
+    """Elimina de la caché de todos los formatos el estado en memoria de un torneo."""
+    for formato in FORMATOS.values():
+        formato.descartar(torneo_id)
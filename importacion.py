@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+import time
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from models import Torneo
+import tournament_logic as logic
+import formatos
+import registro_equipos
+import registro_eventos
+
+# ==============================================================================
+# IMPORTACIÓN MASIVA DE TORNEOS Y EQUIPOS (CSV / JSON)
+# ==============================================================================
+#
+# Formatos aceptados:
+#   - JSON: una lista (o {"torneos": [...]}) de objetos
+#       {"nombre": "Copa", "num_equipos": 8, "formato": "...", "equipos": ["A", "B", ...]}
+#     'num_equipos' es opcional (por defecto, el número de equipos de la lista) y
+#     'formato' también (por defecto, eliminación directa).
+#   - CSV con cabecera 'torneo,equipo' y, opcionalmente, 'num_equipos' y 'formato';
+#     una fila por equipo. Las filas de un mismo torneo se agrupan por su nombre.
+
+def leer_json(texto):
+    """Convierte un documento JSON en la lista de torneos a importar."""
+    datos = json.loads(texto)
+    if isinstance(datos, dict):
+        datos = datos.get('torneos', [])
+    if not isinstance(datos, list):
+        raise ValueError("El JSON debe ser una lista de torneos o un objeto con la clave 'torneos'.")
+    return datos
+
+
+def leer_csv(texto):
+    """Convierte un CSV (torneo,equipo[,num_equipos][,formato]) en la lista de torneos a importar."""
+    lector = csv.DictReader(io.StringIO(texto))
+    if not lector.fieldnames or not {'torneo', 'equipo'} <= set(lector.fieldnames):
+        raise ValueError("El CSV debe tener las columnas 'torneo' y 'equipo'.")
+
+    torneos = {}
+    for fila in lector:
+        nombre = (fila.get('torneo') or '').strip()
+        torneo = torneos.setdefault(nombre, {'nombre': nombre, 'equipos': []})
+        if fila.get('num_equipos'):
+            torneo['num_equipos'] = int(fila['num_equipos'])
+        if (fila.get('formato') or '').strip():
+            torneo['formato'] = fila['formato'].strip()
+        if (fila.get('equipo') or '').strip():
+            torneo['equipos'].append(fila['equipo'])
+    return list(torneos.values())
+
+
+def formato_por_extension(nombre_archivo):
+    """Retorna 'csv' o 'json' según la extensión del archivo (None si no se reconoce)."""
+    extension = (nombre_archivo or '').rsplit('.', 1)[-1].lower()
+    return extension if extension in ('csv', 'json') else None
+
+
+def leer_torneos(texto, formato=None):
+    """
+    Lee los torneos de un texto en CSV o JSON. Si no se indica el formato, se
+    detecta a partir del primer carácter del contenido.
+    """
+    if formato is None:
+        formato = 'json' if texto.lstrip()[:1] in ('[', '{') else 'csv'
+    if formato == 'json':
+        return leer_json(texto)
+    if formato == 'csv':
+        return leer_csv(texto)
+    raise ValueError(f"Formato de importación no soportado: {formato}")
+
+
+def _validar_torneo(datos, generar_bracket):
+    """
+    Valida y normaliza los datos de un torneo.
+    Retorna (nombre, num_equipos, formato, equipos, error).
+    """
+    if not isinstance(datos, dict):
+        return None, None, None, None, "Error: Cada torneo debe ser un objeto con 'nombre' y 'equipos'."
+    if not isinstance(datos.get('equipos') or [], list):
+        return None, None, None, None, "Error: Los equipos del torneo deben ser una lista de nombres."
+    nombre = str(datos.get('nombre') or '').strip()
+    equipos = [str(e).strip() for e in datos.get('equipos') or []]
+    if not nombre:
+        return None, None, None, None, "Error: El nombre del torneo es obligatorio."
+    if any(not e for e in equipos):
+        return None, None, None, None, "Error: Hay equipos sin nombre."
+
+    try:
+        num_equipos = int(datos.get('num_equipos') or len(equipos))
+    except (TypeError, ValueError):
+        return None, None, None, None, "Error: El número de equipos debe ser un valor numérico."
+    formato = str(datos.get('formato') or formatos.ELIMINACION_DIRECTA).strip()
+    error = logic.validar_num_equipos(num_equipos, formato)
+    if error:
+        return None, None, None, None, error
+
+    # Duplicados con un set (O(n)) en lugar de recorrer la lista por cada equipo
+    vistos = set()
+    for equipo in equipos:
+        clave = registro_equipos.normalizar_nombre(equipo)
+        if clave in vistos:
+            return None, None, None, None, f"Error: El equipo '{equipo}' está duplicado."
+        vistos.add(clave)
+
+    if len(equipos) > num_equipos:
+        return None, None, None, None, f"Error: {len(equipos)} equipos superan el límite de {num_equipos}."
+    if generar_bracket and len(equipos) != num_equipos:
+        return None, None, None, None, f"Error: Faltan equipos para generar el bracket. Requiere {num_equipos}, tiene {len(equipos)}."
+    return nombre, num_equipos, formato, equipos, None
+
+
+def importar_torneos(session, torneos, generar_bracket=False):
+    """
+    Crea cada torneo con todos sus equipos (y opcionalmente sus partidos iniciales)
+    en una única transacción por torneo, usando inserciones masivas. Los equipos
+    que ya están en el registro global se inscriben sin duplicarse: una consulta
+    IN busca los existentes y una inserción masiva registra el resto.
+    Un torneo con errores no impide importar los demás.
+
+    Retorna un resumen con los torneos creados, las filas insertadas, los errores
+    y el rendimiento en filas por segundo.
+    """
+    inicio = time.perf_counter()
+    resumen = {'torneos_creados': [], 'equipos': 0, 'partidos': 0, 'errores': []}
+
+    for posicion, datos in enumerate(torneos, start=1):
+        nombre, num_equipos, formato, equipos, error = _validar_torneo(datos, generar_bracket)
+        if error:
+            resumen['errores'].append({'torneo': posicion, 'error': error,
+                                       'nombre': datos.get('nombre') if isinstance(datos, dict) else None})
+            continue
+
+        torneo = Torneo(nombre=nombre, num_equipos=num_equipos,
+                        formato=formato, campeon=None)
+        torneo_id = None
+        try:
+            session.add(torneo)
+            session.flush()  # Obtiene torneo.id sin cerrar la transacción
+            torneo_id = torneo.id
+            if equipos:
+                # Con los nombres registrados ("real madrid" -> "Real Madrid" si ya existía)
+                equipos = registro_equipos.inscribir(session, torneo_id, equipos)
+                registro_eventos.anotar(session, registro_eventos.EQUIPOS_AGREGADOS, {'equipos': equipos})
+            num_partidos = 0
+            if generar_bracket:
+                # Como en generar_bracket_inicial: la nueva versión invalida árboles y vistas en caché
+                num_partidos = logic.crear_ronda_inicial(session, torneo, equipos)
+                logic.incrementar_version(torneo)
+            version = torneo.version
+            registro_eventos.escribir(session, torneo)
+            session.commit()
+        except (SQLAlchemyError, ValueError) as e:
+            # El torneo se descarta entero y se informa como una fila con errores
+            session.rollback()
+            formatos.descartar_caches(torneo_id)
+            if isinstance(e, IntegrityError):
+                error = "Error: Otra importación registró los mismos equipos al mismo tiempo. Vuelve a intentarlo."
+            elif isinstance(e, SQLAlchemyError):
+                error = "Error: No se pudo guardar el torneo en la base de datos. Vuelve a intentarlo."
+            else:
+                error = f"Error: No se pudo importar el torneo ({e})."
+            resumen['errores'].append({'torneo': posicion, 'nombre': nombre, 'error': error})
+            continue
+
+        if generar_bracket:
+            formatos.obtener_formato(formato).confirmar_version(torneo_id, version)
+        resumen['torneos_creados'].append({'id': torneo_id, 'nombre': nombre})
+        resumen['equipos'] += len(equipos)
+        resumen['partidos'] += num_partidos
+
+    segundos = time.perf_counter() - inicio
+    filas = len(resumen['torneos_creados']) + resumen['equipos'] + resumen['partidos']
+    resumen['filas'] = filas
+    resumen['segundos'] = round(segundos, 4)
+    resumen['filas_por_segundo'] = round(filas / segundos, 1) if segundos > 0 else None
+    return resumen
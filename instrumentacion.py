@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import Response, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# ==============================================================================
+# INSTRUMENTACIÓN OPCIONAL DE PETICIONES (/metrics y peticiones lentas)
+# ==============================================================================
+#
+# Se activa con instalar(app, engine). Durante cada petición se registran, en
+# un registro por hilo:
+#   - las sentencias SQL y su duración (eventos del motor de SQLAlchemy),
+#   - las entidades ORM cargadas (evento do_orm_execute de las sesiones),
+#   - el tiempo de renderizado de las plantillas (señales de Flask).
+# Al terminar se acumulan las métricas por endpoint, se señalan las consultas
+# sospechosas (la misma sentencia repetida, típica de un N+1, o la misma entidad
+# cargada varias veces) y, si la petición supera el umbral, se registra en el
+# log junto con sus sentencias más lentas.
+
+# Límites (segundos) de los buckets del histograma de duración de las peticiones
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Veces que una misma sentencia puede ejecutarse en una petición antes de considerarla un N+1
+REPETICIONES_SOSPECHOSAS = 3
+# Sentencias que se incluyen en el log de una petición lenta
+SENTENCIAS_EN_LOG = 5
+
+_local = threading.local()
+
+
+class RegistroPeticion:
+    """Lo que ocurre durante una petición (vive en el hilo que la atiende)."""
+    __slots__ = ('inicio', 'consultas', 'entidades', 'plantillas', 'inicio_plantilla')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = []         # (sentencia, segundos)
+        self.entidades = Counter()  # nombre de la entidad -> cargas completas
+        self.plantillas = 0.0       # segundos renderizando plantillas
+        self.inicio_plantilla = []
+
+    def sospechosas(self):
+        """Retorna [(tipo, descripción, veces)] de las consultas sospechosas de N+1 o duplicadas."""
+        hallazgos = []
+        for sentencia, veces in Counter(s for s, _ in self.consultas).items():
+            if veces >= REPETICIONES_SOSPECHOSAS:
+                hallazgos.append(('sentencia_repetida', _resumir(sentencia), veces))
+        for entidad, veces in self.entidades.items():
+            if veces > 1:
+                hallazgos.append(('entidad_duplicada', entidad, veces))
+        return hallazgos
+
+
+def _resumir(sentencia, largo=200):
+    sentencia = ' '.join(sentencia.split())
+    return sentencia if len(sentencia) <= largo else sentencia[:largo] + '...'
+
+
+def _etiquetas(**valores):
+    partes = []
+    for clave, valor in valores.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{clave}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+class Metricas:
+    """Métricas acumuladas por endpoint, seguras entre hilos y exportables en formato Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.peticiones = Counter()                 # (endpoint, método, estado) -> nº
+        self.buckets = defaultdict(lambda: [0] * len(BUCKETS_SEGUNDOS))
+        self.duracion = defaultdict(float)          # endpoint -> segundos
+        self.cuenta = Counter()                     # endpoint -> nº de peticiones
+        self.consultas = Counter()                  # endpoint -> sentencias SQL
+        self.segundos_sql = defaultdict(float)
+        self.segundos_plantillas = defaultdict(float)
+        self.sospechosas = Counter()                # (endpoint, tipo) -> nº
+        self.lentas = Counter()                     # endpoint -> nº
+
+    def registrar(self, endpoint, metodo, estado, segundos, registro, hallazgos, lenta):
+        with self._lock:
+            self.peticiones[(endpoint, metodo, estado)] += 1
+            buckets = self.buckets[endpoint]
+            for i, limite in enumerate(BUCKETS_SEGUNDOS):
+                if segundos <= limite:
+                    buckets[i] += 1
+            self.duracion[endpoint] += segundos
+            self.cuenta[endpoint] += 1
+            self.consultas[endpoint] += len(registro.consultas)
+            self.segundos_sql[endpoint] += sum(s for _, s in registro.consultas)
+            self.segundos_plantillas[endpoint] += registro.plantillas
+            for tipo, _, _ in hallazgos:
+                self.sospechosas[(endpoint, tipo)] += 1
+            if lenta:
+                self.lentas[endpoint] += 1
+
+    def texto_prometheus(self, fuentes=None):
+        """Métricas en el formato de texto de Prometheus (0.0.4)."""
+        lineas = []
+        with self._lock:
+            lineas += ['# HELP gestor_peticiones_total Peticiones HTTP atendidas.',
+                       '# TYPE gestor_peticiones_total counter']
+            for (endpoint, metodo, estado), n in sorted(self.peticiones.items()):
+                lineas.append(f'gestor_peticiones_total{_etiquetas(endpoint=endpoint, metodo=metodo, estado=estado)} {n}')
+
+            lineas += ['# HELP gestor_peticion_segundos Duración de las peticiones.',
+                       '# TYPE gestor_peticion_segundos histogram']
+            for endpoint in sorted(self.cuenta):
+                for limite, n in zip(BUCKETS_SEGUNDOS, self.buckets[endpoint]):
+                    lineas.append(f'gestor_peticion_segundos_bucket{_etiquetas(endpoint=endpoint, le=limite)} {n}')
+                lineas.append(f'gestor_peticion_segundos_bucket{_etiquetas(endpoint=endpoint, le="+Inf")} '
+                              f'{self.cuenta[endpoint]}')
+                lineas.append(f'gestor_peticion_segundos_sum{_etiquetas(endpoint=endpoint)} {self.duracion[endpoint]:.6f}')
+                lineas.append(f'gestor_peticion_segundos_count{_etiquetas(endpoint=endpoint)} {self.cuenta[endpoint]}')
+
+            for nombre, ayuda, datos in (
+                ('gestor_sql_consultas_total', 'Sentencias SQL ejecutadas.', self.consultas),
+                ('gestor_sql_segundos_total', 'Tiempo en sentencias SQL.', self.segundos_sql),
+                ('gestor_plantilla_segundos_total', 'Tiempo renderizando plantillas.', self.segundos_plantillas),
+                ('gestor_peticiones_lentas_total', 'Peticiones por encima del umbral de lentitud.', self.lentas),
+            ):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+                for endpoint, valor in sorted(datos.items()):
+                    lineas.append(f'{nombre}{_etiquetas(endpoint=endpoint)} {round(valor, 6)}')
+
+            lineas += ['# HELP gestor_consultas_sospechosas_total Peticiones con consultas repetidas (N+1) o duplicadas.',
+                       '# TYPE gestor_consultas_sospechosas_total counter']
+            for (endpoint, tipo), n in sorted(self.sospechosas.items()):
+                lineas.append(f'gestor_consultas_sospechosas_total{_etiquetas(endpoint=endpoint, tipo=tipo)} {n}')
+
+        # Valores de otros componentes (caché del dashboard, concurrencia, SSE...)
+        for prefijo, fuente in (fuentes or {}).items():
+            for clave, valor in fuente().items():
+                nombre = f'gestor_{prefijo}_{clave}'
+                lineas += [f'# TYPE {nombre} gauge', f'{nombre} {valor}']
+        return '\n'.join(lineas) + '\n'
+
+
+# --- Eventos de SQLAlchemy ---
+#
+# Solo escriben en el registro de la petición del hilo actual, así que son los
+# mismos para todas las aplicaciones: se registran una vez por motor (o por la
+# clase Engine) y por Session aunque se creen varias aplicaciones en el proceso.
+
+def _antes_de_sql(conexion, cursor, sentencia, parametros, contexto, executemany):
+    conexion.info.setdefault('instrumentacion_inicio', []).append(time.perf_counter())
+
+
+def _despues_de_sql(conexion, cursor, sentencia, parametros, contexto, executemany):
+    """Duración de cada sentencia."""
+    inicio = conexion.info['instrumentacion_inicio'].pop()
+    registro = getattr(_local, 'registro', None)
+    if registro is not None:
+        registro.consultas.append((sentencia, time.perf_counter() - inicio))
+
+
+def _al_ejecutar_orm(estado):
+    """Entidades cargadas completas (session.get, query(Modelo), relaciones perezosas)."""
+    registro = getattr(_local, 'registro', None)
+    if registro is None or not estado.is_select:
+        return
+    for descripcion in getattr(estado.statement, 'column_descriptions', ()):
+        entidad = descripcion.get('entity')
+        if entidad is not None and descripcion.get('expr') is entidad:
+            registro.entidades[entidad.__name__] += 1
+
+
+def _escuchar_una_vez(objetivo, nombre, funcion):
+    if not event.contains(objetivo, nombre, funcion):
+        event.listen(objetivo, nombre, funcion)
+
+
+def instalar(app, engine, fuentes=None, umbral_lento_ms=500):
+    """
+    Activa la instrumentación en 'app' para las consultas de 'engine' y publica
+    /metrics. 'fuentes' es un dict prefijo -> función que retorna {métrica: valor}
+    con valores de otros componentes. 'engine' puede ser también la clase Engine
+    de SQLAlchemy, para instrumentar motores que aún no se han creado (la
+    aplicación crea el suyo en la primera petición). Retorna el objeto Metricas.
+    """
+    metricas = Metricas()
+    umbral = umbral_lento_ms / 1000
+
+    # --- SQL y ORM ---
+
+    _escuchar_una_vez(engine, 'before_cursor_execute', _antes_de_sql)
+    _escuchar_una_vez(engine, 'after_cursor_execute', _despues_de_sql)
+    _escuchar_una_vez(Session, 'do_orm_execute', _al_ejecutar_orm)
+
+    # --- Plantillas ---
+
+    @before_render_template.connect_via(app)
+    def _antes_de_plantilla(emisor, template, context, **extra):
+        registro = getattr(_local, 'registro', None)
+        if registro is not None:
+            registro.inicio_plantilla.append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _despues_de_plantilla(emisor, template, context, **extra):
+        registro = getattr(_local, 'registro', None)
+        if registro is not None and registro.inicio_plantilla:
+            registro.plantillas += time.perf_counter() - registro.inicio_plantilla.pop()
+
+    # --- Peticiones ---
+
+    def _terminar(estado):
+        registro = getattr(_local, 'registro', None)
+        if registro is None:
+            return
+        _local.registro = None
+        segundos = time.perf_counter() - registro.inicio
+        endpoint = request.endpoint or 'desconocido'
+        hallazgos = registro.sospechosas()
+        lenta = segundos >= umbral
+        metricas.registrar(endpoint, request.method, estado, segundos, registro, hallazgos, lenta)
+
+        for tipo, descripcion, veces in hallazgos:
+            app.logger.warning("Consulta sospechosa (%s) en %s %s: %s x%d",
+                               tipo, request.method, request.path, descripcion, veces)
+        if lenta:
+            lineas = [f"  {s * 1000:8.2f} ms  {_resumir(sentencia)}"
+                      for sentencia, s in sorted(registro.consultas, key=lambda c: c[1], reverse=True)[:SENTENCIAS_EN_LOG]]
+            app.logger.warning(
+                "Petición lenta: %s %s %.1f ms (%d consultas SQL, %.1f ms en SQL, %.1f ms en plantillas)\n%s",
+                request.method, request.path, segundos * 1000, len(registro.consultas),
+                sum(s for _, s in registro.consultas) * 1000, registro.plantillas * 1000, '\n'.join(lineas))
+
+    @app.before_request
+    def _iniciar_registro():
+        _local.registro = RegistroPeticion()
+
+    @app.after_request
+    def _registrar_respuesta(respuesta):
+        _terminar(respuesta.status_code)
+        return respuesta
+
+    @app.teardown_request
+    def _registrar_error(excepcion=None):
+        # Solo queda un registro abierto si la petición terminó con una excepción
+        _terminar(500)
+
+    def metrics():
+        """Métricas de la aplicación en formato Prometheus."""
+        return Response(metricas.texto_prometheus(fuentes), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
+    return metricas
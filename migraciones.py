@@ -0,0 +1,296 @@
+import time
+from sqlalchemy import Column, exc, insert, inspect, text
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.sql import visitors
+from models import Base, Torneo, Equipo, Inscripcion, Partido, EstadisticaEquipo, EventoTorneo
+import estadisticas
+import registro_equipos
+import registro_eventos
+
+# ==============================================================================
+# MIGRACIONES IN-PLACE DEL ESQUEMA (gestor.db)
+# ==============================================================================
+#
+# Base.metadata.create_all solo crea las tablas que no existen; no añade columnas
+# ni índices nuevos a tablas ya creadas. Cada paso de MIGRACIONES actualiza una
+# base de datos existente y la versión aplicada se guarda en 'version_esquema'.
+
+TABLA_VERSION = 'version_esquema'
+
+
+def _columnas_indice(indice):
+    """Columnas de un índice, incluidas las de su condición si es parcial."""
+    columnas = {columna.name for columna in indice.columns}
+    condicion = indice.dialect_options['sqlite']['where']
+    if condicion is not None:
+        columnas |= {c.name for c in visitors.iterate(condicion) if isinstance(c, Column)}
+    return columnas
+
+
+def _crear_indices(conn, tabla):
+    """
+    Crea los índices de 'tabla' definidos en models.py cuyas columnas ya existen
+    (los de columnas que añade una migración posterior los crea esa migración).
+    """
+    columnas = {c['name'] for c in inspect(conn).get_columns(tabla.name)}
+    for indice in tabla.indexes:
+        if _columnas_indice(indice) <= columnas:
+            indice.create(conn, checkfirst=True)
+
+
+def _m001_ronda_num_e_indices(conn):
+    """
+    Añade la columna numérica 'ronda_num' a partidos (rellenándola a partir de
+    'ronda_nombre') y crea los índices compuestos definidos en models.py.
+    """
+    columnas = {c['name'] for c in inspect(conn).get_columns('partidos')}
+    if 'ronda_num' not in columnas:
+        conn.execute(text(
+            "ALTER TABLE partidos ADD COLUMN ronda_num INTEGER NOT NULL DEFAULT 1"
+        ))
+        # 'Ronda 12' -> 12 (el prefijo 'Ronda ' tiene 6 caracteres)
+        conn.execute(text(
+            "UPDATE partidos SET ronda_num = CAST(SUBSTR(ronda_nombre, 7) AS INTEGER)"
+        ))
+
+    _crear_indices(conn, Partido.__table__)
+
+
+def _m002_version_torneo(conn):
+    """Añade el contador 'version' a torneos (invalidación de la caché del dashboard)."""
+    columnas = {c['name'] for c in inspect(conn).get_columns('torneos')}
+    if 'version' not in columnas:
+        conn.execute(text(
+            "ALTER TABLE torneos ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+        ))
+
+
+def _m003_indices_estado_torneo(conn):
+    """Crea los índices parciales por estado (en curso / finalizado) de torneos."""
+    _crear_indices(conn, Torneo.__table__)
+
+
+def _m004_partido_unico_por_torneo(conn):
+    """
+    Convierte el índice (torneo_id, match_id) en único. Antes se elimina cualquier
+    partido duplicado por escrituras concurrentes, conservando el primero creado.
+    """
+    conn.execute(text(
+        "DELETE FROM partidos WHERE id NOT IN ("
+        "SELECT MIN(id) FROM partidos GROUP BY torneo_id, match_id)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_partidos_torneo_match"))
+    _crear_indices(conn, Partido.__table__)
+
+
+def _m005_estadisticas_equipos(conn):
+    """
+    Rellena la tabla 'estadisticas_equipos' (creada por create_all) con los
+    resultados ya registrados.
+    """
+    estadisticas.reconstruir(conn)
+
+
+def _m006_registro_eventos(conn):
+    """
+    Las tablas 'eventos_torneos' e 'instantaneas_torneos' las crea create_all. Los
+    torneos anteriores al registro no tienen eventos: se guarda una instantánea de
+    su estado actual, desde la que se reproducirán sus eventos futuros.
+    """
+    session = Session(bind=conn)
+    # Solo las columnas que existen en la versión 6 del esquema
+    for torneo in session.query(Torneo).options(load_only(Torneo.campeon, Torneo.version)).order_by(Torneo.id):
+        registro_eventos.guardar_instantanea(session, registro_eventos.estado_desde_db(session, torneo))
+    session.close()
+
+
+def _m007_actualizado_en(conn):
+    """
+    Añade 'actualizado_en' a torneos, equipos y partidos (con la hora de la
+    migración en las filas existentes) y los índices por fecha de cambio que usan
+    las exportaciones incrementales, también en 'eventos_torneos'.
+    """
+    ahora = time.time()
+    for tabla in (Torneo.__table__, Equipo.__table__, Partido.__table__):
+        columnas = {c['name'] for c in inspect(conn).get_columns(tabla.name)}
+        if 'actualizado_en' not in columnas:
+            conn.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN actualizado_en FLOAT NOT NULL DEFAULT 0"))
+            conn.execute(text(f"UPDATE {tabla.name} SET actualizado_en = :ahora"), {'ahora': ahora})
+    for tabla in (Torneo.__table__, Equipo.__table__, Partido.__table__, EventoTorneo.__table__):
+        _crear_indices(conn, tabla)
+
+
+def _m008_registro_global_equipos(conn):
+    """
+    Convierte los equipos por torneo en un registro global con inscripciones y
+    los nombres de los partidos en ids de equipo. Las tablas 'equipos' y
+    'partidos' se reconstruyen (SQLite no puede eliminar columnas con claves
+    foráneas): se copian aparte, se vuelven a crear con el esquema de models.py
+    y se rellenan con INSERT ... SELECT.
+    - Cada nombre normalizado es un equipo, con el id y el nombre de su primera
+      fila; los nombres de partidos sin equipo (p. ej. de datos de prueba) se
+      registran también.
+    - Cada fila antigua de 'equipos' es una inscripción con el mismo id, así que
+      se conserva el orden de inscripción (la semilla).
+    'estadisticas_equipos', que es derivada, se vuelve a crear con la clave
+    equipo_id y al final se reconstruye.
+    """
+    columnas = {c['name'] for c in inspect(conn).get_columns('partidos')}
+    if 'equipo_a_id' in columnas:
+        return
+
+    # 'inscripciones' (vacía, la acaba de crear create_all) apunta a 'equipos'
+    Inscripcion.__table__.drop(conn)
+    EstadisticaEquipo.__table__.drop(conn, checkfirst=True)
+    conn.execute(text("CREATE TABLE equipos_v7 AS SELECT id, nombre, torneo_id, actualizado_en FROM equipos"))
+    conn.execute(text("CREATE TABLE partidos_v7 AS SELECT * FROM partidos"))
+    conn.execute(text("DROP TABLE partidos"))
+    conn.execute(text("DROP TABLE equipos"))
+    Base.metadata.create_all(conn, tables=[Equipo.__table__, Inscripcion.__table__, Partido.__table__,
+                                           EstadisticaEquipo.__table__])
+
+    # Registro: nombre antiguo -> id del equipo (en Python: la normalización no es SQL portable)
+    equipos = {}      # nombre normalizado -> id
+    registro = []     # filas de 'equipos'
+    inscripciones = []
+    ids_por_nombre = {}
+    antiguos = conn.execute(text("SELECT id, nombre, torneo_id, actualizado_en FROM equipos_v7 ORDER BY id")).all()
+    inscritos = set()
+    for equipo_id, nombre, torneo_id, actualizado_en in antiguos:
+        clave = registro_equipos.normalizar_nombre(nombre)
+        if clave not in equipos:
+            equipos[clave] = equipo_id
+            registro.append({'id': equipo_id, 'nombre': nombre, 'nombre_normalizado': clave,
+                             'actualizado_en': actualizado_en})
+        ids_por_nombre[nombre] = equipos[clave]
+        if (torneo_id, equipos[clave]) not in inscritos:
+            inscritos.add((torneo_id, equipos[clave]))
+            inscripciones.append({'id': equipo_id, 'torneo_id': torneo_id, 'equipo_id': equipos[clave],
+                                  'creado': actualizado_en})
+
+    siguiente_id = max((fila['id'] for fila in registro), default=0) + 1
+    ahora = time.time()
+    for nombre, in conn.execute(text(
+            "SELECT equipo_a FROM partidos_v7 UNION SELECT equipo_b FROM partidos_v7 "
+            "UNION SELECT ganador FROM partidos_v7 WHERE ganador IS NOT NULL")):
+        if nombre in ids_por_nombre:
+            continue
+        clave = registro_equipos.normalizar_nombre(nombre)
+        if clave not in equipos:
+            equipos[clave] = siguiente_id
+            registro.append({'id': siguiente_id, 'nombre': nombre, 'nombre_normalizado': clave,
+                             'actualizado_en': ahora})
+            siguiente_id += 1
+        ids_por_nombre[nombre] = equipos[clave]
+
+    if registro:
+        conn.execute(insert(Equipo), registro)
+    if inscripciones:
+        conn.execute(insert(Inscripcion), inscripciones)
+
+    # Partidos: sus nombres se traducen con una tabla auxiliar, sin pasar las filas por Python
+    conn.execute(text("CREATE TABLE nombres_v7 (nombre VARCHAR(100) PRIMARY KEY, equipo_id INTEGER NOT NULL)"))
+    if ids_por_nombre:
+        conn.execute(text("INSERT INTO nombres_v7 (nombre, equipo_id) VALUES (:nombre, :equipo_id)"),
+                     [{'nombre': nombre, 'equipo_id': equipo_id} for nombre, equipo_id in ids_por_nombre.items()])
+    conn.execute(text(
+        "INSERT INTO partidos (id, torneo_id, match_id, ronda_nombre, ronda_num, equipo_a_id, equipo_b_id, "
+        "marcador_a, marcador_b, ganador_id, siguiente_partido_id, actualizado_en) "
+        "SELECT p.id, p.torneo_id, p.match_id, p.ronda_nombre, p.ronda_num, a.equipo_id, b.equipo_id, "
+        "p.marcador_a, p.marcador_b, g.equipo_id, p.siguiente_partido_id, p.actualizado_en "
+        "FROM partidos_v7 p "
+        "JOIN nombres_v7 a ON a.nombre = p.equipo_a "
+        "JOIN nombres_v7 b ON b.nombre = p.equipo_b "
+        "LEFT JOIN nombres_v7 g ON g.nombre = p.ganador"
+    ))
+    # Los campeones de nombres unificados pasan a llamarse como su equipo
+    conn.execute(text(
+        "UPDATE torneos SET campeon = (SELECT e.nombre FROM nombres_v7 n JOIN equipos e ON e.id = n.equipo_id "
+        "WHERE n.nombre = torneos.campeon) "
+        "WHERE campeon IN (SELECT nombre FROM nombres_v7)"
+    ))
+    for tabla in ('nombres_v7', 'partidos_v7', 'equipos_v7'):
+        conn.execute(text(f"DROP TABLE {tabla}"))
+    if conn.dialect.name == 'postgresql':
+        # Las filas se insertaron con su id: las secuencias deben continuar tras el mayor
+        for tabla in ('equipos', 'inscripciones', 'partidos'):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                              f"COALESCE(MAX(id), 0) + 1, false) FROM {tabla}"))
+
+    estadisticas.reconstruir(conn)
+
+
+# Lista ordenada de (versión, función). Añadir siempre al final.
+MIGRACIONES = [
+    (1, _m001_ronda_num_e_indices),
+    (2, _m002_version_torneo),
+    (3, _m003_indices_estado_torneo),
+    (4, _m004_partido_unico_por_torneo),
+    (5, _m005_estadisticas_equipos),
+    (6, _m006_registro_eventos),
+    (7, _m007_actualizado_en),
+    (8, _m008_registro_global_equipos),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+# Pasos que no cambian el esquema: solo rellenan datos con el código actual
+# (estadisticas.py, registro_eventos.py), que lee el esquema de models.py. Si están
+# pendientes se aplican después de los demás, cuando el esquema ya es el actual
+# (p. ej. una base de datos en la versión 4 necesita los ids de equipo de _m008).
+PASOS_DE_DATOS = {5, 6}
+
+
+def _leer_version(conn):
+    fila = conn.execute(text(f"SELECT MAX(version) FROM {TABLA_VERSION}")).first()
+    return fila[0] or 0
+
+
+def _guardar_version(conn, version):
+    conn.execute(text(f"DELETE FROM {TABLA_VERSION}"))
+    conn.execute(text(f"INSERT INTO {TABLA_VERSION} (version) VALUES (:v)"), {'v': version})
+
+
+def version_esquema(engine):
+    """
+    Versión del esquema de la base de datos, o 0 si aún no se ha creado. Solo lee
+    'version_esquema' (una consulta): sirve para comprobar al arrancar que no hay
+    migraciones pendientes sin inspeccionar las tablas.
+    """
+    try:
+        with engine.connect() as conn:
+            return _leer_version(conn)
+    except (exc.OperationalError, exc.ProgrammingError):
+        # La tabla de versiones no existe: la base de datos está vacía
+        return 0
+
+
+def migrar(engine):
+    """
+    Lleva la base de datos a la última versión del esquema.
+    - Base de datos nueva: crea todas las tablas y la marca como actualizada.
+    - Base de datos existente: crea las tablas nuevas y aplica los pasos pendientes.
+    Retorna la lista de versiones aplicadas.
+    """
+    with engine.begin() as conn:
+        tablas = set(inspect(conn).get_table_names())
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {TABLA_VERSION} (version INTEGER NOT NULL)"))
+
+        if 'torneos' not in tablas:
+            # Esquema nuevo: create_all ya genera la versión más reciente
+            Base.metadata.create_all(conn)
+            _guardar_version(conn, VERSION_ACTUAL)
+            return []
+
+        version = _leer_version(conn)
+        Base.metadata.create_all(conn)
+
+        aplicadas = []
+        pendientes = [(numero, paso) for numero, paso in MIGRACIONES if numero > version]
+        for numero, paso in sorted(pendientes, key=lambda migracion: migracion[0] in PASOS_DE_DATOS):
+            paso(conn)
+            aplicadas.append(numero)
+
+        if aplicadas:
+            _guardar_version(conn, VERSION_ACTUAL)
+        return aplicadas
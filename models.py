@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, Text
+import time
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, Text, Float, Index, text, select
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
 # Define la base declarativa para SQLAlchemy
@@ -13,28 +15,90 @@ class Torneo(Base):
     num_equipos = Column(Integer, nullable=False)
     formato = Column(String(50), default='Eliminación Directa Simple')
     campeon = Column(String(100), nullable=True) # Nombre del campeón
+    version = Column(Integer, nullable=False, default=0) # Se incrementa con cada cambio del torneo (caché y concurrencia)
+    actualizado_en = Column(Float, nullable=False, default=time.time, onupdate=time.time) # Exportaciones incrementales
     
-    # Relación 1:N con Equipos (Un torneo tiene muchos equipos)
-    equipos = relationship("Equipo", back_populates="torneo", cascade="all, delete-orphan")
+    # Relación 1:N con Inscripciones (los equipos del registro global que juegan el torneo)
+    inscripciones = relationship("Inscripcion", back_populates="torneo", cascade="all, delete-orphan")
+    # Sus equipos en orden de inscripción (solo lectura: se inscriben con registro_equipos.py)
+    equipos = relationship("Equipo", secondary="inscripciones", order_by="Inscripcion.id", viewonly=True)
     # Relación 1:N con Partidos (Un torneo tiene muchos partidos)
     partidos = relationship("Partido", back_populates="torneo", cascade="all, delete-orphan")
 
+    # Bloqueo optimista: cada UPDATE de un torneo exige que 'version' no haya cambiado
+    # desde que se leyó (si cambió, SQLAlchemy lanza StaleDataError). La versión la
+    # incrementa tournament_logic.incrementar_version, no SQLAlchemy.
+    __mapper_args__ = {
+        'version_id_col': version,
+        'version_id_generator': False,
+    }
+
+    # Índices parciales para paginar por id (keyset) filtrando por estado
+    __table_args__ = (
+        Index('ix_torneos_en_curso', 'id',
+              sqlite_where=text('campeon IS NULL'),
+              postgresql_where=text('campeon IS NULL')),
+        Index('ix_torneos_finalizados', 'id',
+              sqlite_where=text('campeon IS NOT NULL'),
+              postgresql_where=text('campeon IS NOT NULL')),
+        # Filas cambiadas desde la última exportación (ver exportacion.py)
+        Index('ix_torneos_actualizado', 'actualizado_en'),
+    )
+
     def __repr__(self):
         return f"<Torneo(id={self.id}, nombre='{self.nombre}', equipos={self.num_equipos})>"
 
 class Equipo(Base):
     __tablename__ = 'equipos'
-    
+
+    # Registro global: un mismo equipo puede inscribirse en varios torneos (ver Inscripcion)
     id = Column(Integer, primary_key=True)
-    nombre = Column(String(100), nullable=False, unique=True)
-    
-    # Clave Foránea: Relaciona cada equipo con su torneo padre
-    torneo_id = Column(Integer, ForeignKey('torneos.id'), nullable=False)
-    torneo = relationship("Torneo", back_populates="equipos")
+    nombre = Column(String(100), nullable=False)
+    # registro_equipos.normalizar_nombre(nombre): búsquedas sin distinguir mayúsculas ni espacios
+    nombre_normalizado = Column(String(100), nullable=False)
+
+    inscripciones = relationship("Inscripcion", back_populates="equipo")
+
+    actualizado_en = Column(Float, nullable=False, default=time.time, onupdate=time.time)
+
+    __table_args__ = (
+        # Búsqueda por nombre (y unicidad): dos equipos no pueden normalizarse igual
+        Index('ix_equipos_nombre_normalizado', 'nombre_normalizado', unique=True),
+        Index('ix_equipos_actualizado', 'actualizado_en'),
+    )
 
     def __repr__(self):
         return f"<Equipo(id={self.id}, nombre='{self.nombre}')>"
 
+class Inscripcion(Base):
+    __tablename__ = 'inscripciones'
+
+    # Pertenencia de un equipo a un torneo. El id da el orden de inscripción (la semilla)
+    id = Column(Integer, primary_key=True)
+    torneo_id = Column(Integer, ForeignKey('torneos.id'), nullable=False)
+    torneo = relationship("Torneo", back_populates="inscripciones")
+    equipo_id = Column(Integer, ForeignKey('equipos.id'), nullable=False)
+    equipo = relationship("Equipo", back_populates="inscripciones")
+    creado = Column(Float, nullable=False, default=time.time)
+
+    __table_args__ = (
+        # Equipos de un torneo; único: un equipo no se inscribe dos veces en el mismo torneo
+        Index('ix_inscripciones_torneo_equipo', 'torneo_id', 'equipo_id', unique=True),
+        # Torneos de un equipo
+        Index('ix_inscripciones_equipo', 'equipo_id'),
+        # Inscripciones posteriores a la última exportación
+        Index('ix_inscripciones_creado', 'creado'),
+    )
+
+    def __repr__(self):
+        return f"<Inscripcion(torneo_id={self.torneo_id}, equipo_id={self.equipo_id})>"
+
+
+def _nombre_equipo(equipo_id, etiqueta):
+    """Nombre del equipo con ese id (subconsulta escalar por clave primaria)."""
+    return select(Equipo.nombre).where(Equipo.id == equipo_id).scalar_subquery().label(etiqueta)
+
+
 class Partido(Base):
     __tablename__ = 'partidos'
     
@@ -47,17 +111,138 @@ class Partido(Base):
     # Detalles del partido
     match_id = Column(String(50), nullable=False) # El ID lógico (ej. R1_P1, R2_P1)
     ronda_nombre = Column(String(50), nullable=False) # Nombre de la ronda (ej. Ronda 1)
+    ronda_num = Column(Integer, nullable=False, default=1) # Número de ronda (1, 2, ...) para ordenar numéricamente
     
-    equipo_a = Column(String(100), nullable=False)
-    equipo_b = Column(String(100), nullable=False)
+    # Los equipos se guardan por su id en el registro global; equipo_a, equipo_b y
+    # ganador (más abajo) dan sus nombres, tanto en consultas como en objetos cargados
+    equipo_a_id = Column(Integer, ForeignKey('equipos.id'), nullable=False)
+    equipo_b_id = Column(Integer, ForeignKey('equipos.id'), nullable=False)
+    registro_a = relationship("Equipo", foreign_keys=[equipo_a_id], lazy='joined', innerjoin=True)
+    registro_b = relationship("Equipo", foreign_keys=[equipo_b_id], lazy='joined', innerjoin=True)
     
     # Resultados
     marcador_a = Column(Integer, nullable=True)
     marcador_b = Column(Integer, nullable=True)
-    ganador = Column(String(100), nullable=True)
+    ganador_id = Column(Integer, ForeignKey('equipos.id'), nullable=True)
+    registro_ganador = relationship("Equipo", foreign_keys=[ganador_id], lazy='joined')
     
     # Lógica de avance
     siguiente_partido_id = Column(String(50), nullable=True) # ID del partido al que avanza el ganador
+
+    # Momento del último cambio (time.time()): marca de agua de las exportaciones incrementales
+    actualizado_en = Column(Float, nullable=False, default=time.time, onupdate=time.time)
+
+    # Índices compuestos para las consultas calientes de tournament_logic.py
+    __table_args__ = (
+        # Partidos de una ronda concreta / última ronda de un torneo
+        Index('ix_partidos_torneo_ronda', 'torneo_id', 'ronda_num'),
+        # Búsqueda de un partido por su ID lógico (ingreso de resultados).
+        # Único: dos escrituras simultáneas no pueden crear el mismo partido dos veces
+        Index('ix_partidos_torneo_match', 'torneo_id', 'match_id', unique=True),
+        # Índice parcial: solo los partidos sin ganador (partidos pendientes)
+        Index('ix_partidos_pendientes', 'torneo_id', 'ronda_num',
+              sqlite_where=ganador_id.is_(None),
+              postgresql_where=ganador_id.is_(None)),
+        # Partidos de un equipo (como equipo A o como equipo B)
+        Index('ix_partidos_equipo_a', 'equipo_a_id'),
+        Index('ix_partidos_equipo_b', 'equipo_b_id'),
+        # Partidos cambiados desde la última exportación
+        Index('ix_partidos_actualizado', 'actualizado_en'),
+    )
+
+    @hybrid_property
+    def equipo_a(self):
+        return self.registro_a.nombre
+
+    @equipo_a.inplace.expression
+    @classmethod
+    def _equipo_a_expresion(cls):
+        return _nombre_equipo(cls.equipo_a_id, 'equipo_a')
+
+    @hybrid_property
+    def equipo_b(self):
+        return self.registro_b.nombre
+
+    @equipo_b.inplace.expression
+    @classmethod
+    def _equipo_b_expresion(cls):
+        return _nombre_equipo(cls.equipo_b_id, 'equipo_b')
+
+    @hybrid_property
+    def ganador(self):
+        return self.registro_ganador.nombre if self.registro_ganador is not None else None
+
+    @ganador.inplace.expression
+    @classmethod
+    def _ganador_expresion(cls):
+        # Para filtrar por partidos pendientes, mejor ganador_id (índice parcial)
+        return _nombre_equipo(cls.ganador_id, 'ganador')
     
     def __repr__(self):
-        return f"<Partido(id={self.id}, match_id='{self.match_id}', ronda='{self.ronda_nombre}', avance='{self.siguiente_partido_id}')>"
\ No newline at end of file
+        return f"<Partido(id={self.id}, match_id='{self.match_id}', ronda='{self.ronda_nombre}', avance='{self.siguiente_partido_id}')>"
+
+class EstadisticaEquipo(Base):
+    __tablename__ = 'estadisticas_equipos'
+
+    # Estadísticas acumuladas de un equipo del registro global en todos sus partidos;
+    # tournament_logic la actualiza con cada resultado (ver estadisticas.py) en la
+    # misma transacción. El nombre se obtiene uniendo 'equipos'.
+    equipo_id = Column(Integer, ForeignKey('equipos.id'), primary_key=True)
+    jugados = Column(Integer, nullable=False, default=0)
+    ganados = Column(Integer, nullable=False, default=0)
+    perdidos = Column(Integer, nullable=False, default=0)
+    goles_favor = Column(Integer, nullable=False, default=0)
+    goles_contra = Column(Integer, nullable=False, default=0)
+    diferencia = Column(Integer, nullable=False, default=0) # goles_favor - goles_contra, guardada para poder indexarla
+    campeonatos = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EstadisticaEquipo(equipo_id={self.equipo_id}, ganados={self.ganados}, diferencia={self.diferencia})>"
+
+
+class EventoTorneo(Base):
+    __tablename__ = 'eventos_torneos'
+
+    # Registro de solo inserción con cada cambio de un torneo (ver registro_eventos.py).
+    # Los eventos de un mismo commit comparten la versión del torneo que produjo.
+    id = Column(Integer, primary_key=True)
+    torneo_id = Column(Integer, ForeignKey('torneos.id'), nullable=False)
+    version = Column(Integer, nullable=False)
+    tipo = Column(String(30), nullable=False)
+    datos = Column(Text, nullable=False) # JSON
+    creado = Column(Float, nullable=False) # time.time()
+
+    __table_args__ = (
+        # Cola de eventos de un torneo a partir de su última instantánea
+        Index('ix_eventos_torneo', 'torneo_id', 'id'),
+        # Eventos posteriores a la última exportación
+        Index('ix_eventos_creado', 'creado'),
+    )
+
+    def __repr__(self):
+        return f"<EventoTorneo(torneo_id={self.torneo_id}, version={self.version}, tipo='{self.tipo}')>"
+
+class InstantaneaTorneo(Base):
+    __tablename__ = 'instantaneas_torneos'
+
+    # Estado completo de un torneo tras el evento 'evento_id' (0 si es anterior al registro)
+    id = Column(Integer, primary_key=True)
+    torneo_id = Column(Integer, ForeignKey('torneos.id'), nullable=False)
+    version = Column(Integer, nullable=False)
+    evento_id = Column(Integer, nullable=False)
+    datos = Column(Text, nullable=False) # JSON
+    creado = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('ix_instantaneas_torneo', 'torneo_id', 'evento_id'),
+    )
+
+    def __repr__(self):
+        return f"<InstantaneaTorneo(torneo_id={self.torneo_id}, version={self.version}, evento_id={self.evento_id})>"
+
+
+# Índices de las clasificaciones globales: cada top-N es un recorrido del índice
+# en el mismo orden de la consulta (criterio DESC, equipo_id), sin ordenar la tabla
+for _criterio in ('ganados', 'diferencia', 'goles_favor', 'campeonatos'):
+    Index(f'ix_estadisticas_{_criterio}',
+          getattr(EstadisticaEquipo, _criterio).desc(), EstadisticaEquipo.equipo_id)
@@ -0,0 +1,155 @@
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import aliased
+from models import Equipo, Inscripcion, Partido
+
+# ==============================================================================
+# REGISTRO GLOBAL DE EQUIPOS E INSCRIPCIONES EN TORNEOS
+# ==============================================================================
+#
+# Cada equipo existe una sola vez en 'equipos' y se inscribe en cada torneo que
+# juega con una fila de 'inscripciones' (el id de la inscripción es su semilla).
+# Los equipos se buscan por su nombre normalizado, con índice único: "Real  Madrid"
+# y "real madrid" son el mismo equipo, que conserva el nombre con que se registró.
+#
+# Las búsquedas son por conjuntos: una consulta IN por cada LOTE_IN nombres y una
+# inserción masiva para los que faltan, en lugar de una consulta por equipo.
+#
+# Los partidos guardan los ids de sus equipos; los formatos siguen trabajando con
+# nombres (únicos en el registro) y filas_con_ids() los traduce al insertar.
+
+# Nombres por consulta IN (por debajo del límite de parámetros de SQLite)
+LOTE_IN = 500
+
+# Columnas de nombre de un partido -> columna con el id del equipo
+_COLUMNAS_EQUIPO = {'equipo_a': 'equipo_a_id', 'equipo_b': 'equipo_b_id', 'ganador': 'ganador_id'}
+
+# Columnas de nombre de un partido -> (alias de Equipo, relación por la que se une, ¿puede faltar?)
+_JOINS_EQUIPO = {
+    'equipo_a': (aliased(Equipo, name='equipo_a_registro'), Partido.registro_a, False),
+    'equipo_b': (aliased(Equipo, name='equipo_b_registro'), Partido.registro_b, False),
+    'ganador': (aliased(Equipo, name='ganador_registro'), Partido.registro_ganador, True),
+}
+
+
+def normalizar_nombre(nombre):
+    """Clave de búsqueda de un equipo: sin distinguir mayúsculas y con los espacios colapsados."""
+    return ' '.join(nombre.split()).casefold()
+
+
+def _por_lotes(valores):
+    valores = list(valores)
+    for inicio in range(0, len(valores), LOTE_IN):
+        yield valores[inicio:inicio + LOTE_IN]
+
+
+def buscar_equipos(session, nombres):
+    """Equipos ya registrados con alguno de esos nombres: {nombre normalizado: (id, nombre)}."""
+    encontrados = {}
+    for lote in _por_lotes({normalizar_nombre(nombre) for nombre in nombres}):
+        for equipo_id, nombre, clave in session.execute(
+                select(Equipo.id, Equipo.nombre, Equipo.nombre_normalizado)
+                .where(Equipo.nombre_normalizado.in_(lote))):
+            encontrados[clave] = (equipo_id, nombre)
+    return encontrados
+
+
+def registrar_equipos(session, nombres):
+    """
+    Retorna el (id, nombre registrado) de cada nombre, en el mismo orden, y
+    registra de una vez los que aún no existen (sin hacer commit).
+    """
+    equipos = buscar_equipos(session, nombres)
+    nuevos = {}
+    for nombre in nombres:
+        clave = normalizar_nombre(nombre)
+        if clave not in equipos and clave not in nuevos:
+            nuevos[clave] = nombre.strip()
+    if nuevos:
+        filas = session.execute(
+            insert(Equipo).returning(Equipo.id, Equipo.nombre, Equipo.nombre_normalizado),
+            [{'nombre': nombre, 'nombre_normalizado': clave} for clave, nombre in nuevos.items()])
+        for equipo_id, nombre, clave in filas:
+            equipos[clave] = (equipo_id, nombre)
+    return [equipos[normalizar_nombre(nombre)] for nombre in nombres]
+
+
+def inscribir(session, torneo_id, nombres):
+    """
+    Inscribe en el torneo los equipos (registrándolos si hace falta) en ese orden,
+    sin comprobar si ya estaban inscritos. Retorna sus nombres registrados.
+    """
+    equipos = registrar_equipos(session, nombres)
+    if equipos:
+        session.execute(insert(Inscripcion), [
+            {'torneo_id': torneo_id, 'equipo_id': equipo_id} for equipo_id, _ in equipos])
+    return [nombre for _, nombre in equipos]
+
+
+def esta_inscrito(session, torneo_id, equipo_id):
+    return session.query(Inscripcion.id).filter(
+        Inscripcion.torneo_id == torneo_id, Inscripcion.equipo_id == equipo_id
+    ).first() is not None
+
+
+def num_inscritos(session, torneo_id):
+    return session.query(func.count(Inscripcion.id)).filter(Inscripcion.torneo_id == torneo_id).scalar()
+
+
+def equipos_inscritos(session, torneo_id):
+    """(id, nombre) de los equipos del torneo en orden de inscripción (su semilla)."""
+    return session.query(Equipo.id, Equipo.nombre).join(
+        Inscripcion, Inscripcion.equipo_id == Equipo.id
+    ).filter(Inscripcion.torneo_id == torneo_id).order_by(Inscripcion.id).all()
+
+
+def nombres_inscritos(session, torneo_id):
+    return [nombre for _, nombre in equipos_inscritos(session, torneo_id)]
+
+
+def ids_por_nombre(session, nombres):
+    """{nombre: id} de los nombres ya registrados (un nombre equivalente también vale)."""
+    equipos = buscar_equipos(session, nombres)
+    return {nombre: equipos[normalizar_nombre(nombre)][0]
+            for nombre in nombres if normalizar_nombre(nombre) in equipos}
+
+
+def consultar_partidos(session, *columnas):
+    """
+    session.query() de las columnas de Partido indicadas por nombre. Los nombres de
+    los equipos (equipo_a, equipo_b, ganador) se leen uniendo 'equipos' por las
+    relaciones registro_* en la misma sentencia, en lugar de con una subconsulta
+    por columna y fila como hacen las expresiones de Partido.equipo_a...
+    """
+    seleccion, joins = [], []
+    for columna in columnas:
+        if columna in _JOINS_EQUIPO:
+            alias, relacion, opcional = _JOINS_EQUIPO[columna]
+            seleccion.append(alias.nombre.label(columna))
+            joins.append((relacion.of_type(alias), opcional))
+        else:
+            seleccion.append(getattr(Partido, columna))
+    consulta = session.query(*seleccion).select_from(Partido)
+    for relacion, opcional in joins:
+        consulta = consulta.outerjoin(relacion) if opcional else consulta.join(relacion)
+    return consulta
+
+
+def filas_con_ids(session, filas, ids=None):
+    """
+    Convierte filas de partidos con los nombres de sus equipos (equipo_a, equipo_b
+    y, si lo tienen, ganador) en filas con sus ids, listas para insert(Partido).
+    'ids' ({nombre: id}, p. ej. el de un árbol en caché) evita buscar esos nombres.
+    """
+    ids = ids or {}
+    faltan = {fila[columna] for fila in filas for columna in _COLUMNAS_EQUIPO
+              if fila.get(columna) is not None and fila[columna] not in ids}
+    if faltan:
+        ids = dict(ids, **ids_por_nombre(session, faltan))
+    convertidas = []
+    for fila in filas:
+        convertida = {columna: valor for columna, valor in fila.items() if columna not in _COLUMNAS_EQUIPO}
+        for columna, columna_id in _COLUMNAS_EQUIPO.items():
+            if columna in fila:
+                convertida[columna_id] = ids[fila[columna]] if fila[columna] is not None else None
+        convertidas.append(convertida)
+    return convertidas
@@ -0,0 +1,230 @@
+import json
+import time
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import Session
+
+from models import EventoTorneo, InstantaneaTorneo, Partido
+import registro_equipos
+
+# ==============================================================================
+# REGISTRO DE EVENTOS DE LOS TORNEOS (solo inserción), INSTANTÁNEAS Y REPRODUCCIÓN
+# ==============================================================================
+#
+# Cada escritura de tournament_logic anota en la sesión los eventos que produce
+# y escribir() los guarda justo antes del commit, en la misma transacción: o se
+# confirman el cambio y sus eventos, o ninguno. Los partidos que crean los
+# formatos se anotan con anotar_partidos() (y los que reescribe o elimina una
+# corrección, con anotar_correccion()) y viajan dentro del evento que los
+# produjo, así que el registro basta para reconstruir la tabla 'partidos'.
+#
+# Cada INTERVALO_INSTANTANEAS versiones de un torneo se guarda una instantánea
+# de su estado: reconstruirlo es cargar la última instantánea y reproducir solo
+# los eventos posteriores.
+
+EQUIPOS_AGREGADOS = 'equipos_agregados'     # {"equipos": [nombre, ...]}
+BRACKET_GENERADO = 'bracket_generado'       # {"partidos": [fila, ...]}
+RESULTADO_INGRESADO = 'resultado_ingresado' # {"match_id", "marcador_a", "marcador_b", "ganador", "partidos",
+                                            #  y en correcciones "actualizados": [[match_id, equipo_a, equipo_b]],
+                                            #  "eliminados": [match_id, ...]}
+RONDA_AVANZADA = 'ronda_avanzada'           # {"partidos": [fila, ...]}
+CAMPEON_DECLARADO = 'campeon_declarado'     # {"campeon"}
+
+# Versiones del torneo entre dos instantáneas
+INTERVALO_INSTANTANEAS = 100
+
+# Columnas de un partido recién creado, en el orden en que se guardan en el registro
+COLUMNAS_PARTIDO = ('match_id', 'ronda_nombre', 'ronda_num', 'equipo_a', 'equipo_b', 'siguiente_partido_id')
+
+_EVENTOS = 'registro_eventos'
+_PARTIDOS = 'registro_partidos_creados'
+_CORRECCION = 'registro_correccion'
+
+
+# ------------------------------------------------------------------------------
+# Anotación durante la transacción
+# ------------------------------------------------------------------------------
+
+def anotar(session, tipo, datos):
+    """Anota un evento del torneo que se está modificando en la transacción actual."""
+    session.info.setdefault(_EVENTOS, []).append((tipo, datos))
+
+
+def anotar_partidos(session, filas):
+    """Anota los partidos insertados (dicts con COLUMNAS_PARTIDO) para el siguiente evento."""
+    session.info.setdefault(_PARTIDOS, []).extend(
+        [fila[columna] for columna in COLUMNAS_PARTIDO] for fila in filas)
+
+
+def tomar_partidos(session):
+    """Retorna (y olvida) los partidos anotados desde la última llamada."""
+    return session.info.pop(_PARTIDOS, [])
+
+
+def anotar_correccion(session, actualizados, eliminados):
+    """
+    Anota los partidos que reescribe una corrección ([match_id, equipo_a, equipo_b],
+    sin resultado) y los que elimina, para el siguiente evento.
+    """
+    correccion = session.info.setdefault(_CORRECCION, {'actualizados': [], 'eliminados': []})
+    correccion['actualizados'].extend(actualizados)
+    correccion['eliminados'].extend(eliminados)
+
+
+def tomar_correccion(session):
+    """Retorna (y olvida) la corrección anotada: {'actualizados', 'eliminados'} o {} si no hay."""
+    return session.info.pop(_CORRECCION, {})
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_anotaciones(session):
+    # Una transacción deshecha no deja eventos a medio anotar para la siguiente
+    session.info.pop(_EVENTOS, None)
+    session.info.pop(_PARTIDOS, None)
+    session.info.pop(_CORRECCION, None)
+
+
+def escribir(session, torneo):
+    """
+    Guarda los eventos anotados con la versión actual del torneo (llamar tras
+    incrementar_version y antes del commit) y, si toca, una instantánea nueva.
+    """
+    eventos = session.info.pop(_EVENTOS, [])
+    session.info.pop(_PARTIDOS, None)
+    session.info.pop(_CORRECCION, None)
+    if not eventos:
+        return
+    ahora = time.time()
+    session.execute(insert(EventoTorneo), [
+        {'torneo_id': torneo.id, 'version': torneo.version, 'tipo': tipo,
+         'datos': json.dumps(datos, ensure_ascii=False, separators=(',', ':')), 'creado': ahora}
+        for tipo, datos in eventos
+    ])
+    if torneo.version and torneo.version % INTERVALO_INSTANTANEAS == 0:
+        guardar_instantanea(session, reconstruir_estado(session, torneo.id))
+
+
+# ------------------------------------------------------------------------------
+# Estado reconstruido y reproducción
+# ------------------------------------------------------------------------------
+
+class EstadoTorneo:
+    """Equipos, partidos y campeón de un torneo según su registro de eventos."""
+    __slots__ = ('torneo_id', 'version', 'evento_id', 'equipos', 'partidos', 'campeon')
+
+    def __init__(self, torneo_id):
+        self.torneo_id = torneo_id
+        self.version = 0
+        self.evento_id = 0  # último evento aplicado
+        self.equipos = []
+        # match_id -> [match_id, ronda_nombre, ronda_num, equipo_a, equipo_b,
+        #              siguiente_partido_id, marcador_a, marcador_b, ganador], en orden de creación
+        self.partidos = {}
+        self.campeon = None
+
+    def _crear_partidos(self, filas):
+        for fila in filas:
+            self.partidos[fila[0]] = list(fila) + [None, None, None]
+
+    def aplicar(self, evento_id, version, tipo, datos):
+        if tipo == EQUIPOS_AGREGADOS:
+            self.equipos.extend(datos['equipos'])
+        elif tipo in (BRACKET_GENERADO, RONDA_AVANZADA):
+            self._crear_partidos(datos['partidos'])
+        elif tipo == RESULTADO_INGRESADO:
+            partido = self.partidos[datos['match_id']]
+            partido[6:9] = datos['marcador_a'], datos['marcador_b'], datos['ganador']
+            for match_id, equipo_a, equipo_b in datos.get('actualizados', ()):
+                actualizado = self.partidos[match_id]
+                actualizado[3:5] = equipo_a, equipo_b
+                actualizado[6:9] = None, None, None
+            for match_id in datos.get('eliminados', ()):
+                del self.partidos[match_id]
+            self._crear_partidos(datos['partidos'])
+        elif tipo == CAMPEON_DECLARADO:
+            self.campeon = datos['campeon']
+        self.evento_id = evento_id
+        self.version = version
+
+    def como_dict(self):
+        return {'equipos': self.equipos, 'partidos': list(self.partidos.values()), 'campeon': self.campeon}
+
+    @classmethod
+    def desde_instantanea(cls, instantanea):
+        estado = cls(instantanea.torneo_id)
+        datos = json.loads(instantanea.datos)
+        estado.equipos = datos['equipos']
+        estado.partidos = {fila[0]: fila for fila in datos['partidos']}
+        estado.campeon = datos['campeon']
+        estado.version = instantanea.version
+        estado.evento_id = instantanea.evento_id
+        return estado
+
+    def filas_partidos(self):
+        """Filas para insertar en 'partidos'."""
+        columnas = COLUMNAS_PARTIDO + ('marcador_a', 'marcador_b', 'ganador')
+        return [dict(zip(columnas, partido), torneo_id=self.torneo_id) for partido in self.partidos.values()]
+
+
+def reconstruir_estado(session, torneo_id, usar_instantanea=True):
+    """
+    Estado del torneo a partir de su última instantánea y de los eventos
+    posteriores (o de todo el registro, sin 'usar_instantanea'). Retorna None si
+    el torneo no tiene historial.
+    """
+    instantanea = None
+    if usar_instantanea:
+        instantanea = session.query(InstantaneaTorneo).filter(
+            InstantaneaTorneo.torneo_id == torneo_id
+        ).order_by(InstantaneaTorneo.evento_id.desc()).first()
+
+    estado = EstadoTorneo.desde_instantanea(instantanea) if instantanea else EstadoTorneo(torneo_id)
+    eventos = session.query(EventoTorneo.id, EventoTorneo.version, EventoTorneo.tipo, EventoTorneo.datos).filter(
+        EventoTorneo.torneo_id == torneo_id, EventoTorneo.id > estado.evento_id
+    ).order_by(EventoTorneo.id)
+
+    hay_eventos = False
+    for evento_id, version, tipo, datos in eventos:
+        estado.aplicar(evento_id, version, tipo, json.loads(datos))
+        hay_eventos = True
+    if instantanea is None and not hay_eventos:
+        return None
+    return estado
+
+
+def estado_desde_db(session, torneo):
+    """Estado actual de un torneo leído de sus tablas (para su primera instantánea)."""
+    estado = EstadoTorneo(torneo.id)
+    estado.equipos = registro_equipos.nombres_inscritos(session, torneo.id)
+    for fila in registro_equipos.consultar_partidos(
+        session, 'match_id', 'ronda_nombre', 'ronda_num', 'equipo_a', 'equipo_b',
+        'siguiente_partido_id', 'marcador_a', 'marcador_b', 'ganador'
+    ).filter(Partido.torneo_id == torneo.id).order_by(Partido.id):
+        estado.partidos[fila[0]] = list(fila)
+    estado.campeon = torneo.campeon
+    estado.version = torneo.version or 0
+    return estado
+
+
+def guardar_instantanea(session, estado):
+    session.execute(insert(InstantaneaTorneo), [{
+        'torneo_id': estado.torneo_id, 'version': estado.version, 'evento_id': estado.evento_id,
+        'datos': json.dumps(estado.como_dict(), ensure_ascii=False, separators=(',', ':')),
+        'creado': time.time(),
+    }])
+
+
+def reconstruir_partidos(session, torneo):
+    """
+    Reemplaza los partidos del torneo por los que resultan de su registro de
+    eventos y restablece su campeón (sin hacer commit). Retorna el número de
+    partidos, o None si el torneo no tiene historial.
+    """
+    estado = reconstruir_estado(session, torneo.id)
+    if estado is None:
+        return None
+    session.execute(delete(Partido).where(Partido.torneo_id == torneo.id))
+    filas = estado.filas_partidos()
+    if filas:
+        session.execute(insert(Partido), registro_equipos.filas_con_ids(session, filas))
+    torneo.campeon = estado.campeon
+    return len(filas)
@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict
+
+import bracket
+import formatos
+import registro_equipos
+from models import Partido, Torneo
+
+# ==============================================================================
+# PROBABILIDADES DE TÍTULO (Monte Carlo vectorizado sobre el bracket)
+# ==============================================================================
+#
+# La fuerza de cada equipo es su Elo, calculado a partir de los resultados ya
+# registrados en el torneo. El resto del torneo se simula a partir del árbol del
+# bracket (bracket.ArbolBracket): en lugar de recorrer partidos en Python, cada
+# ronda es una operación de NumPy sobre una matriz (simulaciones x partidos de la
+# ronda) con el equipo que llega a cada partido. Los partidos ya jugados (y los
+# byes) tienen ganador fijo en todas las simulaciones.
+#
+# NumPy es una dependencia opcional: solo se importa al simular. El resultado se
+# guarda en caché por torneo y versión: cualquier cambio en el torneo la invalida.
+
+ELO_INICIAL = 1500.0
+K_ELO = 32
+
+SIMULACIONES = 100000
+MAX_SIMULACIONES = 1000000
+# Tamaño de cada bloque de simulaciones, en celdas de la matriz (acota la memoria)
+CELDAS_POR_BLOQUE = 1 << 22
+# Resultados de simulación guardados (los usados hace más tiempo se desalojan)
+MAX_EN_CACHE = 128
+# Locks que serializan el cálculo de cada torneo: un grupo fijo, elegido por el
+# id del torneo, para no guardar un lock por cada torneo consultado
+NUM_LOCKS_TORNEO = 64
+
+_cache = OrderedDict()  # (torneo_id, simulaciones) -> datos (con su 'version')
+_lock_cache = threading.Lock()
+_locks_torneo = [threading.Lock() for _ in range(NUM_LOCKS_TORNEO)]
+
+
+def numpy_disponible():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def calcular_elo(equipos, resultados):
+    """
+    Elo de cada equipo ({nombre: elo}) tras aplicar en orden los resultados
+    [(equipo_a, equipo_b, marcador_a, marcador_b)]. Como en el Elo del fútbol de
+    selecciones, la K crece con la diferencia de goles.
+    """
+    elo = dict.fromkeys(equipos, ELO_INICIAL)
+    for equipo_a, equipo_b, marcador_a, marcador_b in resultados:
+        esperado_a = 1 / (1 + 10 ** ((elo[equipo_b] - elo[equipo_a]) / 400))
+        diferencia = abs(marcador_a - marcador_b)
+        k = K_ELO * (1 if diferencia <= 1 else 1.5 if diferencia == 2 else (11 + diferencia) / 8)
+        cambio = k * ((1.0 if marcador_a > marcador_b else 0.0) - esperado_a)
+        elo[equipo_a] += cambio
+        elo[equipo_b] -= cambio
+    return elo
+
+
+def simular_bracket(ocupante, tamano, fuerza, simulaciones, semilla=None):
+    """
+    Simula el bracket 'simulaciones' veces. 'ocupante' es el array del árbol
+    (2 * tamano, VACIO donde aún no hay ganador) y 'fuerza' la de cada equipo
+    (10 ** (elo / 400)): el equipo a gana con probabilidad fa / (fa + fb).
+    Retorna una matriz (rondas x equipos) con cuántas veces ganó cada equipo un
+    partido de cada ronda.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(semilla)
+    # Índice VACIO (-1) = última posición: una fuerza cualquiera, siempre sustituida
+    fuerza = np.append(np.asarray(fuerza, dtype=np.float32), np.float32(1))
+    num_equipos = len(fuerza) - 1
+    ocupante = np.asarray(ocupante, dtype=np.int16 if num_equipos < 2 ** 15 else np.int32)
+    num_rondas = tamano.bit_length() - 1
+    conteos = np.zeros((num_rondas, num_equipos), dtype=np.int64)
+    bloque = max(1, CELDAS_POR_BLOQUE // tamano)
+
+    hechas = 0
+    while hechas < simulaciones:
+        filas = min(bloque, simulaciones - hechas)
+        # Equipos que llegan a cada posición de la ronda y su fuerza: un vector si son
+        # los mismos en todas las simulaciones, una matriz (filas x posiciones) si no
+        llegan = ocupante[tamano:]
+        fuerza_llegan = fuerza[llegan]
+        for ronda in range(1, num_rondas + 1):
+            inicio = tamano >> ronda
+            conocidos = ocupante[inicio:2 * inicio]
+            fijos = conocidos != bracket.VACIO
+            if fijos.all():
+                # Ronda ya jugada: el mismo resultado en todas las simulaciones
+                llegan, fuerza_llegan = conocidos, fuerza[conocidos]
+                conteos[ronda - 1] += np.bincount(conocidos, minlength=num_equipos) * filas
+                continue
+            equipos_a, equipos_b = llegan[..., 0::2], llegan[..., 1::2]
+            fuerza_a, fuerza_b = fuerza_llegan[..., 0::2], fuerza_llegan[..., 1::2]
+            # Sorteo con enteros de 16 bits (resolución 1/65536): gana a si azar < p * 65536
+            azar = rng.integers(0, 1 << 16, (filas, inicio), dtype=np.uint16)
+            umbral = fuerza_a / (fuerza_a + fuerza_b) * 65536
+            if llegan.ndim == 1:
+                umbral = umbral.astype(np.uint32)  # una probabilidad por partido
+            gana_a = azar < umbral
+            # Selección aritmética (sin saltos ni indexado): el ganador arrastra su fuerza
+            llegan = equipos_b + (equipos_a - equipos_b) * gana_a
+            fuerza_llegan = fuerza_b + (fuerza_a - fuerza_b) * gana_a
+            if fijos.any():
+                llegan[:, fijos] = conocidos[fijos]
+                fuerza_llegan[:, fijos] = fuerza[conocidos[fijos]]
+            conteos[ronda - 1] += np.bincount(llegan.ravel(), minlength=num_equipos)
+        hechas += filas
+    return conteos
+
+
+def _lock_de_torneo(torneo_id):
+    return _locks_torneo[hash(torneo_id) % NUM_LOCKS_TORNEO]
+
+
+def obtener_probabilidades(session, torneo_id, simulaciones=SIMULACIONES, semilla=None):
+    """
+    Probabilidades de cada equipo de alcanzar cada ronda y de ser campeón, con su
+    Elo actual (None si el torneo no existe). ValueError si el torneo no es de
+    eliminación directa o aún no tiene bracket. Se calcula una vez por versión del
+    torneo (y número de simulaciones):
+
+        {"torneo_id", "version", "simulaciones", "rondas": [2, 3, ...],
+         "equipos": [{"equipo", "elo", "alcanza_ronda": [p, ...], "campeon": p}, ...]}
+
+    Los equipos van ordenados de más a menos probable campeón; "alcanza_ronda"
+    sigue el orden de "rondas".
+    """
+    torneo = session.get(Torneo, torneo_id)
+    if torneo is None:
+        return None
+    if torneo.formato != formatos.ELIMINACION_DIRECTA:
+        raise ValueError("Las probabilidades solo se calculan en torneos de eliminación directa.")
+
+    clave = (torneo_id, simulaciones)
+    with _lock_de_torneo(torneo_id):
+        # Un solo cálculo por torneo a la vez: las peticiones simultáneas esperan a la primera
+        with _lock_cache:
+            datos = _cache.get(clave)
+            if datos is not None and datos['version'] == torneo.version and semilla is None:
+                _cache.move_to_end(clave)
+                return datos
+
+        datos = _calcular(session, torneo, simulaciones, semilla)
+        if semilla is None:
+            with _lock_cache:
+                _cache[clave] = datos
+                _cache.move_to_end(clave)
+                while len(_cache) > MAX_EN_CACHE:
+                    _cache.popitem(last=False)
+        return datos
+
+
+def _calcular(session, torneo, simulaciones, semilla):
+    import numpy as np
+
+    # Árbol propio (no el de la caché de bracket, que los escritores modifican)
+    arbol = bracket.construir_arbol(session, torneo)
+    if not session.query(Partido.id).filter(Partido.torneo_id == torneo.id).first():
+        raise ValueError("No hay partidos generados. Ejecuta primero la generación del bracket.")
+
+    resultados = registro_equipos.consultar_partidos(
+        session, 'equipo_a', 'equipo_b', 'marcador_a', 'marcador_b'
+    ).filter(Partido.torneo_id == torneo.id, Partido.ganador_id.isnot(None)).order_by(Partido.ronda_num, Partido.id)
+    elo = calcular_elo(arbol.equipos, resultados)
+    elos = np.array([elo[equipo] for equipo in arbol.equipos])
+
+    conteos = simular_bracket(arbol.ocupante, arbol.tamano, 10 ** (elos / 400), simulaciones, semilla)
+    probabilidades = conteos / simulaciones
+    equipos = [{
+        'equipo': equipo,
+        'elo': round(float(elos[i]), 1),
+        # Alcanzar la ronda r+1 es ganar un partido (o tener bye) en la ronda r
+        'alcanza_ronda': [round(float(p), 4) for p in probabilidades[:-1, i]],
+        'campeon': round(float(probabilidades[-1, i]), 4),
+    } for i, equipo in enumerate(arbol.equipos)]
+    equipos.sort(key=lambda e: (-e['campeon'], -e['elo'], e['equipo']))
+    return {
+        'torneo_id': torneo.id,
+        'version': torneo.version,
+        'simulaciones': simulaciones,
+        'rondas': list(range(2, arbol.num_rondas + 1)),
+        'equipos': equipos,
+    }
@@ -1,28 +1,122 @@
-import math
+import functools
 import random
-from models import Torneo, Equipo, Partido # Asumiendo que 'models.py' está en el mismo directorio
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from models import Torneo, Equipo, Inscripcion, Partido # Asumiendo que 'models.py' está en el mismo directorio
+import formatos
+import estadisticas
+import registro_equipos
+import registro_eventos
+from eventos import BUS
+
+
+def incrementar_version(torneo):
+    """
+    Registra un cambio en el torneo. La versión forma parte de la clave de la
+    caché del dashboard y de su ETag, así que cualquier vista guardada queda invalidada.
+    """
+    torneo.version = (torneo.version or 0) + 1
+
+
+def publicar_eventos(torneo_id, eventos, version):
+    """Publica para los espectadores los eventos (tipo, datos) de un commit ya confirmado."""
+    for tipo, datos in eventos:
+        BUS.publicar(torneo_id, tipo, dict(datos, version=version))
+
+
+def confirmar_cache(formato, torneo_id, version, finalizado):
+    """
+    Tras un commit, anota la nueva versión en la caché en memoria del formato. Si
+    el torneo ya tiene campeón su entrada se descarta: no se volverá a escribir en
+    él salvo una corrección, que la recarga.
+    """
+    if finalizado:
+        formato.descartar(torneo_id)
+    else:
+        formato.confirmar_version(torneo_id, version)
+
+
+# Intentos de una operación de escritura ante un conflicto de concurrencia, con
+# una espera aleatoria creciente entre ellos para no volver a chocar
+INTENTOS_CONCURRENCIA = 6
+ESPERA_BASE_REINTENTO = 0.01  # segundos
+estadisticas_concurrencia = {'reintentos': 0, 'conflictos': 0}
+_lock_estadisticas = threading.Lock()
+
+# Un lock por torneo serializa sus escrituras dentro del proceso: el árbol del
+# bracket en caché es compartido entre hilos y no debe verse a medio modificar.
+# Entre procesos, la protección la da el bloqueo optimista sobre Torneo.version.
+# Los locks forman un grupo fijo (cada torneo usa el de su id módulo
+# NUM_LOCKS_TORNEO), así que no crecen con el número de torneos; dos torneos que
+# comparten lock solo se esperan el uno al otro. Las operaciones no se anidan,
+# por lo que compartirlo no puede bloquear a un hilo consigo mismo.
+NUM_LOCKS_TORNEO = 64
+_locks_torneo = [threading.Lock() for _ in range(NUM_LOCKS_TORNEO)]
+
+
+def _lock_de_torneo(torneo_id):
+    return _locks_torneo[hash(torneo_id) % NUM_LOCKS_TORNEO]
+
+
+def reintentar_si_conflicto(operacion):
+    """
+    Decorador para operaciones (session, torneo_id, ...) que modifican un torneo.
+    Si otra escritura cambió el torneo entre la lectura y el commit (StaleDataError
+    por el bloqueo optimista de Torneo.version) o ya insertó el mismo partido
+    (IntegrityError por el índice único), se deshace la transacción y se repite la
+    operación sobre el estado actualizado. Tras INTENTOS_CONCURRENCIA fallos se
+    informa del conflicto.
+    """
+    @functools.wraps(operacion)
+    def envoltura(session, torneo_id, *args, **kwargs):
+        with _lock_de_torneo(torneo_id):
+            for intento in range(INTENTOS_CONCURRENCIA):
+                try:
+                    return operacion(session, torneo_id, *args, **kwargs)
+                except (StaleDataError, IntegrityError):
+                    session.rollback()
+                    formatos.descartar_caches(torneo_id)
+                    with _lock_estadisticas:
+                        estadisticas_concurrencia['reintentos'] += 1
+                    time.sleep(random.uniform(0, ESPERA_BASE_REINTENTO * 2 ** intento))
+        with _lock_estadisticas:
+            estadisticas_concurrencia['conflictos'] += 1
+        return False, "Error: El torneo fue modificado por otra persona al mismo tiempo. Vuelve a intentarlo."
+    return envoltura
+
 
 # ==============================================================================
 # 1. CREACIÓN DEL TORNEO
 # ==============================================================================
 
-def crear_nuevo_torneo(session, nombre_torneo, num_equipos):
+def validar_num_equipos(num_equipos, formato=formatos.ELIMINACION_DIRECTA):
+    """
+    Valida el formato y el número de equipos de un torneo.
+    Retorna None si es válido o el mensaje de error correspondiente.
+    """
+    if formato not in formatos.FORMATOS:
+        return f"Error: Formato de torneo desconocido: '{formato}'."
+    return formatos.obtener_formato(formato).validar_num_equipos(num_equipos)
+
+
+def crear_nuevo_torneo(session, nombre_torneo, num_equipos, formato=formatos.ELIMINACION_DIRECTA):
     """
     Crea un nuevo objeto Torneo y lo guarda en la base de datos.
     Retorna el objeto Torneo si la creación es exitosa.
     """
-    # 1. Validación de Potencia de 2 (La lógica de Colab se mantiene)
-    try:
-        if num_equipos < 2 or not math.isclose(math.log2(num_equipos), round(math.log2(num_equipos))):
-            return None, "Error: El número de equipos debe ser una potencia de 2 (2, 4, 8, 16, etc.)."
-    except ValueError:
-        return None, "Error: El número de equipos no es válido."
+    # 1. Validación del formato y del número de equipos
+    error = validar_num_equipos(num_equipos, formato)
+    if error:
+        return None, error
 
     # 2. Creación del objeto ORM
     nuevo_torneo = Torneo(
         nombre=nombre_torneo,
         num_equipos=num_equipos,
-        formato='Eliminación Directa Simple',
+        formato=formato,
         campeon=None
     )
     
@@ -37,9 +131,12 @@ def crear_nuevo_torneo(session, nombre_torneo, num_equipos):
 # 2. GESTIÓN DE PARTICIPANTES
 # ==============================================================================
 
+@reintentar_si_conflicto
 def agregar_equipo_a_torneo(session, torneo_id, equipo_nombre):
     """
-    Agrega un equipo a un torneo existente.
+    Inscribe un equipo en un torneo existente. Si el equipo ya está en el registro
+    global (por su nombre normalizado, ver registro_equipos.py) se inscribe ese
+    mismo equipo; si no, se registra.
     """
     torneo = session.get(Torneo, torneo_id)
     
@@ -47,118 +144,261 @@ def agregar_equipo_a_torneo(session, torneo_id, equipo_nombre):
         return False, "Error: Torneo no encontrado."
     
     # 1. Validar que no exceda el límite
-    if len(torneo.equipos) >= torneo.num_equipos:
+    if registro_equipos.num_inscritos(session, torneo_id) >= torneo.num_equipos:
         return False, f"Error: El torneo ya tiene el límite de {torneo.num_equipos} equipos."
 
-    # 2. Validar que el nombre no esté duplicado
-    nombres_existentes = [e.nombre.lower() for e in torneo.equipos]
-    if equipo_nombre.strip().lower() in nombres_existentes:
+    # 2. Buscar el equipo en el registro (índice por nombre normalizado) y validar
+    #    que no esté ya inscrito
+    equipo = session.query(Equipo).filter(
+        Equipo.nombre_normalizado == registro_equipos.normalizar_nombre(equipo_nombre)
+    ).one_or_none()
+    if equipo is not None and registro_equipos.esta_inscrito(session, torneo_id, equipo.id):
         return False, "Error: Ya existe un equipo con ese nombre en este torneo."
 
-    # 3. Creación y Guardado del objeto Equipo
-    nuevo_equipo = Equipo(nombre=equipo_nombre.strip(), torneo=torneo)
-    session.add(nuevo_equipo)
+    # 3. Registro del equipo (si es nuevo) e inscripción
+    if equipo is None:
+        equipo = Equipo(nombre=equipo_nombre.strip(),
+                        nombre_normalizado=registro_equipos.normalizar_nombre(equipo_nombre))
+        session.add(equipo)
+    # El nombre se lee antes del commit, que expira el equipo
+    nombre = equipo.nombre
+    session.add(Inscripcion(torneo_id=torneo_id, equipo=equipo))
+    registro_eventos.anotar(session, registro_eventos.EQUIPOS_AGREGADOS, {'equipos': [nombre]})
+    incrementar_version(torneo)
+    version = torneo.version
+    registro_eventos.escribir(session, torneo)
     session.commit()
-    
-    return True, f"Equipo '{equipo_nombre}' agregado con éxito."
+
+    publicar_eventos(torneo_id, [('equipo_agregado', {'equipo': nombre})], version)
+    return True, f"Equipo '{nombre}' agregado con éxito."
 
 
 # ==============================================================================
 # 3. GENERACIÓN DEL BRACKET INICIAL
 # ==============================================================================
 
+@reintentar_si_conflicto
 def generar_bracket_inicial(session, torneo_id):
     """
-    Genera y guarda los partidos de la Ronda 1 de forma aleatoria.
+    Genera y guarda los partidos iniciales según el formato del torneo: el bracket
+    sembrado (con byes si hace falta) en eliminación directa, el calendario completo
+    en todos contra todos o la Ronda 1 por semillas en el sistema suizo.
+    La semilla de cada equipo es su orden de inscripción.
     """
     torneo = session.get(Torneo, torneo_id)
     
     if not torneo:
         return False, "Error: Torneo no encontrado."
-    if len(torneo.equipos) != torneo.num_equipos:
-        return False, f"Error: Faltan equipos. Requiere {torneo.num_equipos}, tiene {len(torneo.equipos)}."
+    participantes = registro_equipos.nombres_inscritos(session, torneo_id)
+    if len(participantes) != torneo.num_equipos:
+        return False, f"Error: Faltan equipos. Requiere {torneo.num_equipos}, tiene {len(participantes)}."
     if session.query(Partido).filter(Partido.torneo_id == torneo_id).count() > 0:
         return False, "Error: El bracket ya ha sido generado para este torneo."
 
+    formato = formatos.obtener_formato(torneo.formato)
+    num_partidos = crear_ronda_inicial(session, torneo, participantes)
+    incrementar_version(torneo)
+    version = torneo.version
+    registro_eventos.escribir(session, torneo)
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        formato.descartar(torneo_id)
+        raise
 
-    participantes = [e.nombre for e in torneo.equipos]
-    random.shuffle(participantes)
-    
-    num_partidos_ronda_1 = torneo.num_equipos // 2
-    ronda_nombre = 'Ronda 1'
-    
-    # Pre-cálculo del Mapa de Avance (Lógica compleja de Colab adaptada)
-    # Genera los IDs de R2: R2_P1, R2_P2, ...
-    ronda_siguiente_matches = [f'R2_P{i+1}' for i in range(num_partidos_ronda_1 // 2)]
-    advancement_map = {}
-    
-    for i in range(num_partidos_ronda_1):
-        match_id = f'R1_P{i + 1}'
-        # Asigna el ID del partido destino en R2
-        siguiente_id = ronda_siguiente_matches[i // 2] 
-        advancement_map[match_id] = siguiente_id
-
-    # Creación de los objetos Partido e inserción en DB
-    nuevos_partidos = []
-    for i in range(num_partidos_ronda_1):
-        match_id = f'R1_P{i + 1}'
-        
-        partido = Partido(
-            torneo=torneo,
-            match_id=match_id,
-            ronda_nombre=ronda_nombre,
-            equipo_a=participantes[i * 2],
-            equipo_b=participantes[i * 2 + 1],
-            siguiente_partido_id=advancement_map[match_id]
-        )
-        nuevos_partidos.append(partido)
-
-    session.add_all(nuevos_partidos)
-    session.commit()
-    return True, f"Bracket inicial ({num_partidos_ronda_1} partidos) generado con éxito."
+    formato.confirmar_version(torneo_id, version)
+    publicar_eventos(torneo_id, [('bracket_generado', {'partidos': num_partidos})], version)
+    return True, f"Bracket inicial ({num_partidos} partidos) generado con éxito."
+
+
+def crear_ronda_inicial(session, torneo, participantes):
+    """
+    Inserta los partidos iniciales del torneo según su formato y los anota en el
+    registro de eventos (sin hacer commit). Retorna el número de partidos creados.
+    """
+    num_partidos = formatos.obtener_formato(torneo.formato).crear_partidos_iniciales(session, torneo, participantes)
+    registro_eventos.anotar(session, registro_eventos.BRACKET_GENERADO,
+                            {'partidos': registro_eventos.tomar_partidos(session)})
+    return num_partidos
 
 # ==============================================================================
 # 4. INGRESO Y VALIDACIÓN DE RESULTADOS
 # ==============================================================================
 
+@reintentar_si_conflicto
 def ingresar_resultado(session, torneo_id, match_id, marcador_a, marcador_b):
     """
     Busca un partido específico y actualiza su marcador y el campo 'ganador'.
+    Después el formato del torneo aplica el resultado en el mismo commit: en
+    eliminación directa el ganador avanza en el árbol del bracket; en los formatos
+    por puntos se actualiza la clasificación. Si era el último partido, se declara
+    al campeón. Las estadísticas globales de los dos equipos se actualizan en la
+    misma transacción.
+    """
+    return _guardar_resultado(session, torneo_id, match_id, marcador_a, marcador_b)
+
+
+@reintentar_si_conflicto
+def corregir_resultado(session, torneo_id, match_id, marcador_a, marcador_b):
+    """
+    Corrige el resultado de un partido ya jugado (p. ej. un marcador mal tecleado),
+    aunque ya se hayan generado rondas posteriores. En eliminación directa, si
+    cambia el ganador, solo se reescriben o eliminan los partidos de su camino
+    hacia la final (siguiendo siguiente_partido_id); en los formatos por puntos
+    se corrige la clasificación, pero los emparejamientos ya generados se mantienen.
+    """
+    return _guardar_resultado(session, torneo_id, match_id, marcador_a, marcador_b, correccion=True)
+
+
+def _guardar_resultado(session, torneo_id, match_id, marcador_a, marcador_b, correccion=False):
+    # La versión del torneo se lee antes que nada: si algo cambia después, el
+    # commit fallará por el bloqueo optimista y la operación se repetirá
+    torneo = session.get(Torneo, torneo_id)
+    if not torneo:
+        return False, "Error: Torneo no encontrado."
+    formato = formatos.obtener_formato(torneo.formato)
+
+    exito, mensaje, eventos = _aplicar_resultado(session, torneo, formato, match_id, marcador_a, marcador_b,
+                                                 correccion)
+    if not exito:
+        return False, mensaje
+
+    incrementar_version(torneo)
+    version = torneo.version
+    finalizado = torneo.campeon is not None
+    registro_eventos.escribir(session, torneo)
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        formato.descartar(torneo_id)
+        raise
+
+    confirmar_cache(formato, torneo_id, version, finalizado)
+    publicar_eventos(torneo_id, eventos, version)
+    return True, mensaje
+
+
+@reintentar_si_conflicto
+def ingresar_resultados_lote(session, torneo_id, resultados):
+    """
+    Aplica varios resultados [(match_id, marcador_a, marcador_b)] de un mismo
+    torneo, en orden, en una sola transacción (y con un solo incremento de la
+    versión). Los que no superan la validación se rechazan sin afectar al resto.
+    Retorna (True, [(exito, mensaje)] de cada resultado); si la transacción no se
+    pudo confirmar, (False, mensaje) y no se aplica ninguno.
+    """
+    torneo = session.get(Torneo, torneo_id)
+    if not torneo:
+        return False, "Error: Torneo no encontrado."
+    formato = formatos.obtener_formato(torneo.formato)
+
+    respuestas, eventos = [], []
+    for match_id, marcador_a, marcador_b in resultados:
+        exito, mensaje, eventos_resultado = _aplicar_resultado(
+            session, torneo, formato, match_id, marcador_a, marcador_b)
+        respuestas.append((exito, mensaje))
+        eventos += eventos_resultado
+    if not eventos:
+        return True, respuestas
+
+    incrementar_version(torneo)
+    version = torneo.version
+    finalizado = torneo.campeon is not None
+    registro_eventos.escribir(session, torneo)
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        formato.descartar(torneo_id)
+        raise
+
+    confirmar_cache(formato, torneo_id, version, finalizado)
+    publicar_eventos(torneo_id, eventos, version)
+    return True, respuestas
+
+
+def _aplicar_resultado(session, torneo, formato, match_id, marcador_a, marcador_b, correccion=False):
+    """
+    Valida y aplica un resultado en la sesión, sin incrementar la versión ni hacer
+    commit. Con 'correccion', el partido ya debe tener un resultado; sin ella, no
+    debe tenerlo (un segundo marcador de otra mesa no reescribe el primero).
+    Retorna (exito, mensaje, eventos para publicar tras el commit).
     """
-    
     # 1. Buscar el partido por ID lógico y torneo ID
     partido = session.query(Partido).filter(
-        Partido.torneo_id == torneo_id,
+        Partido.torneo_id == torneo.id,
         Partido.match_id == match_id
     ).first()
 
     if not partido:
-        return False, f"Error: Partido con ID {match_id} no encontrado en el torneo."
+        return False, f"Error: Partido con ID {match_id} no encontrado en el torneo.", []
+
+    if correccion and partido.ganador_id is None:
+        return False, f"Error: El partido {match_id} aún no tiene resultado que corregir.", []
+    if not correccion and partido.ganador_id is not None:
+        return False, (f"Error: El partido {match_id} ya tiene resultado ({partido.marcador_a}-{partido.marcador_b}, "
+                       f"ganador: {partido.ganador}). Para cambiarlo, corrige el resultado."), []
     
     # 2. Validaciones
     if marcador_a < 0 or marcador_b < 0:
-        return False, "Error: Los marcadores no pueden ser números negativos."
+        return False, "Error: Los marcadores no pueden ser números negativos.", []
     
     if marcador_a == marcador_b:
-        return False, "Error: En Eliminación Directa Simple no se permiten empates. Reingresa los marcadores."
+        return False, f"Error: En {torneo.formato} no se permiten empates. Reingresa los marcadores.", []
 
-    # 3. Determinar el ganador
+    # 3. Determinar el ganador (su equipo en el registro, ya cargado con el partido)
     if marcador_a > marcador_b:
-        ganador = partido.equipo_a
+        registro_ganador = partido.registro_a
     else:
-        ganador = partido.equipo_b
+        registro_ganador = partido.registro_b
+    ganador = registro_ganador.nombre
         
-    # 4. Actualizar el objeto Partido
+    # 4. Actualizar el objeto Partido (guardando el resultado anterior, si se corrige)
+    anterior = ganador_anterior_id = None
+    if partido.ganador_id is not None:
+        anterior = (partido.marcador_a, partido.marcador_b, partido.ganador)
+        ganador_anterior_id = partido.ganador_id
     partido.marcador_a = marcador_a
     partido.marcador_b = marcador_b
-    partido.ganador = ganador
-    
-    session.commit()
-    
+    partido.registro_ganador = registro_ganador
+
+    # 5. Aplicar el resultado según el formato
+    campeon_anterior = torneo.campeon
+    mensaje_avance, eventos_formato = formato.registrar_resultado(session, torneo, partido, anterior)
+    _anotar_cambios(session, torneo, campeon_anterior, registro_eventos.RESULTADO_INGRESADO, {
+        'match_id': match_id, 'marcador_a': marcador_a, 'marcador_b': marcador_b, 'ganador': ganador,
+    })
+
+    # 6. Estadísticas globales de los equipos, por id (si se corrige un resultado, se resta el anterior)
+    if anterior is not None:
+        estadisticas.registrar_resultado(session, partido.equipo_a_id, partido.equipo_b_id,
+                                         anterior[0], anterior[1], ganador_anterior_id, signo=-1)
+    estadisticas.registrar_resultado(session, partido.equipo_a_id, partido.equipo_b_id,
+                                     marcador_a, marcador_b, registro_ganador.id)
+    estadisticas.registrar_campeon(session, torneo.campeon, campeon_anterior)
+
+    # Eventos para los espectadores (se publican solo si el commit tiene éxito)
+    eventos = [('partido_decidido', {
+        'match_id': match_id, 'equipo_a': partido.equipo_a, 'equipo_b': partido.equipo_b,
+        'marcador': [marcador_a, marcador_b], 'ganador': ganador,
+    })] + eventos_formato
+
     mensaje = (f"Resultado registrado para {partido.equipo_a} vs {partido.equipo_b}. "
-               f"Marcador: {marcador_a}-{marcador_b}. Ganador: {ganador}.")
-    
-    return True, mensaje
+               f"Marcador: {marcador_a}-{marcador_b}. Ganador: {ganador}.{mensaje_avance}")
+    return True, mensaje, eventos
+
+
+def _anotar_cambios(session, torneo, campeon_anterior, tipo, datos):
+    """
+    Anota en el registro el evento 'tipo' (con los partidos que creó y los que
+    reescribió o eliminó una corrección) y el cambio de campeón, si lo hubo.
+    """
+    registro_eventos.anotar(session, tipo, dict(datos, partidos=registro_eventos.tomar_partidos(session),
+                                                **registro_eventos.tomar_correccion(session)))
+    if torneo.campeon != campeon_anterior:
+        registro_eventos.anotar(session, registro_eventos.CAMPEON_DECLARADO, {'campeon': torneo.campeon})
 
 # ==============================================================================
 # 5. OBTENER PARTIDOS PENDIENTES (Para la vista web)
@@ -170,8 +410,8 @@ def obtener_partidos_pendientes(session, torneo_id):
     """
     partidos_pendientes = session.query(Partido).filter(
         Partido.torneo_id == torneo_id,
-        Partido.ganador.is_(None)
-    ).order_by(Partido.ronda_nombre).all()
+        Partido.ganador_id.is_(None)
+    ).order_by(Partido.ronda_num, Partido.id).all()
     
     return partidos_pendientes
 
@@ -179,107 +419,178 @@ def obtener_partidos_pendientes(session, torneo_id):
 # 6. AVANCE DE RONDA Y DETERMINACIÓN DEL CAMPEÓN
 # ==============================================================================
 
+@reintentar_si_conflicto
 def avanzar_ronda(session, torneo_id):
     """
-    Verifica si la última ronda está completa y genera los partidos de la siguiente.
-    Si solo queda un partido y está completo, declara al campeón.
+    Verifica si la ronda actual está completa y genera la siguiente según el
+    formato del torneo. Si ya no quedan rondas, declara al campeón.
+
+    En eliminación directa, ingresar_resultado ya crea cada partido en cuanto sus
+    dos equipos se conocen; esta pasada completa recarga el árbol desde la DB y
+    completa lo que falte (p. ej. resultados cargados antes de existir el motor de bracket).
     """
     torneo = session.get(Torneo, torneo_id)
     if not torneo:
         return False, "Error: Torneo no encontrado."
-    
-    # 1. Obtener la última ronda generada
-    # Usamos subconsultas para encontrar el nombre de la ronda con el número más alto (ej. 'Ronda 1', 'Ronda 2')
-    ultima_ronda_nombre = session.query(Partido.ronda_nombre).filter(
-        Partido.torneo_id == torneo_id
-    ).order_by(Partido.ronda_nombre.desc()).first()
-    
-    if not ultima_ronda_nombre:
-        return False, "Error: No hay partidos generados. Ejecuta primero la generación del bracket."
-    
-    ronda_actual_nombre = ultima_ronda_nombre[0]
-    ronda_actual_num = int(ronda_actual_nombre.split(' ')[-1])
-    
-    partidos_ronda_actual = session.query(Partido).filter(
-        Partido.torneo_id == torneo_id,
-        Partido.ronda_nombre == ronda_actual_nombre
-    ).all()
-    
-    # 2. Verificar si la ronda está completa y recolectar ganadores
-    ganadores_ronda = []
-    for partido in partidos_ronda_actual:
-        if partido.ganador is None:
-            return False, f"Advertencia: La ronda '{ronda_actual_nombre}' no está completa. El partido {partido.match_id} no tiene resultado."
-        ganadores_ronda.append({
-            'ganador': partido.ganador,
-            'siguiente_partido_id': partido.siguiente_partido_id # ID del partido en la siguiente ronda (ej. R2_P1)
-        })
+    # Sin esto, cada llamada extra cambiaría la versión y anotaría un evento sin cambios
+    if torneo.campeon is not None:
+        return False, f"Error: El torneo ya está finalizado. El campeón es: {torneo.campeon}"
+
+    campeon_anterior = torneo.campeon
+    formato = formatos.obtener_formato(torneo.formato)
+    exito, mensaje, eventos = formato.avanzar_ronda(session, torneo)
+    if not exito:
+        return False, mensaje
+    _anotar_cambios(session, torneo, campeon_anterior, registro_eventos.RONDA_AVANZADA, {})
 
-    # 3. Determinar si el torneo ha finalizado (solo 1 partido en la ronda)
-    if len(partidos_ronda_actual) == 1:
-        torneo.campeon = partidos_ronda_actual[0].ganador
+    incrementar_version(torneo)
+    version = torneo.version
+    finalizado = torneo.campeon is not None
+    registro_eventos.escribir(session, torneo)
+    estadisticas.registrar_campeon(session, torneo.campeon, campeon_anterior)
+    try:
         session.commit()
-        return True, f"¡TORNEO FINALIZADO! El campeón es: {torneo.campeon}"
+    except Exception:
+        session.rollback()
+        formato.descartar(torneo_id)
+        raise
 
-    # 4. Generar la Estructura de la Siguiente Ronda (Ronda N+1)
-    
-    ronda_siguiente_num = ronda_actual_num + 1
-    ronda_siguiente_nombre = f'Ronda {ronda_siguiente_num}'
-    num_partidos_siguiente = len(partidos_ronda_actual) // 2
-    
-    # 5. Calcular los ID de avance para la ronda N+1 (Destino: Ronda N+2)
-    # Si la siguiente ronda tiene más de 1 partido, necesitamos calcular el avance
-    if num_partidos_siguiente > 1:
-        ronda_destino_num = ronda_siguiente_num + 1
-        num_partidos_destino = num_partidos_siguiente // 2
-        
-        # Generamos los IDs de destino (ej. R3_P1, R3_P2, ...)
-        ronda_destino_matches = [f'R{ronda_destino_num}_P{i+1}' for i in range(num_partidos_destino)]
-    else:
-        # Si la siguiente ronda es la final, el avance es None (no hay más rondas)
-        ronda_destino_matches = [None] 
-        
-    
-    # 6. Agrupar ganadores para formar los nuevos emparejamientos
-    partidos_en_construccion = {}
-    
-    for i, item in enumerate(ganadores_ronda):
-        target_id = item['siguiente_partido_id'] # target_id es un ID de Ronda N+1 (ej. R2_P1)
-        
-        if target_id not in partidos_en_construccion:
-            # Si es el primer equipo, usa equipo_a y calcula su avance a Ronda N+2
-            
-            # La posición del partido en la siguiente ronda es el índice i dividido por 2
-            advancement_index = i // 2 
-            siguiente_partido_destino = ronda_destino_matches[advancement_index]
-            
-            partidos_en_construccion[target_id] = {
-                'equipo_a': item['ganador'],
-                'equipo_b': None,
-                'siguiente_partido_id': siguiente_partido_destino
-            }
-        else:
-            # Si es el segundo equipo, llena equipo_b
-            partidos_en_construccion[target_id]['equipo_b'] = item['ganador']
-
-
-    # 7. Crear los nuevos objetos Partido (Ronda N+1)
-    nuevos_partidos = []
-    for match_id, data in partidos_en_construccion.items():
-        if data['equipo_b'] is None:
-             session.rollback()
-             return False, "Error lógico: Faltan equipos para la siguiente ronda. Revisar."
-             
-        nuevo_partido = Partido(
-            torneo=torneo,
-            match_id=match_id,
-            ronda_nombre=ronda_siguiente_nombre,
-            equipo_a=data['equipo_a'],
-            equipo_b=data['equipo_b'],
-            siguiente_partido_id=data['siguiente_partido_id']
-        )
-        nuevos_partidos.append(nuevo_partido)
-
-    session.add_all(nuevos_partidos)
+    confirmar_cache(formato, torneo_id, version, finalizado)
+    publicar_eventos(torneo_id, eventos, version)
+    return True, mensaje
+
+# ==============================================================================
+# 7. CONSULTAS DE LECTURA (Listado paginado y API JSON)
+# ==============================================================================
+
+ESTADOS_TORNEO = ('en_curso', 'finalizado')
+
+
+def listar_torneos(session, despues_de=None, limite=50, estado=None):
+    """
+    Lista torneos paginando por id (keyset): cada página cuesta lo mismo
+    independientemente del tamaño de la tabla. Solo se proyectan las columnas
+    necesarias, sin cargar objetos ORM completos.
+
+    'estado' puede ser 'en_curso' (sin campeón), 'finalizado' o None (todos).
+    Retorna (filas, cursor_siguiente); el cursor es None en la última página.
+    """
+    consulta = session.query(
+        Torneo.id, Torneo.nombre, Torneo.formato, Torneo.num_equipos, Torneo.campeon
+    )
+    if despues_de is not None:
+        consulta = consulta.filter(Torneo.id > despues_de)
+    if estado == 'en_curso':
+        consulta = consulta.filter(Torneo.campeon.is_(None))
+    elif estado == 'finalizado':
+        consulta = consulta.filter(Torneo.campeon.isnot(None))
+
+    # Se pide una fila de más para saber si existe una página siguiente
+    filas = consulta.order_by(Torneo.id).limit(limite + 1).all()
+    cursor_siguiente = filas[limite - 1].id if len(filas) > limite else None
+    return filas[:limite], cursor_siguiente
+
+
+def obtener_bracket_compacto(session, torneo_id):
+    """
+    Retorna el estado del torneo y sus partidos agrupados por ronda en una
+    estructura compacta lista para serializar a JSON (None si no existe):
+
+        {"id", "nombre", "formato", "num_equipos", "campeon", "version",
+         "rondas": [{"ronda": 1, "partidos": [
+             {"id": "R1_P1", "a": ..., "b": ..., "marcador": [2, 1] | None, "ganador": ...}
+         ]}, ...]}
+    """
+    torneo = session.query(
+        Torneo.id, Torneo.nombre, Torneo.formato, Torneo.num_equipos, Torneo.campeon, Torneo.version
+    ).filter(Torneo.id == torneo_id).first()
+    if not torneo:
+        return None
+
+    filas = registro_equipos.consultar_partidos(
+        session, 'ronda_num', 'match_id', 'equipo_a', 'equipo_b', 'marcador_a', 'marcador_b', 'ganador'
+    ).filter(Partido.torneo_id == torneo_id).order_by(Partido.ronda_num, Partido.id)
+
+    rondas = []
+    for ronda_num, match_id, equipo_a, equipo_b, marcador_a, marcador_b, ganador in filas:
+        if not rondas or rondas[-1]['ronda'] != ronda_num:
+            rondas.append({'ronda': ronda_num, 'partidos': []})
+        rondas[-1]['partidos'].append({
+            'id': match_id,
+            'a': equipo_a,
+            'b': equipo_b,
+            'marcador': [marcador_a, marcador_b] if ganador is not None else None,
+            'ganador': ganador,
+        })
+
+    datos = dict(torneo._mapping)
+    datos['rondas'] = rondas
+    return datos
+
+
+def obtener_datos_dashboard(session, torneo_id):
+    """
+    Todo lo que muestra el dashboard de un torneo, en dos consultas sea cual sea
+    el tamaño del bracket (None si no existe):
+      - el torneo con sus equipos (joinedload, en la misma sentencia),
+      - sus partidos ordenados por ronda, como filas de columnas (sin objetos ORM),
+        con los nombres de sus equipos unidos en la misma sentencia.
+    El agrupado por ronda, los pendientes y la clasificación (solo en los formatos
+    por puntos) se derivan de esas filas en una sola pasada:
+
+        {"torneo", "equipos" (en orden de inscripción),
+         "rondas": [(ronda_num, ronda_nombre, [partidos])], "pendientes", "clasificacion"}
+    """
+    torneo = session.query(Torneo).options(joinedload(Torneo.equipos)).filter(Torneo.id == torneo_id).one_or_none()
+    if torneo is None:
+        return None
+    equipos = torneo.equipos
+
+    partidos = registro_equipos.consultar_partidos(
+        session, 'ronda_num', 'ronda_nombre', 'match_id', 'equipo_a', 'equipo_b',
+        'marcador_a', 'marcador_b', 'ganador'
+    ).filter(Partido.torneo_id == torneo_id).order_by(Partido.ronda_num, Partido.id).all()
+
+    rondas, pendientes = [], []
+    for partido in partidos:
+        if not rondas or rondas[-1][0] != partido.ronda_num:
+            rondas.append((partido.ronda_num, partido.ronda_nombre, []))
+        rondas[-1][2].append(partido)
+        if partido.ganador is None:
+            pendientes.append(partido)
+
+    clasificacion = None
+    if partidos:
+        clasificacion = formatos.obtener_formato(torneo.formato).clasificacion(
+            [equipo.nombre for equipo in equipos], partidos)
+
+    return {
+        'torneo': torneo,
+        'equipos': equipos,
+        'rondas': rondas,
+        'pendientes': pendientes,
+        'clasificacion': clasificacion,
+    }
+
+# ==============================================================================
+# 8. RECONSTRUCCIÓN DESDE EL REGISTRO DE EVENTOS
+# ==============================================================================
+
+@reintentar_si_conflicto
+def reconstruir_partidos(session, torneo_id):
+    """
+    Reemplaza los partidos del torneo (y su campeón) por los que resultan de su
+    registro de eventos: la última instantánea más los eventos posteriores.
+    Las estadísticas globales no se tocan: después conviene reconstruirlas.
+    """
+    torneo = session.get(Torneo, torneo_id)
+    if not torneo:
+        return False, "Error: Torneo no encontrado."
+
+    num_partidos = registro_eventos.reconstruir_partidos(session, torneo)
+    if num_partidos is None:
+        return False, f"Error: El torneo {torneo_id} no tiene registro de eventos."
+    incrementar_version(torneo)
     session.commit()
-    return True, f"Ronda {ronda_siguiente_num} generada con {num_partidos_siguiente} partidos."
\ No newline at end of file
+    formatos.descartar_caches(torneo_id)
+    return True, f"Torneo {torneo_id}: {num_partidos} partidos reconstruidos desde el registro."